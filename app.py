@@ -1,20 +1,30 @@
+import hashlib
 import io
-from flask import Flask, request, jsonify, send_from_directory, send_file
+import json
+from flask import Flask, Response, request, jsonify, send_from_directory, send_file, stream_with_context, url_for
 from flask_cors import CORS  # Enable CORS for frontend
 import os
 import logging
-import matplotlib
+import threading
 
 from components.llm_handler import LLMHandler
 from components.rag_handler import RAGHandler
 from components.repository import CodeRepository
+from components.local_repository import LocalRepository
 from components.analyzer import CodeAnalyzer
 from components.graph_handler import GraphHandler
-from components.embedding_generator import EmbeddingGenerator
+from components.graph_renderer import LAYOUT_VERSION, GraphRenderer
+from components.graph_hierarchy import GraphHierarchy, load_hierarchy, load_snapshot, snapshot_key, store_hierarchy
+from components.incremental import AnalysisState, IncrementalAnalyzer, state_path
+from components.jobs import JobQueue
+from components.pipeline import IngestionPipeline
+from components.artifact_store import ARTIFACT_MIMETYPES, ARTIFACT_NAME, get_artifact_store, graph_fingerprint
+from components.embedding_service import get_embedding_generator
+from components.startup import preload, warm_up
 import config
 from components.summarizer import CodeSummarizer
 
-matplotlib.use('Agg')  # Use non-GUI backend
+os.environ.setdefault("MPLBACKEND", "Agg")  # Use non-GUI backend (matplotlib is imported on first render)
 
 STATIC_FOLDER = "static"
 if not os.path.exists(STATIC_FOLDER):
@@ -25,11 +35,14 @@ CORS(app)  # Enable CORS
 
 logging.basicConfig(level=logging.DEBUG)
 
-# Initialize components
-embedding_generator = EmbeddingGenerator()
+# Initialize components (the embedding model loads on first use, see get_embedding_generator)
 code_analyzer = CodeAnalyzer()
+job_queue = JobQueue()
 repo_token = config.GITHUB_TOKEN
 
+if config.STARTUP_PRELOAD:
+    preload()  # Under gunicorn with preload_app this runs once in the master, before the workers fork
+
 @app.route('/')
 def index():
     return send_from_directory('frontend/build', 'index.html')
@@ -38,65 +51,372 @@ def index():
 @app.route('/upload', methods=['POST'])
 def upload_code():
     """Handles file upload or repo-based extraction."""
+    try:
+        repo, key = resolve_upload_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job, _ = job_queue.submit(f"graph:{key}", "component_graph", process_code, repo)
+    return wait_for_job(job, "Error generating component graph")
+
+
+def job_links(job):
+    """Job state plus the URLs to poll it and fetch its result."""
+    return {
+        **job.to_dict(),
+        "status_url": url_for("job_status", job_id=job.id),
+        "result_url": url_for("job_result", job_id=job.id),
+    }
+
+
+def wait_for_job(job, error_message=None):
+    """
+    Response of a synchronous route: the job result if it finishes within JOB_SYNC_TIMEOUT seconds, otherwise
+    202 with the job id and its URLs, so a slow repository never pins a worker thread.
+    """
+    if not job.wait(config.JOB_SYNC_TIMEOUT):
+        return jsonify(job_links(job)), 202
+    if job.status == "failed":
+        return jsonify({"error": f"{error_message}: {job.error}" if error_message else job.error})
+    return jsonify(job.result)
+
+
+def resolve_upload_request():
+    """Builds the repository for an /upload form and its coalescing key (repo + commit)."""
     upload_option = request.form.get('uploadOption')
     logging.debug(f"Upload option selected: {upload_option}")
 
     if upload_option == 'file':
         file = request.files.get('code_file')
         if not file or file.filename == '':
-            return jsonify({"error": "No valid file selected"})
+            raise ValueError("No valid file selected")
+
+        name = os.path.basename(file.filename)
+        if name in ('', '.', '..'):
+            raise ValueError("No valid file selected")
+        content = file.read()
+        # ✅ The name is part of the digest: the same bytes uploaded as a.py and b.py are different uploads
+        digest = hashlib.sha1(name.encode('utf-8', errors='surrogatepass') + b'\0' + content).hexdigest()
+        upload_dir = os.path.join('uploads', digest)
+        os.makedirs(upload_dir, exist_ok=True)
+        with open(os.path.join(upload_dir, name), 'wb') as f:
+            f.write(content)
+        return LocalRepository(upload_dir), f"file:{digest}"
 
-        file_path = os.path.join('uploads', file.filename)
-        file.save(file_path)
+    elif upload_option == 'repo':
+        repo_owner = request.form.get('repo_owner')
+        repo_name = request.form.get('repo_name')
+        if not repo_owner or not repo_name:
+            raise ValueError("Repository details required")
+        commit = request.form.get('commit', 'HEAD')
+        return CodeRepository(repo_owner, repo_name, repo_token, ref=commit), f"github:{repo_owner}/{repo_name}@{commit}"
+
+    elif upload_option == 'local':
+        repo = open_local_repository(request.form.get('local_path', ''))
+        return repo, f"local:{repo.source}@{repo.ref}"
+
+    raise ValueError("Invalid input option")
+
+
+def resolve_summary_request(data):
+    """Builds the repository for a JSON summary request and its coalescing key (repo + commit)."""
+    repo_owner = data.get("repo_owner")
+    repo_name = data.get("repo_name")
+
+    if data.get("local_path"):
+        repo = open_local_repository(data["local_path"])
+        return repo, f"local:{repo.source}@{repo.ref}"
+    if not repo_owner or not repo_name:
+        raise ValueError("Repository details required")
+    commit = data.get("commit", "HEAD")
+    return CodeRepository(repo_owner, repo_name, repo_token, ref=commit), f"github:{repo_owner}/{repo_name}@{commit}"
+
+
+def open_local_repository(local_path):
+    """Opens a local checkout, bare repo or archive, restricted to the LOCAL_REPO_ROOTS directories."""
+    if not local_path:
+        raise ValueError("Local path required")
+
+    real_path = os.path.realpath(local_path)
+    for root in config.LOCAL_REPO_ROOTS:
+        root = os.path.realpath(root)
+        if real_path == root or real_path.startswith(root + os.sep):
+            return LocalRepository(real_path)
+
+    raise ValueError("Local path is not under an allowed LOCAL_REPO_ROOTS directory")
+
+
+def process_code(job, repo):
+    """Job: processes code, generates embeddings, and builds Component Graph."""
+    # Fetch, parse and embed as one stream, so downloads, parsing and inference overlap
+    job.update(stage="ingesting")
+    functions, classes, metadata_files, embeddings = IngestionPipeline(repo, get_embedding_generator()).run(
+        progress=job.update
+    )
+
+    # Generate Component Graph
+    job.update(stage="graph")
+    graph_handler = GraphHandler(functions=functions, classes=classes)
+    component_graph = graph_handler.create_graph()
+
+    # Generate Graph Image, SVG and JSON layout (only if this exact graph was never rendered before)
+    job.update(stage="rendering", nodes=component_graph.number_of_nodes())
+    store = get_artifact_store()
+    renderer = GraphRenderer()
+    graph_key = graph_fingerprint(component_graph, renderer="visualize_graph", version=LAYOUT_VERSION)
+    visualization = store.get_or_create(
+        graph_key, "png", lambda: graph_handler.visualize_graph(component_graph).getvalue()
+    )
+    svg = store.get_or_create(graph_key, "svg", lambda: renderer.to_svg(component_graph))
+    layout = store.get_or_create(graph_key, "json", lambda: renderer.to_json_bytes(component_graph))
+
+    job.update(stage="done")
+    return {
+        "message": "Component Graph generated successfully",
+        "visualization": visualization,
+        "svg": svg,
+        "layout": layout
+    }
+
+
+def build_hierarchy(job, repo, snapshot=None):
+    """Job: builds the level-of-detail graph of a repo and returns its top level."""
+    job.update(stage="fetching")
+    repo.fetch_files_from_directory()
+
+    job.update(stage="graph")
+    hierarchy = GraphHierarchy.from_repository(repo)
+    store_hierarchy(hierarchy, snapshot)
+
+    job.update(stage="done", nodes=len(hierarchy.nodes))
+    return hierarchy.level()
+
+
+@app.route('/graph/hierarchy', methods=['POST'])
+def graph_hierarchy():
+    """
+    Same form as /upload, but returns only the top level (packages and top-level modules) of the repo graph.
+    Deeper levels are fetched with GET /graph/hierarchy/<hierarchy_id>?node=<node_id>.
+
+    The top level of an uploaded file or of a GitHub repo at a full commit SHA is served from the cache
+    without fetching anything once it was built. Other refs (HEAD, branches, tags) and local paths can change
+    under the same name, so they are fetched and parsed in full before their top level is returned.
+    """
+    try:
+        repo, key = resolve_upload_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    snapshot = snapshot_key(key)
+    if snapshot is not None:
+        hierarchy = load_snapshot(snapshot)
+        if hierarchy is not None:
+            return jsonify(hierarchy.level())
+
+    job, _ = job_queue.submit(f"hierarchy:{key}", "graph_hierarchy", build_hierarchy, repo, snapshot)
+    return wait_for_job(job, "Error generating graph hierarchy")
+
+
+@app.route('/graph/hierarchy/<hierarchy_id>', methods=['GET'])
+def expand_graph_node(hierarchy_id):
+    """Children of one node with rolled-up edges, computed on first expansion. Hierarchies are content-addressed."""
+    hierarchy = load_hierarchy(hierarchy_id)
+    if hierarchy is None:
+        return jsonify({"error": "Unknown graph hierarchy"}), 404
+
+    node_id = request.args.get("node", "")
+    level = hierarchy.level(node_id)
+    if level is None:
+        return jsonify({"error": "Unknown node"}), 404
+
+    response = jsonify(level)
+    response.set_etag(hashlib.sha256(f"{hierarchy_id}\x1f{node_id}".encode("utf-8")).hexdigest())
+    response.headers["Cache-Control"] = f"public, max-age={config.ARTIFACT_MAX_AGE}, immutable"
+    return response.make_conditional(request)
+
+
+@app.route('/artifacts/<name>')
+def serve_artifact(name):
+    """Serves a content-addressed artifact; the content hash doubles as a strong ETag."""
+    match = ARTIFACT_NAME.match(name)
+    if not match:
+        return jsonify({"error": "Invalid artifact name"}), 404
+
+    key, ext = match.groups()
+    path = get_artifact_store().path(key, ext)
+    if not os.path.exists(path):
+        return jsonify({"error": "Artifact not found"}), 404
+
+    response = send_file(path, mimetype=ARTIFACT_MIMETYPES[ext], etag=key, conditional=True,
+                         max_age=config.ARTIFACT_MAX_AGE)
+    response.headers["Cache-Control"] = f"public, max-age={config.ARTIFACT_MAX_AGE}, immutable"
+    return response
+
+
+def summarize_repo(job, repo):
+    """Job: generates the structured repo summary, reporting per-file progress."""
+    def progress(event):
+        if event["event"] == "execution_order":
+            job.update(stage="summarizing", completed=0, total_files=event["total_files"])
+        elif event["event"] == "file_summary":
+            job.update(completed=event["completed"], total_files=event["total_files"])
+            if event["completed"] == event["total_files"]:
+                job.update(stage="reducing")
+
+    job.update(stage="fetching")
+    summary_data = RAGHandler(get_embedding_generator()).generate_sequential_summary(repo, progress=progress)
+    if "error" in summary_data:
+        raise RuntimeError(summary_data["error"])
+    job.update(stage="done")
+    return summary_data
 
-        with open(file_path, 'r') as f:
-            file_content = f.read()
 
-        return process_code(file_content)
+@app.route('/generate_repo_summary', methods=['POST'])
+def generate_repo_summary():
+    """API to generate structured repo summary and block diagram."""
+    try:
+        if not request.is_json:
+            return jsonify({"error": "Request must be JSON"}), 415
+
+        try:
+            repo, key = resolve_summary_request(request.get_json())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # ✅ Runs as a job too, so identical concurrent requests share one pipeline run
+        job, _ = job_queue.submit(f"summary:{key}", "repo_summary", summarize_repo, repo)
+        return wait_for_job(job)
+
+    except Exception as e:
+        logging.error(f"Error generating repo summary: {str(e)}")
+        return jsonify({"error": f"Error processing repo summary: {str(e)}"})
+
+
+@app.route('/jobs/upload', methods=['POST'])
+def submit_upload_job():
+    """Asynchronous /upload: returns a job id immediately."""
+    try:
+        repo, key = resolve_upload_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job, coalesced = job_queue.submit(f"graph:{key}", "component_graph", process_code, repo)
+    return jsonify({**job_links(job), "coalesced": coalesced}), 202
 
-    elif upload_option == 'repo':
-        repo_owner = request.form['repo_owner']
-        repo_name = request.form['repo_name']
-        repo = CodeRepository(repo_owner, repo_name, repo_token)
-        return process_code(repo)
 
-    return jsonify({"error": "Invalid input option"})
+@app.route('/jobs/generate_repo_summary', methods=['POST'])
+def submit_summary_job():
+    """Asynchronous /generate_repo_summary: returns a job id immediately."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 415
 
+    try:
+        repo, key = resolve_summary_request(request.get_json())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job, coalesced = job_queue.submit(f"summary:{key}", "repo_summary", summarize_repo, repo)
+    return jsonify({**job_links(job), "coalesced": coalesced}), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status and progress of a job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Result of a finished job (202 while it is still queued or running)."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if not job.finished:
+        return jsonify(job.to_dict()), 202
+    if job.status == "failed":
+        return jsonify({**job.to_dict(), "error": job.error}), 500
+    return jsonify(job.result)
+
+
+@app.route('/embedding/stats', methods=['GET'])
+def embedding_stats():
+    """Queue depth and batching counters of the embedding service."""
+    return jsonify(get_embedding_generator().stats())
+
+
+@app.route('/stream_repo_summary', methods=['POST'])
+def stream_repo_summary():
+    """Same as /generate_repo_summary, streamed as server-sent events: one event per file summary as it completes."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 415
 
-def process_code(repo):
-    """Processes code, generates embeddings, and builds Component Graph."""
     try:
-        functions, classes, relations = repo.fetch_files_from_directory()
+        repo, _ = resolve_summary_request(request.get_json())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        # Generate embeddings
-        embeddings = embedding_generator.generate_embeddings_batch(repo)
+    rag_handler = RAGHandler(get_embedding_generator())
 
-        # Generate Component Graph
-        graph_handler = GraphHandler(functions=functions, classes=classes)
-        component_graph = graph_handler.create_graph()
+    def events():
+        for event in rag_handler.stream_sequential_summary(repo):
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
 
-        # Generate Graph Image
-        graph_img_stream = graph_handler.visualize_graph(component_graph)
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-        graph_image_path = os.path.join(app.static_folder, "generated_graph.png")
+@app.route('/query', methods=['POST'])
+def query_repo():
+    """Answers a natural-language question about a repo from its most relevant code snippets."""
+    try:
+        if not request.is_json:
+            return jsonify({"error": "Request must be JSON"}), 415
+
+        data = request.get_json()
+        question = data.get("question")
 
-        # Save the image for frontend display
-        with open(graph_image_path, "wb") as f:
-            f.write(graph_img_stream.getvalue())
+        if not question:
+            return jsonify({"error": "Question required"}), 400
 
-        return jsonify({
-            "message": "Component Graph generated successfully",
-            "visualization": "/static/generated_graph.png"
-        })
+        try:
+            repo, _ = resolve_summary_request(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        rag_handler = RAGHandler(get_embedding_generator())
+        top_k = int(data.get("top_k", config.RETRIEVAL_TOP_K))
+
+        return jsonify(rag_handler.answer_question(repo, question, top_k=top_k))
 
     except Exception as e:
-        logging.error(f"Error processing code: {str(e)}")
-        return jsonify({"error": f"Error generating component graph: {str(e)}"})
+        logging.error(f"Error answering query: {str(e)}")
+        return jsonify({"error": f"Error answering query: {str(e)}"})
 
 
-@app.route('/generate_repo_summary', methods=['POST'])
-def generate_repo_summary():
-    """API to generate structured repo summary and block diagram."""
+_state_locks = {}  # {state_path: Lock}, so refreshes of one repository at different commits never interleave
+_state_locks_lock = threading.Lock()
+
+
+def refresh_summary(job, repo, path):
+    """Job: incremental re-analysis of a repo against its saved state."""
+    with _state_locks_lock:
+        state_lock = _state_locks.setdefault(path, threading.Lock())
+
+    with state_lock:
+        job.update(stage="analyzing")
+        incremental_analyzer = IncrementalAnalyzer(get_embedding_generator(), RAGHandler(get_embedding_generator()))
+        state, summary_data = incremental_analyzer.analyze(repo, AnalysisState.load(path))
+        state.save(path)
+
+    job.update(stage="done")
+    return summary_data
+
+
+@app.route('/refresh_repo_summary', methods=['POST'])
+def refresh_repo_summary():
+    """Re-analyzes a repo at a new commit, redoing work only for files changed since its last analysis."""
     try:
         if not request.is_json:
             return jsonify({"error": "Request must be JSON"}), 415
@@ -104,20 +424,22 @@ def generate_repo_summary():
         data = request.get_json()
         repo_owner = data.get("repo_owner")
         repo_name = data.get("repo_name")
+        commit = data.get("commit", "HEAD")
 
         if not repo_owner or not repo_name:
             return jsonify({"error": "Repository details required"}), 400
 
-        repo = CodeRepository(repo_owner, repo_name, repo_token)
-        rag_handler = RAGHandler(embedding_generator)
+        repo = CodeRepository(repo_owner, repo_name, repo_token, ref=commit)
+        path = state_path(f"{repo_owner}/{repo_name}")
 
-        summary_data = rag_handler.generate_sequential_summary(repo)
-
-        return jsonify(summary_data)
+        # ✅ Runs as a job: identical concurrent refreshes share one run, and the wait is bounded
+        job, _ = job_queue.submit(f"refresh:github:{repo_owner}/{repo_name}@{commit}", "refresh_summary",
+                                  refresh_summary, repo, path)
+        return wait_for_job(job, "Error refreshing repo summary")
 
     except Exception as e:
-        logging.error(f"Error generating repo summary: {str(e)}")
-        return jsonify({"error": f"Error processing repo summary: {str(e)}"})
+        logging.error(f"Error refreshing repo summary: {str(e)}")
+        return jsonify({"error": f"Error refreshing repo summary: {str(e)}"})
 
 def allowed_file(filename):
     allowed_extensions = {'py', 'txt', 'md'}
@@ -125,6 +447,8 @@ def allowed_file(filename):
 
 #
 if __name__ == "__main__":
+    if config.STARTUP_WARMUP:
+        warm_up()
     app.run(debug=True)
 
 # if __name__ == "__main__":
@@ -0,0 +1,79 @@
+"""
+Compares CodeAnalyzer.extract_functions_and_classes against the previous ast.walk + ast.unparse
+implementation on synthetic large files.
+
+    python -m benchmarks.analyzer_benchmark [--classes 200] [--methods 20] [--repeat 3]
+"""
+import argparse
+import ast
+import time
+
+from components.analyzer import CodeAnalyzer
+
+
+def legacy_extract(code):
+    """The pre-NodeVisitor implementation: one ast.walk per function plus ast.unparse per symbol."""
+    functions, classes, relations = [], [], []
+    tree = ast.parse(code.strip())
+    current_class = None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef):
+            function_code = ast.unparse(node)
+            functions.append((f"{current_class}.{node.name}" if current_class else node.name, function_code))
+            for inner_node in ast.walk(node):
+                if isinstance(inner_node, ast.Call) and isinstance(inner_node.func, ast.Name):
+                    relations.append((node.name, inner_node.func.id))
+        elif isinstance(node, ast.ClassDef):
+            classes.append((node.name, ast.unparse(node)))
+            current_class = node.name
+    return functions, classes, relations
+
+
+def make_source(num_classes, num_methods):
+    lines = ["import os", ""]
+    for c in range(num_classes):
+        lines.append(f"class Component{c}:")
+        for m in range(num_methods):
+            lines.extend([
+                f"    def method_{m}(self, value, scale=2):",
+                f"        # Method {m} of component {c}",
+                "        total = 0",
+                "        for i in range(value):",
+                f"            total += self.method_{(m + 1) % num_methods}(i) if i > 10 else helper(i) * scale",
+                "        def inner(x):",
+                "            return os.path.join(str(x), 'out')",
+                "        return inner(total)",
+                "",
+            ])
+    lines.extend(["def helper(x):", "    return x * 2", ""])
+    return "\n".join(lines)
+
+
+def best_of(fn, code, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(code)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classes", type=int, default=200)
+    parser.add_argument("--methods", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    analyzer = CodeAnalyzer()
+    for scale in (0.1, 0.5, 1.0):
+        num_classes = max(1, int(args.classes * scale))
+        code = make_source(num_classes, args.methods)
+        legacy = best_of(legacy_extract, code, args.repeat)
+        current = best_of(analyzer.extract_functions_and_classes, code, args.repeat)
+        print(f"{code.count(chr(10)):>8} lines  legacy {legacy * 1000:9.1f} ms  "
+              f"visitor {current * 1000:9.1f} ms  speedup {legacy / current:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares CompactGraph against networkx DiGraph on a component-graph-like random digraph: memory held by the
+graph (tracemalloc) and the time to build it, break its cycles, sort it topologically, find its strongly
+connected components and compute degree centrality.
+
+    python -m benchmarks.compact_graph_benchmark [--nodes 50000] [--edges 150000] [--back-edges 0.01]
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+import networkx as nx
+
+from components.compact_graph import CompactGraph
+from components.graph_algorithms import break_cycles, topological_order
+
+
+def make_edges(num_nodes, num_edges, back_edges, seed=0):
+    """Names and weighted edges: mostly forward edges (a DAG) plus a fraction of back edges creating cycles."""
+    rng = random.Random(seed)
+    names = [f"module_{i % 500}.Symbol{i}" for i in range(num_nodes)]
+    edges = []
+    for _ in range(num_edges):
+        u, v = sorted(rng.sample(range(num_nodes), 2))
+        if rng.random() < back_edges:
+            u, v = v, u
+        edges.append((u, v, rng.randint(1, 5)))
+    return names, edges
+
+
+def build_networkx(names, edges):
+    G = nx.DiGraph()
+    G.add_nodes_from((name, {"type": "function"}) for name in names)
+    G.add_edges_from((names[u], names[v], {"weight": w}) for u, v, w in edges)
+    return G
+
+
+def build_compact(names, edges):
+    sources, targets, weights = zip(*edges)
+    return CompactGraph.from_edges(names, sources, targets, {"weight": weights}, {"type": ["function"] * len(names)})
+
+
+def measure(build, *args):
+    """Returns (graph, seconds, bytes allocated and still held by the graph)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    graph = build(*args)
+    elapsed = time.perf_counter() - start
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return graph, elapsed, held
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=50000)
+    parser.add_argument("--edges", type=int, default=150000)
+    parser.add_argument("--back-edges", type=float, default=0.01, help="fraction of edges pointing backwards")
+    args = parser.parse_args()
+
+    names, edges = make_edges(args.nodes, args.edges, args.back_edges)
+    print(f"{args.nodes} nodes, {args.edges} edges")
+
+    G, nx_build, nx_bytes = measure(build_networkx, names, edges)
+    C, compact_build, compact_bytes = measure(build_compact, names, edges)
+
+    nx_sccs, nx_scc = timed(lambda: sum(1 for _ in nx.strongly_connected_components(G)))
+    (_, compact_sccs), compact_scc = timed(C.strongly_connected_components)
+    nx_dropped, nx_break = timed(break_cycles, G)
+    (C, compact_dropped), compact_break = timed(C.break_cycles)
+    nx_order, nx_sort = timed(topological_order, G)
+    compact_order, compact_sort = timed(C.topological_order)
+    _, nx_degree = timed(nx.degree_centrality, G)
+    _, compact_degree = timed(C.degree_centrality)
+    _, convert = timed(C.to_networkx)
+
+    assert nx_sccs == compact_sccs and len(nx_dropped) == len(compact_dropped) and nx_order == compact_order
+    print(f"{'':<22}{'networkx':>12}{'compact':>12}")
+    print(f"{'graph memory (MB)':<22}{nx_bytes / 2 ** 20:12.1f}{compact_bytes / 2 ** 20:12.1f}"
+          f"  (arrays alone {C.nbytes / 2 ** 20:.1f} MB)")
+    for label, a, b in (("build (s)", nx_build, compact_build), ("SCC (s)", nx_scc, compact_scc),
+                        ("break cycles (s)", nx_break, compact_break), ("topological sort (s)", nx_sort, compact_sort),
+                        ("degree centrality (s)", nx_degree, compact_degree)):
+        print(f"{label:<22}{a:12.3f}{b:12.3f}")
+    print(f"{compact_sccs} SCCs, {len(compact_dropped)} edges dropped, to_networkx for rendering {convert:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Throughput of concurrent callers embedding small requests: every caller running the model itself against all of
+them sharing one EmbeddingServer that merges their requests into micro-batches. By default the model is simulated
+(one forward pass at a time, costing --call-ms plus --snippet-ms per snippet); --model loads the real one.
+
+    python -m benchmarks.embedding_service_benchmark [--callers 8] [--requests 40] [--snippets 4] [--model]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from components.embedding_service import EmbeddingClient, EmbeddingServer
+
+
+class SimulatedModel:
+    """Stands in for EmbeddingGenerator: forward passes are serialized, as they compete for the same cores."""
+
+    hidden_size = 8
+    store_name = "simulated"
+
+    def __init__(self, call_ms, snippet_ms):
+        self.call_ms = call_ms
+        self.snippet_ms = snippet_ms
+        self.lock = threading.Lock()
+
+    def embed_texts(self, texts, batch_size=None):
+        with self.lock:
+            time.sleep((self.call_ms + self.snippet_ms * len(texts)) / 1000)
+        return np.array([[len(text)] * self.hidden_size for text in texts], dtype=np.float32)
+
+
+def run_callers(embed_texts, callers, requests, snippets):
+    """Each caller thread embeds `requests` requests of `snippets` snippets. Returns (seconds, mean latency)."""
+    latencies = []
+
+    def caller(index):
+        for request in range(requests):
+            texts = [f"def f_{index}_{request}_{i}(): return {i}" for i in range(snippets)]
+            start = time.perf_counter()
+            matrix = embed_texts(texts)
+            latencies.append(time.perf_counter() - start)
+            assert matrix.shape[0] == len(texts) and matrix[0][0] == len(texts[0])
+
+    threads = [threading.Thread(target=caller, args=(index,)) for index in range(callers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sum(latencies) / len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=8, help="concurrent callers (app worker threads)")
+    parser.add_argument("--requests", type=int, default=40, help="requests per caller")
+    parser.add_argument("--snippets", type=int, default=4, help="snippets per request")
+    parser.add_argument("--call-ms", type=float, default=10.0, help="simulated fixed cost of a forward pass")
+    parser.add_argument("--snippet-ms", type=float, default=0.5, help="simulated cost per snippet")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--model", action="store_true", help="use the real EmbeddingGenerator")
+    args = parser.parse_args()
+
+    if args.model:
+        from components.embedding_generator import EmbeddingGenerator
+        model = EmbeddingGenerator(use_store=False)
+    else:
+        model = SimulatedModel(args.call_ms, args.snippet_ms)
+    total = args.callers * args.requests * args.snippets
+
+    elapsed, latency = run_callers(model.embed_texts, args.callers, args.requests, args.snippets)
+    print(f"  {'independent':<12} {total / elapsed:10.0f} snippets/s   mean latency {latency * 1000:7.1f} ms")
+
+    address = os.path.join(tempfile.gettempdir(), f"embedding-benchmark-{os.getpid()}.sock")  # Removed on exit
+    server = EmbeddingServer(model, address, max_wait=args.max_wait_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    while not os.path.exists(address):
+        time.sleep(0.01)
+    client = EmbeddingClient(address, use_store=False, autostart=False)
+
+    elapsed, latency = run_callers(client.embed_texts, args.callers, args.requests, args.snippets)
+    print(f"  {'shared':<12} {total / elapsed:10.0f} snippets/s   mean latency {latency * 1000:7.1f} ms")
+    stats = client.stats()
+    print(f"{stats['batches']} batches, {stats['mean_batch_requests']:.1f} requests / "
+          f"{stats['mean_batch_texts']:.1f} snippets per batch, max queue depth {stats['max_queue_depth']}")
+
+
+if __name__ == "__main__":
+    main()
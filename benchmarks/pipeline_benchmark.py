@@ -0,0 +1,86 @@
+"""
+Compares phased ingestion (fetch every file, then parse, then embed) against the streaming IngestionPipeline on a
+local source tree, with a simulated per-file download latency and a simulated per-snippet model cost so the
+overlap between the stages is visible without network access or a model. Both runs must give the same results.
+
+    python -m benchmarks.pipeline_benchmark [path] [--fetch-ms 5] [--embed-ms 2]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.symbol_table_benchmark import NullCache
+from components.local_repository import LocalRepository
+from components.pipeline import IngestionPipeline
+
+
+class SlowRepository(LocalRepository):
+    """Local repository whose files arrive after fetch_ms each, as blobs downloaded one by one would."""
+
+    def __init__(self, path, fetch_ms):
+        super().__init__(path, cache=NullCache())
+        self.fetch_ms = fetch_ms
+
+    def iter_files(self, dir_path=''):
+        for item in super().iter_files(dir_path):
+            time.sleep(self.fetch_ms / 1000)
+            yield item
+
+    def fetch_files_from_directory(self, dir_path=''):
+        files = sum(1 for _ in LocalRepository(self.source, cache=NullCache()).iter_files(dir_path))
+        time.sleep(files * self.fetch_ms / 1000)
+        return super().fetch_files_from_directory(dir_path)
+
+
+class SimulatedEmbedder:
+    """Deterministic embeddings costing embed_ms per snippet, the way model inference scales with batch size."""
+
+    def __init__(self, embed_ms):
+        self.embed_ms = embed_ms
+
+    def embed_snippets(self, texts):
+        time.sleep(self.embed_ms * len(texts) / 1000)
+        matrix = np.array([[len(text), sum(text.encode("utf-8")) % 9973] for text in texts], dtype=np.float32)
+        return np.arange(len(texts)), matrix
+
+    def generate_embeddings_batch(self, code_snippets):
+        code_snippets = list(code_snippets)
+        rows, matrix = self.embed_snippets([snippet for _, _, snippet in code_snippets])
+        return {file_name: np.asarray(matrix[row]) for (file_name, _, _), row in zip(code_snippets, rows)}
+
+
+def phased(path, fetch_ms, embed_ms):
+    repo = SlowRepository(path, fetch_ms)
+    functions, classes, metadata_files = repo.fetch_files_from_directory()
+    return functions, classes, metadata_files, SimulatedEmbedder(embed_ms).generate_embeddings_batch(functions)
+
+
+def streamed(path, fetch_ms, embed_ms):
+    return IngestionPipeline(SlowRepository(path, fetch_ms), SimulatedEmbedder(embed_ms)).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=os.path.join(os.path.dirname(os.__file__), "asyncio"),
+                        help="source tree (default: the stdlib asyncio package)")
+    parser.add_argument("--fetch-ms", type=float, default=5.0, help="simulated download time per file")
+    parser.add_argument("--embed-ms", type=float, default=2.0, help="simulated model time per snippet")
+    args = parser.parse_args()
+
+    results = {}
+    for label, ingest in (("phased", phased), ("streamed", streamed)):
+        start = time.perf_counter()
+        results[label] = ingest(args.path, args.fetch_ms, args.embed_ms)
+        print(f"  {label:<10} {time.perf_counter() - start:8.2f} s")
+
+    (functions, classes, metadata, embeddings), (s_functions, s_classes, s_metadata, s_embeddings) = results.values()
+    assert list(functions) == list(s_functions) and list(classes) == list(s_classes) and metadata == s_metadata
+    assert embeddings.keys() == s_embeddings.keys()
+    assert all(np.array_equal(embeddings[name], s_embeddings[name]) for name in embeddings)
+    print(f"{len(functions)} functions, {len(classes)} classes, {len(embeddings)} embedded files: identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Times the graph layouts and renderers at 1k and 10k nodes: layered layout of a component-style DAG,
+Barnes-Hut force layout of a k-NN-style graph, then SVG / JSON / PNG output from the cached layout.
+Optionally compares against networkx spring_layout (slow at 10k nodes).
+
+    python -m benchmarks.render_benchmark [--sizes 1000 10000] [--degree 3] [--spring]
+"""
+import argparse
+import time
+
+import networkx as nx
+import numpy as np
+
+from components.graph_renderer import GraphRenderer, force_layout, layered_layout
+
+
+def make_dag(n, degree, seed=0):
+    """Component-graph-like DAG: classes (first tenth of the nodes) pointing at functions."""
+    rng = np.random.default_rng(seed)
+    G = nx.DiGraph()
+    num_classes = max(1, n // 10)
+    G.add_nodes_from((f"Class{i}", {"type": "class"}) for i in range(num_classes))
+    G.add_nodes_from((f"func_{i}", {"type": "function"}) for i in range(n - num_classes))
+    for i in range(n - num_classes):
+        for c in rng.integers(0, num_classes, degree):
+            G.add_edge(f"Class{c}", f"func_{i}", weight=1)
+    return G
+
+
+def make_knn(n, degree, seed=0):
+    """k-NN-graph-like digraph: every node points at `degree` neighbours of a random embedding."""
+    rng = np.random.default_rng(seed)
+    G = nx.DiGraph()
+    G.add_nodes_from(f"file_{i}.py" for i in range(n))
+    for i in range(n):
+        for j in rng.integers(0, n, degree):
+            if i != j:
+                G.add_edge(f"file_{i}.py", f"file_{j}.py", weight=0.5, similarity=0.5)
+    return G
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--degree", type=int, default=3)
+    parser.add_argument("--spring", action="store_true", help="also time networkx spring_layout")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        dag, knn = make_dag(n, args.degree), make_knn(n, args.degree)
+        _, layered = timed(layered_layout, dag)
+        _, force = timed(force_layout, knn)
+        line = f"{n:>7} nodes  layered {layered * 1000:8.1f} ms  force (Barnes-Hut) {force * 1000:9.1f} ms"
+        if args.spring:
+            _, spring = timed(nx.spring_layout, knn.to_undirected())
+            line += f"  spring_layout {spring * 1000:9.1f} ms"
+        print(line)
+
+        renderer = GraphRenderer()
+        for name, G in (("dag", dag), ("knn", knn)):
+            _, first = timed(renderer.layout, G)
+            _, cached = timed(renderer.layout, G)
+            _, svg = timed(renderer.to_svg, G)
+            _, payload = timed(renderer.to_json_bytes, G)
+            _, png = timed(renderer.to_png, G)
+            print(f"         {name}: layout {first * 1000:8.1f} ms (cached {cached * 1000:6.1f} ms)  "
+                  f"svg {svg * 1000:7.1f} ms  json {payload * 1000:7.1f} ms  png {png * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Import time of the app and its components, each measured in a fresh interpreter with -X importtime, and a check
+that none of the heavy dependencies (torch, transformers, matplotlib, graphviz, sklearn) is imported at startup.
+Exits with status 1 if one is, so it can guard against regressions in CI.
+
+    python -m benchmarks.startup_benchmark [module ...] [--repeat 3] [--top 10]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ("torch", "transformers", "matplotlib", "graphviz", "sklearn")
+DEFAULT_TARGETS = ["config", "components.graph_handler", "components.graph_renderer", "components.rag_handler",
+                   "components.embedding_service", "app"]
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module):
+    """
+    Imports module in a fresh interpreter. Returns ({module: cumulative microseconds}, error); the profile holds
+    every module imported along the way.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=PROJECT_ROOT, capture_output=True, text=True)
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (field.strip() for field in line[len("import time:"):].split("|"))
+        profile[name.strip()] = int(cumulative)
+    error = result.stderr.strip().splitlines()[-1] if result.returncode else None
+    return profile, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_TARGETS)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per module (the fastest is reported)")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports listed for the last module")
+    args = parser.parse_args()
+
+    regressions = []
+    last = None  # (module, profile) of the last module that imported
+    print(f"{'module':<32}{'import (ms)':>12}  heavy modules imported")
+    for module in args.modules:
+        runs = [import_profile(module) for _ in range(max(1, args.repeat))]
+        profile, error = min(runs, key=lambda run: run[0].get(module, float("inf")))
+        if error:
+            print(f"{module:<32}{'-':>12}  unavailable here: {error}")
+            continue
+        heavy = sorted({name.split(".")[0] for name in profile} & set(HEAVY_MODULES))
+        print(f"{module:<32}{profile[module] / 1000:12.1f}  {', '.join(heavy) or '-'}")
+        if heavy:
+            regressions.append(module)
+        last = module, profile
+
+    if last is not None:
+        module, profile = last
+        print(f"\nSlowest imports of {module} (cumulative ms):")
+        imported = {name: micros for name, micros in profile.items() if name != module}
+        for name, micros in sorted(imported.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {name:<30}{micros / 1000:10.1f}")
+
+    if regressions:
+        print(f"\nHeavy dependencies imported at startup by: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares the memory held after ingesting a local source tree: the previous layout (raw text per file, function
+and class code strings per file, and the (file_name, name, code) lists handed to the graph and RAG handlers)
+against the shared SymbolTable with its SymbolView lists. Call relations are kept in both.
+
+    python -m benchmarks.symbol_table_benchmark [path] [--copies 20]
+"""
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+
+from components.analyzer import CodeAnalyzer
+from components.local_repository import LocalRepository
+
+
+class NullCache:
+    """Keeps the on-disk cache out of the measurement."""
+
+    def get(self, key):
+        return None
+
+    def get_object(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def set_object(self, key, value):
+        pass
+
+
+def read_sources(root, copies):
+    """(path, text) of every Python file under root, repeated `copies` times under distinct prefixes."""
+    files = []
+    for directory, _, names in os.walk(root):
+        for name in sorted(names):
+            if name.endswith(".py"):
+                with open(os.path.join(directory, name), encoding="utf-8", errors="replace") as f:
+                    files.append((os.path.relpath(os.path.join(directory, name), root), f.read()))
+    return [(f"copy{i}/{path}", text) for i in range(copies) for path, text in files]
+
+
+def legacy_ingest(files):
+    file_cache = {path: text.encode("utf-8").decode("utf-8") for path, text in files}  # Decoded per repository
+    analyses = CodeAnalyzer().analyze_files(files, max_workers=1)
+    function_cache = {path: analyses[path][0] for path in file_cache}
+    class_cache = {path: analyses[path][1] for path in file_cache}
+    relation_cache = {path: analyses[path][2] for path in file_cache}
+    functions = [(path.rsplit("/", 1)[-1], *entry) for path in file_cache for entry in function_cache[path]]
+    classes = [(path.rsplit("/", 1)[-1], *entry) for path in file_cache for entry in class_cache[path]]
+    return file_cache, function_cache, class_cache, relation_cache, functions, classes
+
+
+def symbol_table_ingest(files):
+    repo = LocalRepository(os.getcwd(), cache=NullCache())
+    repo._analyze_pending({path: (None, text) for path, text in files})  # Keeps relation_cache, as before
+    function_rows, class_rows, metadata = [], [], []
+    for path, _ in files:
+        repo._collect_file(path, path.rsplit("/", 1)[-1], None, None, function_rows, class_rows, metadata)
+    return repo, repo.symbols.view(function_rows), repo.symbols.view(class_rows)
+
+
+def measure(ingest, files):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = ingest(files)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, held, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=os.path.join(os.path.dirname(os.__file__), "asyncio"),
+                        help="source tree (default: the stdlib asyncio package)")
+    parser.add_argument("--copies", type=int, default=20, help="ingest the tree this many times to scale it up")
+    args = parser.parse_args()
+
+    files = read_sources(args.path, args.copies)
+    print(f"{len(files)} files, {sum(len(text) for _, text in files) / 2 ** 20:.1f} MB of source text")
+
+    legacy, legacy_time, legacy_held, legacy_peak = measure(legacy_ingest, files)
+    del legacy
+    (repo, functions, classes), table_time, table_held, table_peak = measure(symbol_table_ingest, files)
+    print(f"{'':<20}{'held (MB)':>12}{'peak (MB)':>12}{'time (s)':>12}")
+    print(f"{'strings and tuples':<20}{legacy_held / 2 ** 20:12.1f}{legacy_peak / 2 ** 20:12.1f}{legacy_time:12.2f}")
+    print(f"{'symbol table':<20}{table_held / 2 ** 20:12.1f}{table_peak / 2 ** 20:12.1f}{table_time:12.2f}")
+    print(f"{len(repo.symbols)} symbols ({len(functions)} functions, {len(classes)} classes), "
+          f"sources and columns {repo.symbols.nbytes / 2 ** 20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,251 @@
 import ast
 import logging
+import multiprocessing
+import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import config
+
+# A function or class found by the analyzer. `name` is the qualified name (e.g. "Outer.method"),
+# line/column fields are the AST span and `start`/`end` are byte offsets into the UTF-8 source.
+Symbol = namedtuple("Symbol", "kind name lineno col_offset end_lineno end_col_offset start end")
+
+_NEWLINE = re.compile(rb"\r\n|\r|\n")  # Line ends as ast counts them, so lineno maps to an offset
+
+
+class _SymbolVisitor(ast.NodeVisitor):
+    """
+    Single pass over the module AST collecting functions, classes and call edges.
+    """
+
+    def __init__(self, line_offsets):
+        self.line_offsets = line_offsets
+        self.scopes = []  # Stack of (kind, qualified_name)
+        self.symbols = []
+        self.relations = []  # (caller_qualified_name, callee)
+
+    def _qualify(self, name):
+        return f"{self.scopes[-1][1]}.{name}" if self.scopes else name
+
+    def _enclosing_class(self):
+        for kind, name in reversed(self.scopes):
+            if kind == "class":
+                return name
+        return None
+
+    def _add_symbol(self, kind, node):
+        # Decorators sit on earlier lines at the same indentation as the def/class keyword
+        first_line = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+        start = self.line_offsets[first_line - 1] + node.col_offset
+        end = self.line_offsets[node.end_lineno - 1] + node.end_col_offset
+        qualified_name = self._qualify(node.name)
+        self.symbols.append(Symbol(kind, qualified_name, first_line, node.col_offset,
+                                   node.end_lineno, node.end_col_offset, start, end))
+        return qualified_name
+
+    def visit_ClassDef(self, node):
+        qualified_name = self._add_symbol("class", node)
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.scopes.append(("class", qualified_name))
+        for child in node.body:
+            self.visit(child)
+        self.scopes.pop()
+
+    def visit_FunctionDef(self, node):
+        qualified_name = self._add_symbol("function", node)
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)  # Default values are evaluated in the enclosing scope
+        self.scopes.append(("function", qualified_name))
+        for child in node.body:
+            self.visit(child)
+        self.scopes.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Call(self, node):
+        caller = next((name for kind, name in reversed(self.scopes) if kind == "function"), None)
+        if caller is not None:
+            callee = self._resolve_callee(node.func)
+            if callee:
+                self.relations.append((caller, callee))
+        self.generic_visit(node)
+
+    def _resolve_callee(self, func):
+        """
+        Resolves `f()`, `self.f()` / `cls.f()` (to "Class.f") and dotted `module.f()` calls.
+        """
+        if isinstance(func, ast.Name):
+            return func.id
+        if not isinstance(func, ast.Attribute):
+            return None
+
+        parts = [func.attr]
+        value = func.value
+        while isinstance(value, ast.Attribute):
+            parts.append(value.attr)
+            value = value.value
+        if not isinstance(value, ast.Name):
+            return None
+
+        if value.id in ("self", "cls") and len(parts) == 1:
+            enclosing_class = self._enclosing_class()
+            if enclosing_class:
+                return f"{enclosing_class}.{func.attr}"
+        parts.append(value.id)
+        return ".".join(reversed(parts))
+
+
+def _parse_chunk(chunk):
+    """
+    Process pool entry point: parses a chunk of (key, code) pairs and returns compact
+    (key, symbols, relations) records that carry byte spans instead of code text.
+    """
+    analyzer = CodeAnalyzer()
+    records = []
+    for key, code in chunk:
+        try:
+            _, symbols, relations = analyzer.extract_symbols(code)
+        except Exception as e:
+            logging.error(f"Error while parsing {key}: {e}")
+            symbols, relations = [], []
+        records.append((key, symbols, relations))
+    return records
+
+
+def _chunk_files(files, workers):
+    """
+    Groups files into contiguous chunks of roughly equal source size (about four per worker),
+    so each task amortizes its IPC round-trip over many files.
+    """
+    total_bytes = sum(len(code) for _, code in files)
+    target = max(config.PARSE_CHUNK_MIN_BYTES, total_bytes // (workers * 4))
+
+    chunk, chunk_bytes = [], 0
+    for key, code in files:
+        chunk.append((key, code))
+        chunk_bytes += len(code)
+        if chunk_bytes >= target:
+            yield chunk
+            chunk, chunk_bytes = [], 0
+    if chunk:
+        yield chunk
+
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool(workers):
+    """
+    Returns the process pool shared by all requests in this process, created on first use.
+    Workers are started from a fork server (spawned where there is none), never forked from the app process:
+    a fork copies its threads' locks in whatever state they are, and its memory (the model, caches).
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+        return _process_pool
+
+
+def _reset_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
 
 
 class CodeAnalyzer:
+    VERSION = "4"  # Bump whenever the extracted output changes, so cached analyses are invalidated
+
     def __init__(self):
         pass
+
+    def extract_symbols(self, code):
+        """
+        Parse Python code once and return its symbols with source spans.
+        Returns:
+            source: the UTF-8 encoded code the spans refer to
+            symbols: list of Symbol records in source order
+            relations: list of tuples (caller_function, callee_function)
+        Raises SyntaxError / ValueError for unparsable input.
+        """
+        if not isinstance(code, str):
+            raise ValueError("Code is not a valid string.")
+        if not code.strip():
+            raise ValueError("Code is empty after stripping whitespace.")
+
+        tree = ast.parse(code)
+        source = code.encode("utf-8")
+        line_offsets = [0] + [match.end() for match in _NEWLINE.finditer(source)]
+
+        visitor = _SymbolVisitor(line_offsets)
+        visitor.visit(tree)
+        return source, visitor.symbols, visitor.relations
+
+    def analyze_sources(self, files, max_workers=None):
+        """
+        Analyze many files at once, fanning out to a process pool sized to the host for large batches.
+        files: list of (key, code) pairs.
+        Returns {key: (source, symbols, relations)} as extract_symbols does (unparsable files have no symbols),
+        so callers can keep byte spans into the source instead of code strings.
+        """
+        files = [(key, code) for key, code in files if isinstance(code, str)]
+        workers = max_workers or config.PARSE_WORKERS or os.cpu_count() or 1
+
+        if workers <= 1 or len(files) < config.PARALLEL_PARSE_MIN_FILES:
+            records = _parse_chunk(files)
+        else:
+            records = []
+            try:
+                for chunk_records in _get_process_pool(workers).map(_parse_chunk, _chunk_files(files, workers)):
+                    records.extend(chunk_records)
+            except BrokenProcessPool as e:
+                logging.warning(f"Parse worker pool failed ({e}), parsing in-process")
+                _reset_process_pool()
+                records = _parse_chunk(files)
+
+        # ✅ Workers only return spans; the source is encoded here from the text we already hold
+        code_by_key = dict(files)
+        return {key: (code_by_key[key].encode("utf-8"), symbols, relations) for key, symbols, relations in records}
+
+    def analyze_files(self, files, max_workers=None):
+        """
+        Same as analyze_sources, returning {key: (functions, classes, relations)} in the format of
+        extract_functions_and_classes.
+        """
+        results = {}
+        for key, (source, symbols, relations) in self.analyze_sources(files, max_workers).items():
+            functions, classes = self._split_symbols(source, symbols)
+            results[key] = (functions, classes, relations)
+        return results
+
+    def _split_symbols(self, source, symbols):
+        functions = []
+        classes = []
+        for symbol in symbols:
+            symbol_code = source[symbol.start:symbol.end].decode("utf-8")
+            if symbol.kind == "class":
+                classes.append((symbol.name, symbol_code))
+            else:
+                functions.append((symbol.name, symbol_code))
+        return functions, classes
+
     def extract_functions_and_classes(self, code):
         """
         Extract functions, classes, and their relations from the provided Python code using AST.
+        Code text is sliced from the original source, so methods are not re-serialized per class.
         Returns:
-            functions: list of tuples (function_name, function_code)
-            classes: list of tuples (class_name, class_code)
+            functions: list of tuples (qualified_function_name, function_code)
+            classes: list of tuples (qualified_class_name, class_code)
             relations: list of tuples (caller_function, callee_function)
         """
         functions = []
@@ -18,46 +253,8 @@ class CodeAnalyzer:
         relations = []  # To store the relationships between functions
 
         try:
-            # Ensure code is a valid string and not empty
-            if isinstance(code, str):
-                code = code.strip()  # Remove leading/trailing whitespace
-
-                if not code:
-                    raise ValueError("Code is empty after stripping whitespace.")
-
-                # Parse the Python code into an AST (Abstract Syntax Tree)
-                tree = ast.parse(code)
-            else:
-                raise ValueError("Code is not a valid string.")
-
-            current_class = None  # Track the current class while traversing AST
-
-            # Walk through the AST to find functions, classes, and relationships
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):  # Function node
-                    function_code = ast.unparse(node)  # Get the actual function code
-
-                    # Add function with or without class prefix
-                    if current_class:
-                        functions.append((f"{current_class}.{node.name}", function_code))
-                    else:
-                        functions.append((node.name, function_code))
-
-                    # Check for function calls inside this function
-                    for inner_node in ast.walk(node):
-                        if isinstance(inner_node, ast.Call):  # Function call within the function
-                            if isinstance(inner_node.func, ast.Name):  # Ensure it's a function call
-                                called_function = inner_node.func.id
-                                relations.append((node.name, called_function))
-
-                elif isinstance(node, ast.ClassDef):  # Class node
-                    class_code = ast.unparse(node)  # Get the actual class code
-                    classes.append((node.name, class_code))
-                    current_class = node.name  # Set the current class as we are inside this class
-                else:
-                    # Handle closing the current class scope
-                    if isinstance(node, ast.FunctionDef):
-                        current_class = None  # No longer in a class after the function is finished
+            source, symbols, relations = self.extract_symbols(code)
+            functions, classes = self._split_symbols(source, symbols)
 
         except SyntaxError as e:
             logging.error(f"SyntaxError while parsing code: {e}")
@@ -70,5 +267,3 @@ class CodeAnalyzer:
             return functions, classes, relations
 
         return functions, classes, relations
-
-
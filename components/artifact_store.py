@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+import config
+
+ARTIFACT_NAME = re.compile(r"^([0-9a-f]{64})\.(png|svg|json)$")
+ARTIFACT_MIMETYPES = {"png": "image/png", "svg": "image/svg+xml", "json": "application/json"}
+
+
+def graph_fingerprint(G, **options):
+    """
+    Content hash of a graph (nodes, edges and their attributes) together with the render options.
+    Equal graphs rendered the same way always get the same fingerprint, independent of insertion order.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(_attributes(G.graph).encode("utf-8"))
+    nodes = sorted(f"{node}\x1f{_attributes(attrs)}" for node, attrs in G.nodes(data=True))
+    digest.update("\x1e".join(nodes).encode("utf-8", errors="surrogatepass"))
+    edges = sorted(f"{source}\x1f{target}\x1f{_attributes(attrs)}" for source, target, attrs in G.edges(data=True))
+    digest.update(b"\x1d" + "\x1e".join(edges).encode("utf-8", errors="surrogatepass"))
+    return digest.hexdigest()
+
+
+def _attributes(attrs):
+    return repr(sorted(attrs.items())) if len(attrs) > 1 else repr(tuple(attrs.items()))
+
+
+class ArtifactStore:
+    def __init__(self, root, max_bytes):
+        """
+        Content-addressed files (rendered graphs and diagrams) named <sha256>.<ext>, with LRU eviction above max_bytes.
+        A key fully determines the content, so artifacts never change and can be cached by clients forever.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total_bytes = self._current_size()
+
+    def path(self, key, ext):
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def url(self, key, ext):
+        return f"/artifacts/{key}.{ext}"
+
+    def get_or_create(self, key, ext, render):
+        """
+        Returns the URL of artifact key, calling render() → bytes only if it is not stored yet.
+        """
+        path = self.path(key, ext)
+        if os.path.exists(path):
+            self.hits += 1
+            try:
+                os.utime(path)  # Mark as recently used
+            except OSError:
+                pass
+            return self.url(key, ext)
+
+        self.misses += 1
+        data = render()
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)  # Atomic, so readers never see a partial artifact
+
+        with self._lock:
+            self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict(keep=path)
+        return self.url(key, ext)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if ARTIFACT_NAME.match(name):
+                try:
+                    stat = os.stat(os.path.join(self.root, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _current_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self, keep):
+        """
+        Deletes the least recently used artifacts until the store is back under 90% of its cap.
+        Called with the lock held.
+        """
+        entries = sorted(self._entries())  # Other processes may have written too
+        self._total_bytes = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+
+        evicted = 0
+        for _, size, name in entries:
+            if self._total_bytes <= target:
+                break
+            path = os.path.join(self.root, name)
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._total_bytes -= size
+            evicted += 1
+        logging.info(f"Evicted {evicted} artifacts from {self.root}")
+
+
+_artifact_store = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """
+    Returns the process-wide artifact store.
+    """
+    global _artifact_store
+    with _artifact_store_lock:
+        if _artifact_store is None:
+            _artifact_store = ArtifactStore(os.path.join(config.CACHE_DIR, "artifacts"), config.ARTIFACT_STORE_MAX_BYTES)
+        return _artifact_store
@@ -0,0 +1,187 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+
+class DiskCache:
+    def __init__(self, path, max_bytes):
+        """
+        Size-bounded key/value store backed by SQLite with LRU eviction.
+        Entries survive process restarts and are shared by every worker on the host.
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.commit()
+        self._total_bytes = self._current_size()
+
+    def get(self, key):
+        """
+        Returns the stored bytes for key (marking it as recently used), or None.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key, value):
+        """
+        Stores bytes under key and evicts least recently used entries above max_bytes.
+        """
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # ✅ Replacing an entry only grows the store by the difference
+            row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            old_size = row[0] if row is not None else 0
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), size, time.time())
+            )
+            self._conn.commit()
+            self._total_bytes += size - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def get_object(self, key):
+        value = self.get(key)
+        if value is None:
+            return None
+        try:
+            return pickle.loads(value)
+        except Exception as e:
+            logging.warning(f"Dropping unreadable cache entry {key}: {e}")
+            self.delete(key)
+            return None
+
+    def set_object(self, key, obj):
+        self.set(key, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def delete(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+            if row is not None:
+                self._total_bytes -= row[0]
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+    def _current_size(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self):
+        """
+        Drops the least recently used entries until the store is back under 90% of its cap.
+        Called with the lock held.
+        """
+        self._total_bytes = self._current_size()  # Other processes may have written too
+        target = int(self.max_bytes * 0.9)
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        freed = 0
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if self._total_bytes - freed <= target:
+                break
+            evicted.append((key,))
+            freed += size
+
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._conn.commit()
+        self._total_bytes -= freed
+        logging.info(f"Evicted {len(evicted)} entries ({freed} bytes) from {self.path}")
+
+
+class LRUCache:
+    def __init__(self, max_entries):
+        """
+        Thread-safe in-memory LRU map, used as the fast tier in front of a DiskCache.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "max_entries": self.max_entries}
+
+
+_file_cache = None
+_file_cache_lock = threading.Lock()
+
+
+def get_file_cache():
+    """
+    Returns the process-wide cache for file contents and analysis results.
+    """
+    global _file_cache
+    with _file_cache_lock:
+        if _file_cache is None:
+            _file_cache = DiskCache(os.path.join(config.CACHE_DIR, "files.sqlite3"), config.FILE_CACHE_MAX_BYTES)
+        return _file_cache
+
+
+_llm_caches = None
+
+
+def get_llm_caches():
+    """
+    Returns the process-wide (memory, disk) tiers of the LLM response cache.
+    """
+    global _llm_caches
+    with _file_cache_lock:
+        if _llm_caches is None:
+            _llm_caches = (
+                LRUCache(config.LLM_CACHE_MEMORY_ENTRIES),
+                DiskCache(os.path.join(config.CACHE_DIR, "llm.sqlite3"), config.LLM_CACHE_MAX_BYTES),
+            )
+        return _llm_caches
@@ -0,0 +1,213 @@
+import hashlib
+import logging
+import math
+import threading
+import weakref
+from collections import deque
+
+import numpy as np
+
+import config
+from components.artifact_store import graph_fingerprint
+from components.cache import LRUCache, get_file_cache
+
+CENTRALITY_VERSION = "1"  # Bump when a scoring algorithm changes (invalidates cached scores)
+
+
+def pivot_count(num_nodes, epsilon, delta):
+    """
+    Number of pivots for which the sampled betweenness of any given node is within epsilon (additive, on the
+    normalized [0, 1] scale) of the exact value with probability at least 1 - delta (Hoeffding bound).
+    """
+    return min(num_nodes, math.ceil(math.log(2.0 / delta) / (2.0 * epsilon ** 2)))
+
+
+def select_pivots(nodes, k, seed=0):
+    """
+    The k nodes with the smallest seeded hash (a bottom-k sample). The sample is uniform, does not depend on
+    node order, and mostly survives graph edits, so cached per-pivot work stays reusable.
+    """
+    def priority(node):
+        return hashlib.blake2b(f"{seed}\x1f{node}".encode("utf-8", errors="surrogatepass"), digest_size=8).digest()
+
+    return set(sorted(nodes, key=priority)[:k])
+
+
+def single_source_dependencies(G, source):
+    """
+    Brandes' accumulation from one source over unweighted shortest paths.
+    Returns (dependencies, reached): the nonzero pair dependencies {node: delta} and the set of reachable nodes.
+    """
+    sigma = {source: 1}
+    distance = {source: 0}
+    predecessors = {source: []}
+    order = []
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        order.append(u)
+        for v in G.succ[u] if G.is_directed() else G.adj[u]:
+            if v not in distance:
+                distance[v] = distance[u] + 1
+                sigma[v] = 0
+                predecessors[v] = []
+                queue.append(v)
+            if distance[v] == distance[u] + 1:
+                sigma[v] += sigma[u]
+                predecessors[v].append(u)
+
+    dependency = dict.fromkeys(order, 0.0)
+    for w in reversed(order):
+        coefficient = (1.0 + dependency[w]) / sigma[w]
+        for u in predecessors[w]:
+            dependency[u] += sigma[u] * coefficient
+    return {node: value for node, value in dependency.items() if value and node != source}, set(order)
+
+
+class _GraphState:
+    """Per-graph intermediate results kept for incremental updates."""
+
+    def __init__(self):
+        self.edges = {}  # (u, v) -> weight
+        self.nodes = set()
+        self.pivots = {}  # pivot -> (dependencies, reached)
+        self.pagerank = {}  # node -> score
+
+
+class CentralityService:
+    def __init__(self, epsilon=config.CENTRALITY_EPSILON, delta=config.CENTRALITY_DELTA, seed=0):
+        """
+        Node centrality for large graphs: betweenness estimated from a sample of pivot sources (see pivot_count for
+        the error bound) or PageRank by power iteration. Scores are cached by graph fingerprint; when a graph object
+        is edited in place and scored again, only the pivots whose shortest-path trees contain a changed edge are
+        re-run and PageRank is warm-started from the previous vector.
+        """
+        self.epsilon = epsilon
+        self.delta = delta
+        self.seed = seed
+        self.score_cache = _get_score_cache()
+        # method -> {graph: _GraphState}, each method keeps its own edge snapshot
+        self._states = {"betweenness": weakref.WeakKeyDictionary(), "pagerank": weakref.WeakKeyDictionary()}
+        self._lock = threading.Lock()
+
+    def scores(self, G, method=config.CENTRALITY_METHOD):
+        """
+        Returns {node: score} for method "betweenness" (normalized, approximate) or "pagerank".
+        """
+        if method not in self._states:
+            raise ValueError(f"Unknown centrality method: {method}")
+        fingerprint = graph_fingerprint(G, method=method, epsilon=self.epsilon, delta=self.delta, seed=self.seed,
+                                        version=CENTRALITY_VERSION)
+        key = f"centrality:{fingerprint}"
+
+        cached = self.score_cache.get(key)
+        if cached is None:
+            cached = get_file_cache().get_object(key)
+            if cached is None:
+                with self._lock:
+                    state = self._states[method].get(G)
+                    if state is None:
+                        state = self._states[method][G] = _GraphState()
+                    if method == "betweenness":
+                        cached = self._update_betweenness(G, state)
+                    else:
+                        cached = self._update_pagerank(G, state)
+                get_file_cache().set_object(key, cached)
+            self.score_cache.set(key, cached)
+        return cached
+
+    def _diff(self, G, state):
+        """
+        Synchronizes state.nodes / state.edges with G and returns the source endpoints of added, removed or
+        re-weighted edges.
+        """
+        edges = {(u, v): data.get("weight", 1) for u, v, data in G.edges(data=True)}
+        modified = [edge for edge, weight in edges.items() if state.edges.get(edge) != weight]
+        modified += [edge for edge in state.edges if edge not in edges]
+        changed = {u for u, _ in modified}
+        if not G.is_directed():  # Either endpoint can start a path through an undirected edge
+            changed.update(v for _, v in modified)
+        state.edges = edges
+        state.nodes = set(G.nodes)
+        return changed
+
+    def _update_betweenness(self, G, state):
+        changed = self._diff(G, state)
+        n = len(state.nodes)
+        pivots = select_pivots(state.nodes, pivot_count(n, self.epsilon, self.delta), self.seed)
+
+        reused = 0
+        for pivot in list(state.pivots):
+            if pivot not in pivots or not changed.isdisjoint(state.pivots[pivot][1]):
+                del state.pivots[pivot]
+        for pivot in pivots:
+            if pivot in state.pivots:
+                reused += 1
+            else:
+                state.pivots[pivot] = single_source_dependencies(G, pivot)
+
+        scores = dict.fromkeys(G.nodes, 0.0)
+        for dependencies, _ in state.pivots.values():
+            for node, value in dependencies.items():
+                scores[node] += value
+        if n > 2 and pivots:
+            scale = n / (len(pivots) * (n - 1) * (n - 2))
+            for node in scores:
+                scores[node] *= scale
+        logging.info(f"Betweenness from {len(pivots)} pivots over {n} nodes ({reused} reused)")
+        return scores
+
+    def _update_pagerank(self, G, state, alpha=0.85, tol=1e-6, max_iter=100):
+        self._diff(G, state)
+        nodes = list(G.nodes)
+        n = len(nodes)
+        if n == 0:
+            state.pagerank = {}
+            return {}
+        index = {node: i for i, node in enumerate(nodes)}
+        sources = np.fromiter((index[u] for u, _ in state.edges), dtype=np.int64, count=len(state.edges))
+        targets = np.fromiter((index[v] for _, v in state.edges), dtype=np.int64, count=len(state.edges))
+        weights = np.fromiter(state.edges.values(), dtype=np.float64, count=len(state.edges))
+        if not G.is_directed():
+            sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+            weights = np.concatenate([weights, weights])
+        out_weight = np.bincount(sources, weights=weights, minlength=n)
+        dangling = out_weight == 0
+        transition = weights / np.where(dangling, 1.0, out_weight)[sources]
+
+        # Warm start from the previous scores of this graph
+        rank = np.array([state.pagerank.get(node, 1.0 / n) for node in nodes])
+        rank /= rank.sum()
+        for iteration in range(1, max_iter + 1):
+            spread = np.bincount(targets, weights=rank[sources] * transition, minlength=n)
+            updated = alpha * (spread + rank[dangling].sum() / n) + (1.0 - alpha) / n
+            error = np.abs(updated - rank).sum()
+            rank = updated
+            if error < n * tol:
+                break
+        logging.info(f"PageRank over {n} nodes converged in {iteration} iterations")
+        state.pagerank = dict(zip(nodes, rank.tolist()))
+        return dict(state.pagerank)
+
+
+_score_cache = None
+_service = None
+_service_lock = threading.Lock()
+
+
+def _get_score_cache():
+    global _score_cache
+    if _score_cache is None:
+        _score_cache = LRUCache(config.CENTRALITY_CACHE_ENTRIES)
+    return _score_cache
+
+
+def get_centrality_service():
+    """
+    Returns the process-wide centrality service, so incremental state survives across requests.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = CentralityService()
+        return _service
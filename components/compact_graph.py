@@ -0,0 +1,300 @@
+import heapq
+
+import networkx as nx
+import numpy as np
+
+from components.graph_algorithms import _greedy_order, log_dropped_edges
+
+MISSING = -1  # Code of a node without a value in a categorical column
+
+
+class CompactGraph:
+    def __init__(self, names, indptr, indices, edge_columns=None, node_columns=None, categories=None, graph=None):
+        """
+        Immutable directed graph over interned integer node ids: names[i] is the label of node i, and the
+        successors of i are indices[indptr[i]:indptr[i + 1]] (CSR, sorted per row, no duplicate edges).
+        edge_columns maps an attribute name to an array aligned with indices; node_columns maps an attribute
+        name to an array aligned with names, holding codes into categories[name] for categorical (string) columns.
+        Use from_edges or from_networkx to build one.
+        """
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_columns = edge_columns or {}
+        self.node_columns = node_columns or {}
+        self.categories = categories or {}
+        self.graph = graph if graph is not None else {}
+        self._reverse = None
+
+    @classmethod
+    def from_edges(cls, names, sources, targets, edge_columns=None, node_attributes=None, graph=None):
+        """
+        Builds a graph from parallel arrays of source / target ids. Repeated edges keep their last attribute
+        values (as networkx add_edge does). node_attributes maps an attribute name to a list aligned with names,
+        with None for missing values; string attributes are stored as categorical codes.
+        """
+        n = len(names)
+        sources = np.asarray(sources, dtype=np.int32)
+        targets = np.asarray(targets, dtype=np.int32)
+        edge_columns = {key: np.asarray(values) for key, values in (edge_columns or {}).items()}
+
+        # Sort by (source, target), keeping the last of each run of duplicates
+        order = np.lexsort((np.arange(len(sources)), targets, sources))
+        sources, targets = sources[order], targets[order]
+        keep = np.ones(len(sources), dtype=bool)
+        keep[:-1] = (sources[:-1] != sources[1:]) | (targets[:-1] != targets[1:])
+        order, sources, targets = order[keep], sources[keep], targets[keep]
+        edge_columns = {key: values[order] for key, values in edge_columns.items()}
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+
+        node_columns, categories = {}, {}
+        for key, values in (node_attributes or {}).items():
+            present = [value for value in values if value is not None]
+            if present and all(isinstance(value, str) for value in present):
+                categories[key] = sorted(set(present))
+                codes = {value: code for code, value in enumerate(categories[key])}
+                node_columns[key] = np.array([MISSING if value is None else codes[value] for value in values],
+                                             dtype=np.int16 if len(codes) < 2 ** 15 else np.int32)
+            else:
+                node_columns[key] = np.array([np.nan if value is None else value for value in values])
+        return cls(names, indptr, targets, edge_columns, node_columns, categories, graph)
+
+    @classmethod
+    def from_networkx(cls, G, edge_attributes=("weight",), node_attributes=("type",)):
+        """
+        Converts a networkx DiGraph, keeping the listed attributes (columns absent from every edge or node are
+        dropped; edges without a listed edge attribute get 1).
+        """
+        names = list(G.nodes)
+        index = {name: i for i, name in enumerate(names)}
+        sources = np.fromiter((index[u] for u, _ in G.edges), dtype=np.int32, count=G.number_of_edges())
+        targets = np.fromiter((index[v] for _, v in G.edges), dtype=np.int32, count=G.number_of_edges())
+        edge_columns = {
+            key: np.array([data.get(key, 1) for _, _, data in G.edges(data=True)])
+            for key in edge_attributes if any(key in data for _, _, data in G.edges(data=True))
+        }
+        node_columns = {
+            key: [G.nodes[name].get(key) for name in names]
+            for key in node_attributes if any(key in data for _, data in G.nodes(data=True))
+        }
+        return cls.from_edges(names, sources, targets, edge_columns, node_columns, dict(G.graph))
+
+    def to_networkx(self):
+        """
+        networkx DiGraph with the same nodes (in id order), edges and attributes, for rendering.
+        """
+        G = nx.DiGraph()
+        G.graph.update(self.graph)
+        node_values = {key: self.node_values(key) for key in self.node_columns}
+        G.add_nodes_from(
+            (name, {key: values[i] for key, values in node_values.items() if values[i] is not None})
+            for i, name in enumerate(self.names)
+        )
+        sources = self.edge_sources().tolist()
+        targets = self.indices.tolist()
+        columns = {key: values.tolist() for key, values in self.edge_columns.items()}
+        G.add_edges_from(
+            (self.names[u], self.names[v], {key: values[e] for key, values in columns.items()})
+            for e, (u, v) in enumerate(zip(sources, targets))
+        )
+        return G
+
+    def number_of_nodes(self):
+        return len(self.names)
+
+    def number_of_edges(self):
+        return len(self.indices)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays (the interned names are not counted)."""
+        arrays = [self.indptr, self.indices, *self.edge_columns.values(), *self.node_columns.values()]
+        return sum(array.nbytes for array in arrays)
+
+    def edge_sources(self):
+        """Source id of every edge, aligned with indices."""
+        return np.repeat(np.arange(len(self.names), dtype=np.int32), np.diff(self.indptr))
+
+    def successors(self, name):
+        i = self.index[name]
+        return [self.names[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]].tolist()]
+
+    def node_values(self, key):
+        """Values of a node column as a list aligned with names (None where missing)."""
+        column = self.node_columns[key]
+        if key in self.categories:
+            labels = self.categories[key]
+            return [None if code == MISSING else labels[code] for code in column.tolist()]
+        return [None if value != value else value for value in column.tolist()]
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.bincount(self.indices, minlength=len(self.names))
+
+    def degree_centrality(self):
+        """{name: degree / (n - 1)}, as networkx degree_centrality."""
+        n = len(self.names)
+        if n <= 1:
+            return dict.fromkeys(self.names, 1.0)
+        scores = (self.out_degree() + self.in_degree()) * (1.0 / (n - 1))
+        return dict(zip(self.names, scores.tolist()))
+
+    def reverse(self):
+        """The transposed graph (computed once). Edge columns follow their edges."""
+        if self._reverse is None:
+            sources = self.edge_sources()
+            order = np.lexsort((sources, self.indices))
+            indptr = np.zeros(len(self.names) + 1, dtype=np.int64)
+            np.cumsum(self.in_degree(), out=indptr[1:])
+            self._reverse = CompactGraph(
+                self.names, indptr, sources[order], {key: values[order] for key, values in self.edge_columns.items()},
+                self.node_columns, self.categories, self.graph
+            )
+        return self._reverse
+
+    def remove_edges(self, mask):
+        """New graph without the edges where mask (aligned with indices) is True."""
+        keep = ~np.asarray(mask, dtype=bool)
+        counts = np.bincount(self.edge_sources()[keep], minlength=len(self.names))
+        indptr = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return CompactGraph(
+            self.names, indptr, self.indices[keep], {key: values[keep] for key, values in self.edge_columns.items()},
+            self.node_columns, self.categories, dict(self.graph)
+        )
+
+    def strongly_connected_components(self):
+        """
+        Iterative Tarjan. Returns (labels, count): labels[i] is the component of node i, numbered in reverse
+        topological order of the condensation.
+        """
+        n = len(self.names)
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        labels = [-1] * n
+        low = [0] * n
+        number = [-1] * n
+        stack, on_stack = [], [False] * n
+        counter = count = 0
+        for root in range(n):
+            if number[root] != -1:
+                continue
+            number[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, indptr[root])]
+            while work:
+                u, edge = work[-1]
+                if edge < indptr[u + 1]:
+                    work[-1] = (u, edge + 1)
+                    v = indices[edge]
+                    if number[v] == -1:
+                        number[v] = low[v] = counter
+                        counter += 1
+                        stack.append(v)
+                        on_stack[v] = True
+                        work.append((v, indptr[v]))
+                    elif on_stack[v] and number[v] < low[u]:
+                        low[u] = number[v]
+                    continue
+                work.pop()
+                if work and low[u] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[u]
+                if low[u] == number[u]:
+                    while True:
+                        v = stack.pop()
+                        on_stack[v] = False
+                        labels[v] = count
+                        if v == u:
+                            break
+                    count += 1
+        return np.array(labels, dtype=np.int32), count
+
+    def topological_order(self):
+        """
+        Topological order, smallest name (as str) first among the ready nodes, so it matches
+        graph_algorithms.topological_order on the equivalent networkx graph. Raises ValueError on a cycle.
+        """
+        n = len(self.names)
+        rank = [0] * n
+        for position, i in enumerate(sorted(range(n), key=lambda i: str(self.names[i]))):
+            rank[i] = position
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        pending = self.in_degree().tolist()
+        ready = [(rank[i], i) for i in range(n) if pending[i] == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, u = heapq.heappop(ready)
+            order.append(self.names[u])
+            for v in indices[indptr[u]:indptr[u + 1]]:
+                pending[v] -= 1
+                if pending[v] == 0:
+                    heapq.heappush(ready, (rank[v], v))
+        if len(order) < n:
+            raise ValueError("Graph contains a cycle")
+        return order
+
+    def feedback_arc_set(self, weight="weight"):
+        """
+        Edge mask (aligned with indices) of the edges to drop to make the graph acyclic: self-loops and the
+        backward edges of every non-trivial strongly connected component in its Eades–Lin–Smyth order, as
+        graph_algorithms.feedback_arc_set.
+        """
+        sources = self.edge_sources()
+        mask = sources == self.indices
+        labels, count = self.strongly_connected_components()
+        sizes = np.bincount(labels, minlength=count)
+        cyclic = sizes[labels] > 1
+        if not cyclic.any():
+            return mask
+
+        weights = self.edge_columns[weight].tolist() if weight in self.edge_columns else [1] * len(self.indices)
+        indptr, indices = self.indptr.tolist(), self.indices.tolist()
+        reverse = self.reverse()
+        reverse_indptr, reverse_indices = reverse.indptr.tolist(), reverse.indices.tolist()
+        reverse_weights = reverse.edge_columns[weight].tolist() if weight in reverse.edge_columns else weights
+
+        def successors(u):
+            return zip(indices[indptr[u]:indptr[u + 1]], weights[indptr[u]:indptr[u + 1]])
+
+        def predecessors(v):
+            return zip(reverse_indices[reverse_indptr[v]:reverse_indptr[v + 1]],
+                       reverse_weights[reverse_indptr[v]:reverse_indptr[v + 1]])
+
+        position = np.zeros(len(self.names), dtype=np.int64)
+        members = {}
+        for node, label in zip(np.flatnonzero(cyclic).tolist(), labels[cyclic].tolist()):
+            members.setdefault(label, []).append(node)
+        for component in members.values():
+            order = _greedy_order(component, successors, predecessors, key=lambda i: str(self.names[i]))
+            position[order] = np.arange(len(order))
+
+        same_component = labels[sources] == labels[self.indices]
+        return mask | (same_component & cyclic[sources] & (position[self.indices] < position[sources]))
+
+    def break_cycles(self, weight="weight"):
+        """
+        Returns (acyclic graph, dropped) where dropped lists the removed edges as (source, target, weight).
+        """
+        mask = self.feedback_arc_set(weight)
+        if not mask.any():
+            return self, []
+        weights = self.edge_columns[weight][mask].tolist() if weight in self.edge_columns else [1] * int(mask.sum())
+        dropped = [(self.names[u], self.names[v], w)
+                   for u, v, w in zip(self.edge_sources()[mask].tolist(), self.indices[mask].tolist(), weights)]
+        log_dropped_edges(dropped)
+        return self.remove_edges(mask), dropped
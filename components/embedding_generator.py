@@ -1,38 +1,74 @@
 from transformers import AutoTokenizer, AutoModel
+import numpy as np
 import torch
 
 import config
+from components.embedding_store import SnippetEmbedder
 
 
-class EmbeddingGenerator:
-    def __init__(self, model_name=config.EMBEDDING_MODEL_NAME):
+class EmbeddingGenerator(SnippetEmbedder):
+    def __init__(self, model_name=config.EMBEDDING_MODEL_NAME, batch_size=config.EMBEDDING_BATCH_SIZE,
+                 quantize=config.EMBEDDING_QUANTIZE, num_threads=config.TORCH_NUM_THREADS,
+                 use_store=config.EMBEDDING_STORE_ENABLED):
         """
         Initialize the EmbeddingGenerator class with the pre-trained model and tokenizer.
+        - batch_size: snippets per forward pass
+        - quantize: use int8 dynamic quantization of the Linear layers (CPU inference)
+        - num_threads: torch intra-op threads (0 keeps torch's default)
+        - use_store: persist embeddings in the on-disk EmbeddingStore
         """
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        self.batch_size = max(1, batch_size)
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModel.from_pretrained(model_name)
+        self.model.eval()
+
+        if quantize:
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
 
-    def generate_embeddings(self, code_snippet):
+        self.hidden_size = self.model.config.hidden_size
+        self.store_name = f"{model_name}-int8" if quantize else model_name  # Quantized vectors differ slightly
+        self.store = None
+        if use_store:
+            self.store = self._open_store(self.store_name, self.hidden_size)
+
+    def embed_texts(self, texts, batch_size=None):
         """
-        Generate embeddings for a given code snippet using the pre-trained model.
+        Embed many snippets with batched inference.
+        Snippets are tokenized once, sorted by token length so each batch is padded only to its own
+        longest member, and mean-pooled over real tokens only (padding is masked out).
+        Returns a float32 matrix with one row per input text, in input order.
         """
-        # Tokenize the code snippet
-        inputs = self.tokenizer(code_snippet, return_tensors="pt", truncation=True, padding=True, max_length=512)
+        batch_size = batch_size or self.batch_size
+        embeddings = np.zeros((len(texts), self.model.config.hidden_size), dtype=np.float32)
+        if not texts:
+            return embeddings
 
-        # Pass through the model to get the embeddings
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            # We are using the last hidden state and applying mean pooling
-            embedding = outputs.last_hidden_state.mean(dim=1).squeeze().cpu().numpy()
+        encoded = self.tokenizer(list(texts), truncation=True, padding=False, max_length=512)
+        input_ids = encoded["input_ids"]
+        attention_mask = encoded["attention_mask"]
 
-        return embedding
+        # ✅ Length bucketing: consecutive items of the sorted order have similar lengths
+        order = sorted(range(len(texts)), key=lambda i: len(input_ids[i]))
 
-    def generate_embeddings_batch(self, code_snippets):
-        """
-        Generate embeddings for a batch of code snippets.
-        Returns a dictionary mapping file names to embeddings.
-        """
-        embeddings_dict = {}  # Store {filename: embedding}
-        for file_name, _, snippet in code_snippets:
-            embeddings_dict[file_name] = self.generate_embeddings(snippet)
-        return embeddings_dict
+        with torch.inference_mode():
+            for start in range(0, len(order), batch_size):
+                batch_indices = order[start:start + batch_size]
+                batch = self.tokenizer.pad(
+                    {
+                        "input_ids": [input_ids[i] for i in batch_indices],
+                        "attention_mask": [attention_mask[i] for i in batch_indices],
+                    },
+                    return_tensors="pt"
+                )
+                outputs = self.model(**batch)
+
+                # ✅ Attention-mask-aware mean pooling
+                mask = batch["attention_mask"].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+                summed = (outputs.last_hidden_state * mask).sum(dim=1)
+                pooled = summed / mask.sum(dim=1).clamp(min=1)
+                embeddings[batch_indices] = pooled.float().cpu().numpy()
+
+        return embeddings
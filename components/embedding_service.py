@@ -0,0 +1,354 @@
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+import config
+from components.embedding_store import SnippetEmbedder
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent autostarts are not serialized
+    fcntl = None
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ServiceError:
+    """Sent back in place of a result when the service failed to handle a request."""
+
+    def __init__(self, message):
+        self.message = message
+
+
+class _Request:
+    __slots__ = ("texts", "arrived", "result", "done")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.arrived = time.monotonic()
+        self.result = None
+        self.done = threading.Event()
+
+
+def service_authkey():
+    """
+    The key clients and the service authenticate each other with (connections carry pickles): EMBEDDING_SERVICE_AUTHKEY,
+    or a random key created once in a file under CACHE_DIR that only the current user can read.
+    """
+    if config.EMBEDDING_SERVICE_AUTHKEY:
+        return config.EMBEDDING_SERVICE_AUTHKEY.encode("utf-8")
+
+    path = os.path.join(config.CACHE_DIR, "embedding_service.key")
+    if not os.path.exists(path):
+        os.makedirs(config.CACHE_DIR, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(temp_path, path)  # Fails if another process created the key first, so everyone reads one key
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(temp_path)
+    with open(path) as f:
+        return f.read().strip().encode("ascii")
+
+
+class EmbeddingServer:
+    def __init__(self, generator, address=config.EMBEDDING_SERVICE_ADDRESS,
+                 max_batch=config.EMBEDDING_SERVICE_MAX_BATCH, max_wait=config.EMBEDDING_SERVICE_MAX_WAIT_MS / 1000):
+        """
+        Serves embed_texts of one model (generator, e.g. an EmbeddingGenerator) to every process on the host over a
+        local socket. Requests from concurrent callers are merged into micro-batches of up to max_batch snippets:
+        a batch runs once it is full or its oldest request has waited max_wait seconds, and requests arriving while
+        the model is busy join the next batch.
+        """
+        self.generator = generator
+        self.address = address
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.pending = deque()  # _Request objects waiting for a batch
+        self.pending_texts = 0
+        self.condition = threading.Condition()
+        self.counters = {"requests": 0, "texts": 0, "batches": 0, "busy_seconds": 0.0, "max_queue_depth": 0}
+
+    def serve_forever(self):
+        """
+        Listens on self.address and answers ("embed", texts), ("info", None) and ("stats", None) messages.
+        """
+        listener = self._listen()
+        threading.Thread(target=self._run_batches, name="embedding-batches", daemon=True).start()
+        logging.info(f"Embedding service listening on {self.address}")
+        with listener:
+            while True:
+                try:
+                    connection = listener.accept()
+                except Exception as e:  # Failed handshakes must not stop the service
+                    logging.warning(f"Rejected embedding service connection: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+
+    def _listen(self):
+        if os.path.exists(self.address):
+            try:
+                Client(self.address, authkey=service_authkey()).close()
+            except OSError:
+                os.unlink(self.address)  # Left behind by a service that exited
+            else:
+                raise RuntimeError(f"An embedding service is already listening on {self.address}")
+        directory = os.path.dirname(self.address)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return Listener(self.address, authkey=service_authkey())
+
+    def _serve_connection(self, connection):
+        with connection:
+            while True:
+                try:
+                    operation, payload = connection.recv()
+                except (EOFError, OSError):
+                    return
+                if operation == "embed":
+                    reply = self.embed(payload)
+                elif operation == "info":
+                    reply = self.info()
+                elif operation == "stats":
+                    reply = self.stats()
+                else:
+                    reply = ServiceError(f"Unknown operation {operation!r}")
+                try:
+                    connection.send(reply)
+                except OSError:
+                    return
+
+    def info(self):
+        return {
+            "store_name": self.generator.store_name,
+            "hidden_size": self.generator.hidden_size,
+            "pid": os.getpid(),
+        }
+
+    def stats(self):
+        with self.condition:
+            counters = dict(self.counters)
+            queue_depth, queued_texts = len(self.pending), self.pending_texts
+        batches = counters["batches"]
+        return {
+            "service": "shared",
+            "queue_depth": queue_depth,  # Requests waiting for a batch
+            "queued_texts": queued_texts,
+            **counters,
+            "mean_batch_texts": counters["texts"] / batches if batches else 0.0,
+            "mean_batch_requests": counters["requests"] / batches if batches else 0.0,
+        }
+
+    def embed(self, texts):
+        """Queues texts for the next micro-batch and blocks until their embeddings are ready."""
+        request = _Request(texts)
+        with self.condition:
+            self.pending.append(request)
+            self.pending_texts += len(texts)
+            self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], len(self.pending))
+            self.condition.notify_all()
+        request.done.wait()
+        return request.result
+
+    def _next_batch(self):
+        """
+        Waits until max_batch snippets are queued or the oldest request reaches its deadline, then takes whole
+        requests in arrival order up to max_batch snippets (a larger request runs alone).
+        """
+        with self.condition:
+            while not self.pending:
+                self.condition.wait()
+            deadline = self.pending[0].arrived + self.max_wait
+            while self.pending_texts < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+
+            batch, size = [], 0
+            while self.pending and (not batch or size + len(self.pending[0].texts) <= self.max_batch):
+                request = self.pending.popleft()
+                batch.append(request)
+                size += len(request.texts)
+            self.pending_texts -= size
+            return batch
+
+    def _run_batches(self):
+        while True:
+            batch = self._next_batch()
+            texts = [text for request in batch for text in request.texts]
+            start = time.perf_counter()
+            try:
+                matrix = np.asarray(self.generator.embed_texts(texts), dtype=np.float32)
+            except Exception as e:
+                logging.error(f"Embedding batch of {len(texts)} snippets failed: {e}")
+                for request in batch:
+                    request.result = ServiceError(str(e))
+                    request.done.set()
+                continue
+            elapsed = time.perf_counter() - start
+
+            offset = 0
+            for request in batch:
+                request.result = matrix[offset:offset + len(request.texts)]
+                offset += len(request.texts)
+                request.done.set()
+
+            with self.condition:
+                self.counters["requests"] += len(batch)
+                self.counters["texts"] += len(texts)
+                self.counters["batches"] += 1
+                self.counters["busy_seconds"] += elapsed
+                queue_depth = len(self.pending)
+            logging.debug(f"Embedded {len(texts)} snippets from {len(batch)} requests in {elapsed:.3f} s "
+                          f"({queue_depth} requests queued)")
+
+
+@contextmanager
+def _start_lock(address):
+    if fcntl is None:
+        yield
+        return
+    with open(f"{address}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def start_service(address=config.EMBEDDING_SERVICE_ADDRESS):
+    """
+    Starts the service (components.embedding_worker) as a detached process in its own session, so it outlives
+    the app worker that started it and keeps serving the others.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [PROJECT_ROOT, env.get("PYTHONPATH")]))
+    logging.info(f"Starting embedding service on {address}")
+    return subprocess.Popen([sys.executable, "-m", "components.embedding_worker", "--address", address],
+                            env=env, stdin=subprocess.DEVNULL, start_new_session=True)
+
+
+def connect(address=config.EMBEDDING_SERVICE_ADDRESS, autostart=config.EMBEDDING_SERVICE_AUTOSTART,
+            timeout=config.EMBEDDING_SERVICE_START_TIMEOUT):
+    """
+    Opens a connection to the service. With autostart, the first process that finds no service starts one
+    (others wait on a lock file meanwhile) and waits up to timeout seconds for it to load the model.
+    """
+    try:
+        return Client(address, authkey=service_authkey())
+    except (FileNotFoundError, ConnectionRefusedError):
+        if not autostart:
+            raise
+
+    directory = os.path.dirname(address)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with _start_lock(address):
+        try:
+            return Client(address, authkey=service_authkey())
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+
+        process = start_service(address)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return Client(address, authkey=service_authkey())
+            except (FileNotFoundError, ConnectionRefusedError):
+                if process.poll() is not None:
+                    raise RuntimeError(f"Embedding service exited with code {process.returncode}")
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Embedding service did not start within {timeout} s")
+                time.sleep(0.2)
+
+
+class EmbeddingClient(SnippetEmbedder):
+    def __init__(self, address=config.EMBEDDING_SERVICE_ADDRESS, use_store=config.EMBEDDING_STORE_ENABLED,
+                 autostart=config.EMBEDDING_SERVICE_AUTOSTART):
+        """
+        Drop-in replacement for EmbeddingGenerator that runs inference in the shared embedding service instead of
+        loading the model into this process. The embedding store stays local (it is shared through the file system),
+        so only snippets missing from it are sent. Each thread uses its own connection, so concurrent requests
+        of one process are batched together with those of other processes.
+        """
+        self.address = address
+        self.autostart = autostart
+        self._local = threading.local()
+
+        info = self._call("info")
+        self.store_name = info["store_name"]
+        self.hidden_size = info["hidden_size"]
+        self.store = None
+        if use_store:
+            self.store = self._open_store(self.store_name, self.hidden_size)
+
+    def _connection(self):
+        # Connections are per thread and per process (a forked child must not share its parent's socket)
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = self._local.connection = connect(self.address, self.autostart)
+            self._local.pid = os.getpid()
+        return connection
+
+    def _call(self, operation, payload=None):
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.send((operation, payload))
+                reply = connection.recv()
+                break
+            except (EOFError, OSError):
+                self._local.connection = None  # The service restarted: reconnect once (requests are idempotent)
+                if attempt:
+                    raise
+        if isinstance(reply, ServiceError):
+            raise RuntimeError(f"Embedding service error: {reply.message}")
+        return reply
+
+    def embed_texts(self, texts, batch_size=None):
+        """
+        Embeddings of texts from the shared model, one float32 row per text (batch_size is decided by the service).
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.hidden_size), dtype=np.float32)
+        return self._call("embed", texts)
+
+    def stats(self):
+        """Queue depth and batching counters of the service."""
+        return self._call("stats")
+
+
+_embedding_generator = None
+_embedding_generator_lock = threading.Lock()
+
+
+def get_embedding_generator():
+    """
+    Returns the embedder shared by all requests in this process, created on first use: an EmbeddingClient of the
+    shared service, or an EmbeddingGenerator that loads the model here. torch and transformers are only imported
+    in the latter case, so importing the app stays fast.
+    """
+    global _embedding_generator
+    with _embedding_generator_lock:
+        if _embedding_generator is None:
+            if config.EMBEDDING_SERVICE == "shared":
+                _embedding_generator = EmbeddingClient()
+            else:
+                from components.embedding_generator import EmbeddingGenerator
+                _embedding_generator = EmbeddingGenerator()
+        return _embedding_generator
@@ -0,0 +1,201 @@
+import hashlib
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+
+def snippet_key(text):
+    return hashlib.sha1(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+class EmbeddingStore:
+    def __init__(self, root, model_name, dim, dtype=config.EMBEDDING_STORE_DTYPE):
+        """
+        Append-only on-disk embedding matrix keyed by snippet content hash.
+        Vectors live in one contiguous memory-mapped file (row i belongs to line i of the key file),
+        so identical snippets are stored once and repeat requests read them without recomputation.
+        Appends from several processes are serialized with a file lock.
+        """
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.directory = os.path.join(root, model_name.replace("/", "__"))
+        os.makedirs(self.directory, exist_ok=True)
+
+        name = f"d{dim}.{self.dtype.name}"
+        self.vectors_path = os.path.join(self.directory, f"vectors.{name}.bin")
+        self.keys_path = os.path.join(self.directory, f"keys.{name}.txt")
+        self.lock_path = os.path.join(self.directory, f"store.{name}.lock")
+        self.row_bytes = self.dim * self.dtype.itemsize
+
+        self.index = {}  # {snippet_key: row}
+        self.count = 0
+        self._keys_offset = 0  # Bytes of the key file already loaded
+        self._matrix = None
+        self._lock = threading.RLock()
+
+        for path in (self.vectors_path, self.keys_path):
+            open(path, "ab").close()
+        with self._locked():
+            self._refresh()
+
+    @property
+    def vectors(self):
+        """
+        Memory-mapped (count, dim) matrix of every stored embedding.
+        """
+        with self._lock:
+            if self._matrix is None:
+                return np.zeros((0, self.dim), dtype=self.dtype)
+            return self._matrix[:self.count]
+
+    def get_or_compute(self, texts, compute):
+        """
+        Returns the row of each text, computing embeddings only for snippets not stored yet.
+        compute(list_of_texts) must return a (n, dim) array.
+        """
+        keys = [snippet_key(text) for text in texts]
+
+        with self._lock:
+            if any(key not in self.index for key in keys):
+                with self._locked():
+                    self._refresh()  # Another process may have stored them meanwhile
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self.index and key not in missing:
+                    missing[key] = text
+
+        if missing:
+            logging.info(f"Embedding {len(missing)} new snippets ({len(keys) - len(missing)} served from store)")
+            self._append(list(missing), np.asarray(compute(list(missing.values()))))
+
+        with self._lock:
+            return np.fromiter((self.index[key] for key in keys), dtype=np.int64, count=len(keys))
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """
+        Loads keys appended since the last refresh and remaps the vector file if it grew.
+        Called with the lock held.
+        """
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        for key in complete.decode("ascii").split():
+            self.index.setdefault(key, self.count)
+            self.count += 1
+        self._keys_offset += len(complete)
+        self._map()
+
+    def _map(self):
+        capacity = os.path.getsize(self.vectors_path) // self.row_bytes
+        if capacity and (self._matrix is None or self._matrix.shape[0] != capacity):
+            self._matrix = np.memmap(self.vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+
+    def _append(self, keys, vectors):
+        with self._locked():
+            self._refresh()
+            fresh = [i for i, key in enumerate(keys) if key not in self.index]
+            if not fresh:
+                return
+
+            needed = self.count + len(fresh)
+            capacity = 0 if self._matrix is None else self._matrix.shape[0]
+            if needed > capacity:
+                # ✅ Grow geometrically so appends stay amortized O(1)
+                with open(self.vectors_path, "r+b") as f:
+                    f.truncate(max(needed, capacity * 2, 1024) * self.row_bytes)
+                self._map()
+
+            self._matrix[self.count:needed] = vectors[fresh].astype(self.dtype, copy=False)
+            self._matrix.flush()
+
+            # Keys are written after their vectors, so readers never see a key without its row
+            with open(self.keys_path, "ab") as f:
+                f.write("".join(f"{keys[i]}\n" for i in fresh).encode("ascii"))
+            self._refresh()
+
+
+class SnippetEmbedder:
+    """
+    Store-backed embedding of code snippets on top of embed_texts, shared by the in-process EmbeddingGenerator and
+    the EmbeddingClient of the shared embedding service. Subclasses set self.store (an EmbeddingStore or None) and
+    implement embed_texts(texts) -> (len(texts), dim) float32 matrix.
+    """
+
+    store = None
+
+    def embed_texts(self, texts, batch_size=None):
+        raise NotImplementedError
+
+    def _open_store(self, store_name, dim):
+        return EmbeddingStore(os.path.join(config.CACHE_DIR, "embeddings"), store_name, dim)
+
+    def stats(self):
+        """Inference statistics (queue depth and batching, for the shared service)."""
+        return {"service": "local"}
+
+    def generate_embeddings(self, code_snippet):
+        """
+        Generate embeddings for a given code snippet using the pre-trained model.
+        """
+        return self.embed_texts([code_snippet])[0]
+
+    def embed_snippets(self, texts):
+        """
+        Embed snippets through the store: only snippets never seen before are run through the model.
+        Returns (rows, matrix) where matrix[rows[i]] is the embedding of texts[i]; with the store enabled
+        matrix is the memory-mapped store itself, so nothing is copied.
+        """
+        if self.store is None:
+            return np.arange(len(texts)), self.embed_texts(texts)
+        rows = self.store.get_or_compute(texts, self.embed_texts)
+        return rows, self.store.vectors
+
+    def generate_embeddings_batch(self, code_snippets):
+        """
+        Generate embeddings for a batch of code snippets.
+        Returns a dictionary mapping file names to embeddings.
+        """
+        code_snippets = list(code_snippets)
+        rows, matrix = self.embed_snippets([snippet for _, _, snippet in code_snippets])
+
+        embeddings_dict = {}  # Store {filename: embedding}
+        for (file_name, _, _), row in zip(code_snippets, rows):
+            embeddings_dict[file_name] = np.asarray(matrix[row])
+        return embeddings_dict
+
+    def generate_embedding_matrix(self, code_snippets):
+        """
+        Same keying as generate_embeddings_batch, but returns (file_names, matrix) with one row per
+        file name, gathered from the store in a single vectorized read (for GraphHandler).
+        """
+        code_snippets = list(code_snippets)
+        rows, matrix = self.embed_snippets([snippet for _, _, snippet in code_snippets])
+
+        file_rows = {}
+        for (file_name, _, _), row in zip(code_snippets, rows):
+            file_rows[file_name] = row
+        return list(file_rows), np.asarray(matrix[np.fromiter(file_rows.values(), dtype=np.int64)], dtype=np.float32)
@@ -0,0 +1,31 @@
+"""
+Entry point of the shared embedding service: loads the embedding model once and serves it to every app worker on
+the host (see embedding_service.EmbeddingServer). Started automatically by EmbeddingClient, or run it under a process
+supervisor with EMBEDDING_SERVICE_AUTOSTART=0:
+
+    python -m components.embedding_worker [--address .cache/embedding.sock]
+"""
+import argparse
+import logging
+
+import config
+from components.embedding_generator import EmbeddingGenerator
+from components.embedding_service import EmbeddingServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=config.EMBEDDING_SERVICE_ADDRESS, help="Unix socket path to listen on")
+    parser.add_argument("--max-batch", type=int, default=config.EMBEDDING_SERVICE_MAX_BATCH,
+                        help="snippets per merged micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=config.EMBEDDING_SERVICE_MAX_WAIT_MS,
+                        help="how long a request waits for others to join its batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    generator = EmbeddingGenerator(use_store=False)  # Clients keep the store; only new snippets reach the model
+    EmbeddingServer(generator, args.address, args.max_batch, args.max_wait_ms / 1000).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
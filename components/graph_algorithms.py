@@ -0,0 +1,122 @@
+import heapq
+import logging
+
+import networkx as nx
+
+
+def feedback_arc_set(G, weight="weight"):
+    """
+    Edges whose removal makes the directed graph G acyclic, chosen to keep as much edge weight as possible.
+    Only strongly connected components can hold cycles, so each non-trivial component is ordered on its own
+    with the weighted Eades–Lin–Smyth greedy heuristic and its backward edges are returned, together with
+    all self-loops. Runs in O((V + E) log V); ties are broken by node name, so the result does not depend on
+    insertion order.
+    Returns a list of (source, target, weight).
+    """
+    arcs = sorted(((u, u, data.get(weight, 1)) for u, _, data in nx.selfloop_edges(G, data=True)), key=str)
+    for component in nx.strongly_connected_components(G):
+        if len(component) > 1:
+            order = _greedy_order(
+                component,
+                lambda u: ((v, data.get(weight, 1)) for v, data in G.succ[u].items()),
+                lambda v: ((u, data.get(weight, 1)) for u, data in G.pred[v].items()),
+            )
+            position = {node: i for i, node in enumerate(order)}
+            arcs.extend(
+                (u, v, data.get(weight, 1))
+                for u in order for v, data in G.succ[u].items()
+                if v in position and position[v] < position[u]
+            )
+    return arcs
+
+
+def break_cycles(G, weight="weight"):
+    """
+    Removes a feedback arc set from G in place (see feedback_arc_set) and returns the dropped edges.
+    """
+    dropped = feedback_arc_set(G, weight)
+    if dropped:
+        G.remove_edges_from((u, v) for u, v, _ in dropped)
+        log_dropped_edges(dropped)
+    return dropped
+
+
+def log_dropped_edges(dropped):
+    if dropped:
+        logging.warning(f"Dropped {len(dropped)} edges to break cycles, total weight "
+                        f"{sum(w for _, _, w in dropped)}: {dropped[:10]}{' ...' if len(dropped) > 10 else ''}")
+
+
+def topological_order(G):
+    """
+    Topological order of a DAG that does not depend on insertion order: among the nodes whose predecessors
+    are all placed, the smallest name comes first. O((V + E) log V).
+    """
+    return list(nx.lexicographical_topological_sort(G, key=str))
+
+
+def _greedy_order(nodes, successors, predecessors, key=str):
+    """
+    Eades–Lin–Smyth vertex sequence of the subgraph induced by nodes: sinks are moved to the end and
+    sources to the front as they appear; otherwise the node with the largest outgoing minus incoming weight
+    goes to the front. Edges pointing backwards in the sequence form the feedback arc set.
+    successors(u) / predecessors(u) yield (neighbour, weight) pairs; ties are broken by key(node).
+    """
+    rank = {node: i for i, node in enumerate(sorted(nodes, key=key))}
+    out_weight = dict.fromkeys(nodes, 0)
+    in_weight = dict.fromkeys(nodes, 0)
+    out_degree = dict.fromkeys(nodes, 0)
+    in_degree = dict.fromkeys(nodes, 0)
+    for u in nodes:
+        for v, w in successors(u):
+            if v in rank and v != u:
+                out_weight[u] += w
+                in_weight[v] += w
+                out_degree[u] += 1
+                in_degree[v] += 1
+
+    version = dict.fromkeys(nodes, 0)
+    heap = [(in_weight[node] - out_weight[node], rank[node], 0, node) for node in nodes]
+    heapq.heapify(heap)
+    remaining = set(nodes)
+    sinks = []  # Heaps of (rank, node), so equal candidates are taken in name order
+    sources = []
+    front, back = [], []
+
+    def remove(node):
+        remaining.discard(node)
+        for u, w in predecessors(node):
+            if u in remaining:
+                out_weight[u] -= w
+                out_degree[u] -= 1
+                version[u] += 1
+                heapq.heappush(heap, (in_weight[u] - out_weight[u], rank[u], version[u], u))
+                if out_degree[u] == 0:
+                    heapq.heappush(sinks, (rank[u], u))
+        for v, w in successors(node):
+            if v in remaining:
+                in_weight[v] -= w
+                in_degree[v] -= 1
+                version[v] += 1
+                heapq.heappush(heap, (in_weight[v] - out_weight[v], rank[v], version[v], v))
+                if in_degree[v] == 0:
+                    heapq.heappush(sources, (rank[v], v))
+
+    while remaining:
+        if sinks:
+            _, node = heapq.heappop(sinks)
+            if node in remaining:
+                back.append(node)
+                remove(node)
+        elif sources:
+            _, node = heapq.heappop(sources)
+            if node in remaining:
+                front.append(node)
+                remove(node)
+        else:
+            _, _, node_version, node = heapq.heappop(heap)
+            if node in remaining and node_version == version[node]:
+                front.append(node)
+                remove(node)
+
+    return front + back[::-1]
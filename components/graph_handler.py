@@ -1,19 +1,43 @@
 import base64
 import logging
-from io import BytesIO
+import re
+from collections import Counter
 
 import networkx as nx
 import numpy as np
-from matplotlib import pyplot as plt
-from sklearn.neighbors import NearestNeighbors
+
+import config
+from components.centrality import get_centrality_service
+from components.compact_graph import CompactGraph
+from components.graph_renderer import GraphRenderer
+from components.similarity import knn_edges
+
+# One pass over a function's source: comments and string literals are consumed (group 1 stays empty) so that
+# only (dotted) identifiers in code count as references
+_REFERENCE = re.compile(
+    r'#[^\n]*'
+    r'|"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\''
+    r'|([^\W\d]\w*(?:\.[^\W\d]\w*)*)'
+)
 
 
 class GraphHandler:
-    def __init__(self, functions=None, classes=None, embeddings=None, k=2):
+    def __init__(self, functions=None, classes=None, embeddings=None, k=2, labels=None, embedding_matrix=None,
+                 similarity_engine=config.KNN_ENGINE, mutual=False, min_similarity=None):
         self.functions = functions
         self.classes = classes
-        self.embeddings = embeddings
+        self.embeddings = embeddings  # {name: embedding}
         self.k = k
+        # Alternatively, node labels with a (len(labels), dim) matrix, e.g. from EmbeddingGenerator.generate_embedding_matrix
+        self.labels = labels
+        self.embedding_matrix = embedding_matrix
+        # k-NN options: "exact" / "lsh" / "auto" engine, mutual-neighbour filter, cosine similarity threshold
+        self.similarity_engine = similarity_engine
+        self.mutual = mutual
+        self.min_similarity = min_similarity
+        # Class references of every function, {file_name: [{class_name: count} per function, in order]}, recorded
+        # by component graph builds so that patch_component_graph only re-tokenizes changed files
+        self.class_references = None
 
     def create_graph(self):
         """
@@ -23,73 +47,195 @@ class GraphHandler:
         """
         if self.functions and self.classes:
             return self._create_component_graph()
-        elif self.embeddings:
+        elif self.embeddings or self.embedding_matrix is not None:
             return self._create_knn_graph()
         else:
             raise ValueError("Insufficient data to generate a graph.")
 
-    import networkx as nx
+    def create_compact_graph(self):
+        """
+        Same graph as create_graph as a CompactGraph. Component graphs are built directly into arrays
+        (no networkx graph in between) and made acyclic natively.
+        """
+        if self.functions and self.classes:
+            return self._create_compact_component_graph()
+        return CompactGraph.from_networkx(self.create_graph())
+
+    def _component_mode(self):
+        """
+        Picks the node granularity of the component graph (see _create_component_graph).
+        """
+        if len(self.classes) > 1:
+            return "class"
+        elif len(self.functions) > 1:
+            return "function"
+        return "mixed"
+
+    def _create_component_graph(self, class_references=None):
+        """
+        Component graph as a networkx DiGraph (see _create_compact_component_graph), for rendering and in-place patching.
+        """
+        return self._create_compact_component_graph(class_references).to_networkx()
 
-    def _create_component_graph(self):
+    def _create_compact_component_graph(self, class_references=None):
         """
         Create a hybrid component graph:
         - If multiple classes exist, use **classes** as nodes.
         - If mostly functions, use **functions** as nodes but group them logically.
         - If a mix, combine both approaches.
+        Node names are interned in first-seen order; a later node type overrides an earlier one.
+        class_references: index from _class_reference_index to reuse instead of tokenizing every function.
         """
-        G = nx.DiGraph()
-
-        num_classes = len(self.classes)
-        num_functions = len(self.functions)
-
-        if num_classes > 1:  # ✅ Use class-based graph
+        mode = self._component_mode()
+        if mode != "function":
+            self.class_references = self._class_reference_index() if class_references is None else class_references
+        names, types, index = [], [], {}
+        sources, targets, weights = [], [], []
+
+        def intern(name, node_type=None):
+            if name not in index:
+                index[name] = len(names)
+                names.append(name)
+                types.append(node_type)
+            elif node_type is not None:
+                types[index[name]] = node_type
+            return index[name]
+
+        if mode == "class":  # ✅ Use class-based graph
             for file_name, class_name, _ in self.classes:
-                G.add_node(class_name, type="class")
+                intern(class_name, "class")
 
-            for file_name, func_name, func_code in self.functions:
-                for file_name2, class_name, class_code in self.classes:
-                    if class_name in func_code:
-                        weight = func_code.count(class_name)
-                        G.add_edge(class_name, func_name, weight=weight)
-
-        elif num_functions > 1:  # ✅ Use function-based graph if function-heavy
-            function_nodes = set()
+            for class_name, func_name, weight in self._indexed_references():
+                sources.append(intern(class_name))
+                targets.append(intern(func_name))
+                weights.append(weight)
 
+        elif mode == "function":  # ✅ Use function-based graph if function-heavy
             for file_name, func_name, func_code in self.functions:
-                function_nodes.add(func_name)
-                G.add_node(func_name, type="function")
+                intern(func_name, "function")
 
             # ✅ Connect functions based on execution order inside a file
-            file_function_map = {}
-            for file_name, func_name, func_code in self.functions:
-                if file_name not in file_function_map:
-                    file_function_map[file_name] = []
-                file_function_map[file_name].append(func_name)
-
-            for file, funcs in file_function_map.items():
-                for i in range(len(funcs) - 1):
-                    G.add_edge(funcs[i], funcs[i + 1])
+            for file, funcs in self._group_by_file(self.functions).items():
+                sources.extend(index[name] for name in funcs[:-1])
+                targets.extend(index[name] for name in funcs[1:])
 
         else:  # ✅ If a single class + some functions, mix both approaches
             for file_name, class_name, _ in self.classes:
-                G.add_node(class_name, type="class")
+                intern(class_name, "class")
 
             for file_name, func_name, func_code in self.functions:
-                G.add_node(func_name, type="function")
-                for file_name2, class_name, class_code in self.classes:
-                    if class_name in func_code:
-                        G.add_edge(class_name, func_name)
-
-        # ✅ Handle cycles by removing the lowest-weighted edge
-        try:
-            cycle = nx.find_cycle(G, orientation="original")
-            while cycle:
-                min_weight_edge = min(cycle, key=lambda edge: G[edge[0]][edge[1]].get("weight", 1))
-                G.remove_edge(*min_weight_edge[:2])
-                cycle = nx.find_cycle(G, orientation="original")
-        except nx.NetworkXNoCycle:
-            pass  # No cycle found, continue
+                intern(func_name, "function")
+            for class_name, func_name, _ in self._indexed_references():
+                sources.append(index[class_name])
+                targets.append(index[func_name])
+
+        G = CompactGraph.from_edges(
+            names, sources, targets, {"weight": weights} if mode == "class" else None, {"type": types}, {"mode": mode}
+        )
+        G, dropped = G.break_cycles()
+        G.graph["dropped_edges"] = dropped
+        return G
 
+    def _class_references(self, functions, class_names=None):
+        """
+        Yields (class_name, func_name, count) for every class referenced in the code of functions.
+        Each function is tokenized once into (dotted) identifiers, skipping comments and strings, and the
+        identifiers are looked up in a set of class names, so the cost is linear in the code size instead of
+        functions × classes substring scans. A dotted identifier references every class named by a contiguous
+        run of its parts: "models.User.get" counts "User" (and "models.User" if that is a nested class).
+        class_names restricts the lookup (defaults to all classes).
+        """
+        if class_names is None:
+            class_names = {class_name for _, class_name, _ in self.classes}
+        max_parts = _max_parts(class_names)
+        for file_name, func_name, func_code in functions:
+            for class_name, count in self._count_references(func_code, class_names, max_parts).items():
+                yield class_name, func_name, count
+
+    def _count_references(self, code, class_names, max_parts):
+        """
+        {class_name: occurrences} of the classes in class_names referenced by code (see _class_references);
+        max_parts is the largest number of dotted parts in a class name.
+        """
+        counts = Counter()
+        if not class_names:
+            return counts
+        for chain, occurrences in Counter(_REFERENCE.findall(code)).items():
+            if "." not in chain:
+                if chain in class_names:
+                    counts[chain] += occurrences
+                continue
+            parts = chain.split(".")
+            for i in range(len(parts)):
+                for j in range(i + 1, min(len(parts), i + max_parts) + 1):
+                    name = ".".join(parts[i:j])
+                    if name in class_names:
+                        counts[name] += occurrences
+        return counts
+
+    def _class_reference_index(self, previous=None, changed_files=(), old_class_names=()):
+        """
+        Class references of every function in self.functions, {file_name: [{class_name: count} per function]}.
+        Given the index of a previous build, functions of files not in changed_files keep their counts (minus
+        removed classes) and are only matched against classes added since; the rest are tokenized in full.
+        """
+        class_names = {class_name for _, class_name, _ in self.classes}
+        added_classes = class_names - set(old_class_names)
+        max_parts, added_max_parts = _max_parts(class_names), _max_parts(added_classes)
+        index = {}
+        for file_name, codes in self._group_code_by_file(self.functions).items():
+            reused = None if previous is None or file_name in changed_files else previous.get(file_name)
+            if reused is None or len(reused) != len(codes):
+                index[file_name] = [self._count_references(code, class_names, max_parts) for code in codes]
+                continue
+            index[file_name] = [
+                {**{name: count for name, count in counts.items() if name in class_names},
+                 **self._count_references(code, added_classes, added_max_parts)}
+                for counts, code in zip(reused, codes)
+            ]
+        return index
+
+    def _indexed_references(self):
+        """
+        Yields (class_name, func_name, count) from self.class_references in the order of self.functions,
+        the same sequence _class_references(self.functions) produces.
+        """
+        positions = {}
+        for file_name, func_name, _ in self.functions:
+            position = positions.get(file_name, 0)
+            positions[file_name] = position + 1
+            for class_name, count in self.class_references[file_name][position].items():
+                yield class_name, func_name, count
+
+    def _group_code_by_file(self, entries):
+        file_map = {}
+        for file_name, _, code in entries:
+            file_map.setdefault(file_name, []).append(code)
+        return file_map
+
+    def _group_by_file(self, entries):
+        file_map = {}
+        for file_name, name, _ in entries:
+            file_map.setdefault(file_name, []).append(name)
+        return file_map
+
+    def patch_component_graph(self, G, changed_files, old_classes, class_references=None):
+        """
+        Updates a component graph in place after some files changed, so that it equals create_graph() on the
+        new lists. self.functions / self.classes must hold the new full lists; old_classes is the previous full
+        class list, changed_files the names of added, modified or deleted files and class_references the
+        class_references of the previous build.
+        Edges are re-derived from per-function reference counts rather than removed by name, so functions
+        sharing a name across files keep their edges and edges dropped earlier to break a cycle come back
+        once the cycle is gone. Only functions of changed files are tokenized again (unchanged ones only
+        against added classes); without class_references every function is.
+        """
+        if class_references is not None:
+            class_references = self._class_reference_index(
+                class_references, changed_files, {name for _, name, _ in old_classes}
+            )
+        G.clear()
+        G.update(self._create_component_graph(class_references))
         return G
 
     # def _break_cycles(self, G):
@@ -123,51 +269,19 @@ class GraphHandler:
 
     def visualize_graph(self, G):
         """
-        Visualize the k-NN graph or component graph using Matplotlib and NetworkX.
+        Visualize the k-NN graph or component graph (layered layout for DAGs, Barnes-Hut force layout otherwise).
         Returns the image as a BytesIO object for Flask to send as a response.
         """
-        plt.figure(figsize=(6, 6))
-
-        # Define the node colors based on their type
-        node_color_map = {
-            'function': 'skyblue',
-            'class': 'lightgreen',
-            'file': 'lightgray'
-        }
-
-        # Positioning nodes using spring layout
-        pos = nx.spring_layout(G, seed=42, k=0.2, iterations=30)  # Adjust layout for better visibility
+        return GraphRenderer().to_png(G, title="Generated Graph: Repository Structure")
 
-        # Set node colors based on their type (function, class, etc.)
-        node_colors = [
-            node_color_map.get(G.nodes[node].get('type', 'file'), 'lightgray') for node in G.nodes
-        ]
-
-        # Draw nodes and labels
-        nx.draw_networkx_nodes(G, pos, node_size=3000, node_color=node_colors, edgecolors='black')
-        nx.draw_networkx_labels(G, pos, font_size=12, font_weight="bold", font_color="black")
-
-        # ✅ Draw directed edges with arrows
-        nx.draw_networkx_edges(G, pos, edge_color='gray', arrows=True, arrowsize=20, width=1.5)
-
-        # Add a title and display the plot
-        plt.title("Generated Graph: Repository Structure", fontsize=16)
-
-        # Save the plot to a BytesIO object
-        img_stream = BytesIO()
-        plt.savefig(img_stream, format='PNG')
-        img_stream.seek(0)  # Rewind the BytesIO object to the beginning
-        plt.close()  # Close the plot to avoid it from showing in the console
-
-        return img_stream  # Return the BytesIO stream for Flask API response
-
-    def get_representative_files(self, G, top_n=5):
+    def get_representative_files(self, G, top_n=5, method=config.CENTRALITY_METHOD):
         """
         Identifies the most representative files in a component graph.
 
         Parameters:
         - G (networkx.Graph): The Component Graph of the repository.
         - top_n (int): Number of top representative files to select.
+        - method (str): "betweenness" (sampled-pivot approximation) or "pagerank", see components/centrality.py.
 
         Returns:
         - List[str]: Names of the most representative files.
@@ -176,18 +290,18 @@ class GraphHandler:
             if not isinstance(G, nx.Graph) and not isinstance(G, nx.DiGraph):
                 raise TypeError("Expected a NetworkX Graph object, but received something else.")
 
-            # Compute centrality scores
+            # Compute centrality scores (cached per graph, updated incrementally when G is patched)
             degree_centrality = nx.degree_centrality(G)
-            betweenness_centrality = nx.betweenness_centrality(G)
+            centrality = get_centrality_service().scores(G, method)
 
             # Combine centrality scores
             combined_centrality = {
-                node: degree_centrality[node] + betweenness_centrality[node]
+                node: degree_centrality[node] + centrality[node]
                 for node in G.nodes
             }
 
-            # Sort files by importance (descending)
-            sorted_files = sorted(combined_centrality, key=combined_centrality.get, reverse=True)
+            # Sort files by importance (descending), ties by name
+            sorted_files = sorted(combined_centrality, key=lambda node: (-combined_centrality[node], str(node)))
 
             # Select top N representative files
             representative_files = sorted_files[:top_n]
@@ -200,26 +314,34 @@ class GraphHandler:
             return []
 
     def _create_knn_graph(self):
-        """Creates a k-NN graph using the embeddings dictionary {filename: embedding}."""
-        if not self.embeddings:
+        """Creates a k-NN graph from the embedding matrix, or the embeddings dictionary {filename: embedding}."""
+        if self.embedding_matrix is not None:
+            # ✅ Read the matrix directly
+            file_names = list(self.labels)
+            embeddings_matrix = np.asarray(self.embedding_matrix)
+        elif self.embeddings:
+            # ✅ Convert dictionary to list
+            file_names = list(self.embeddings.keys())
+            embeddings_matrix = np.array(list(self.embeddings.values()))
+        else:
             raise ValueError("No embeddings provided for k-NN graph.")
 
-        # ✅ Convert dictionary to list
-        file_names = list(self.embeddings.keys())
-        embeddings_matrix = np.array(list(self.embeddings.values()))
-
-        # ✅ Perform k-NN search
-        nbrs = NearestNeighbors(n_neighbors=min(self.k + 1, len(file_names)), algorithm="ball_tree").fit(
-            embeddings_matrix)
-        distances, indices = nbrs.kneighbors(embeddings_matrix)
+        # ✅ Perform k-NN search (blocked exact cosine or LSH, see components/similarity.py)
+        sources, targets, similarities = knn_edges(
+            embeddings_matrix, self.k, engine=self.similarity_engine,
+            mutual=self.mutual, min_similarity=self.min_similarity
+        )
 
-        # ✅ Construct the k-NN graph
+        # ✅ Construct the k-NN graph in bulk
         G = nx.DiGraph()
-        for idx, file_name in enumerate(file_names):
-            G.add_node(file_name)  # Use file name as node label
+        G.add_nodes_from(file_names)  # Use file name as node label
+        G.add_edges_from(
+            (file_names[i], file_names[j], {"weight": 1.0 - float(sim), "similarity": float(sim)})
+            for i, j, sim in zip(sources.tolist(), targets.tolist(), similarities.tolist())
+        )
+
+        return G
 
-            for neighbor_idx in indices[idx][1:]:  # Skip self (first index)
-                neighbor_name = file_names[neighbor_idx]
-                G.add_edge(file_name, neighbor_name, weight=distances[idx][1])
 
-        return G
\ No newline at end of file
+def _max_parts(class_names):
+    return max((class_name.count(".") for class_name in class_names), default=0) + 1
@@ -0,0 +1,357 @@
+import hashlib
+import logging
+import re
+import threading
+
+import networkx as nx
+
+import config
+from components.cache import LRUCache, get_file_cache
+from components.graph_renderer import GraphRenderer
+from components.symbol_table import SymbolView
+
+HIERARCHY_VERSION = "1"  # Bump when node ids, edge derivation or the level payload change
+ROOT = ""  # Id of the repository node
+_COMMIT_SHA = re.compile(r"[0-9a-f]{40}")
+
+
+class GraphHierarchy:
+    MAX_CALLEE_CANDIDATES = 3  # Calls matching more definitions than this are too ambiguous to draw
+
+    def __init__(self, hierarchy_id):
+        """
+        Level-of-detail view of a repository: package → module → class → function nodes with call edges
+        rolled up to every level.
+        - nodes: {node_id: {"id", "label", "kind", "parent", "children", "size", "file"}}
+        - edges: {node_id: {(source, target): weight}}, for every edge whose endpoints are visible once
+          node_id is expanded (at least one endpoint is a child of node_id)
+
+        The edge index is built in one pass over the call edges (O(edges × depth)). Level payloads, with
+        their layouts, are only computed when a node is expanded and are memoized; the root level is
+        computed up front so the initial load is a lookup. Levels never hold more than
+        GRAPH_LEVEL_MAX_NODES children: the smallest ones are folded into a "more" node that expands into
+        the next page.
+        """
+        self.id = hierarchy_id
+        self.nodes = {ROOT: self._node(ROOT, "repository", "repository", None, None)}
+        self.edges = {}
+        self._levels = {}  # {node_id: level payload}
+        self._levels_lock = threading.Lock()
+
+    @classmethod
+    def from_repository(cls, repo):
+        """
+        Builds the hierarchy of a repository whose files were already fetched (fetch_files_from_directory).
+        """
+        hierarchy = cls(hierarchy_fingerprint(repo))
+        hierarchy.build(repo.function_cache, repo.class_cache, repo.relation_cache)
+        return hierarchy
+
+    def build(self, function_cache, class_cache, relation_cache):
+        """
+        function_cache / class_cache: {file_path: [(qualified_name, code)]} (lists or SymbolViews)
+        relation_cache: {file_path: [(caller_function, callee)]}
+        """
+        local = {}  # {file_path: {qualified_name: node_id}}
+        by_name = {}  # {qualified_name: [node_id]} across files
+        for file_path in sorted(set(function_cache) | set(class_cache)):
+            module_id = self._add_module(file_path)
+            symbols = [(name, "class") for name in _names(class_cache.get(file_path, []))]
+            symbols += [(name, "function") for name in _names(function_cache.get(file_path, []))]
+            names = local[file_path] = {}
+
+            # ✅ Parents before children: "Outer" sorts before "Outer.method"
+            for name, kind in sorted(symbols, key=lambda symbol: (symbol[0].count("."), symbol[0])):
+                prefix = "cls" if kind == "class" else "fn"
+                node_id = f"{prefix}:{file_path}:{name}"
+                parent = names.get(name.rsplit(".", 1)[0], module_id) if "." in name else module_id
+                self.nodes[node_id] = self._node(node_id, name.rsplit(".", 1)[-1], kind, parent, file_path)
+                self.nodes[parent]["children"].append(node_id)
+                names[name] = node_id
+                by_name.setdefault(name, []).append(node_id)
+
+        # ✅ Symbol counts, accumulated up the tree
+        for node_id, node in self.nodes.items():
+            if node["kind"] in ("class", "function"):
+                parent = node["parent"]
+                while parent is not None:
+                    self.nodes[parent]["size"] += 1
+                    parent = self.nodes[parent]["parent"]
+        for node in self.nodes.values():
+            node["children"].sort(key=lambda child: (-self.nodes[child]["size"], self.nodes[child]["label"]))
+
+        num_edges = 0
+        paths = {}
+        for file_path, relations in relation_cache.items():
+            names = local.get(file_path, {})
+            for caller, callee in relations:
+                source = names.get(caller)
+                if source is None:
+                    continue
+                for target in self._resolve(callee, names, by_name):
+                    if target != source:
+                        self._add_edge(self._path(source, paths), self._path(target, paths))
+                        num_edges += 1
+
+        self.level(ROOT)
+        logging.info(f"Built graph hierarchy {self.id[:12]} with {len(self.nodes)} nodes and {num_edges} call edges")
+        return self
+
+    def level(self, node_id=ROOT):
+        """
+        Payload of an expanded node: its children (at most GRAPH_LEVEL_MAX_NODES, with positions), the
+        rolled-up edges between them and the edges leaving them, each external endpoint rolled up to the
+        node that is visible when the path from the root to node_id is expanded.
+        "<node_id>#<start>" pages through the children beyond the first page. Returns None for unknown nodes.
+        """
+        with self._levels_lock:
+            cached = self._levels.get(node_id)
+        if cached is not None:
+            return cached
+
+        parent_id, start = self._parse_page(node_id)
+        if parent_id not in self.nodes:
+            return None
+
+        payload = self._build_level(parent_id, start, node_id)
+        with self._levels_lock:
+            self._levels[node_id] = payload
+        return payload
+
+    def _build_level(self, parent_id, start, node_id):
+        parent = self.nodes[parent_id]
+        children = parent["children"]
+        limit = max(2, config.GRAPH_LEVEL_MAX_NODES)
+        if len(children) - start > limit:
+            shown = children[start:start + limit - 1]
+            more_id = f"{parent_id}#{start + limit - 1}"
+        else:
+            shown = children[start:]
+            more_id = None
+        shown_set = set(shown)
+        position = {child: i for i, child in enumerate(children)}
+
+        def visible(child):
+            """Id drawn for a child: itself on this page, the "more" node past it, None on earlier pages."""
+            if child in shown_set:
+                return child
+            return more_id if position[child] >= start else None
+
+        internal = {}
+        external = {}
+        for (source, target), weight in self.edges.get(parent_id, {}).items():
+            source_shown = visible(source) if source in position else None
+            target_shown = visible(target) if target in position else None
+            if source_shown and target_shown:
+                if source_shown != target_shown:  # Both ends folded into "more" is not drawn
+                    internal[(source_shown, target_shown)] = internal.get((source_shown, target_shown), 0) + weight
+            elif source_shown or target_shown:
+                # The other end is outside this node, or a child on an earlier page, drawn as itself
+                edge = (source_shown or source, target_shown or target)
+                external[edge] = external.get(edge, 0) + weight
+
+        G = nx.DiGraph()
+        G.add_nodes_from((child, {"type": self.nodes[child]["kind"]}) for child in shown)
+        if more_id:
+            G.add_node(more_id, type="more")
+        G.add_edges_from((source, target, {"weight": weight}) for (source, target), weight in internal.items())
+        drawing = GraphRenderer().to_json(G) if len(G) else {"layout": None, "width": 0, "height": 0, "nodes": []}
+
+        nodes = []
+        for entry in drawing["nodes"]:
+            if entry["id"] == more_id:
+                hidden = children[start + limit - 1:]
+                nodes.append({"id": more_id, "label": f"{len(hidden)} more", "kind": "more", "size":
+                              sum(self.nodes[child]["size"] for child in hidden), "expandable": True,
+                              "x": entry["x"], "y": entry["y"]})
+            else:
+                nodes.append({**self._summary(entry["id"]), "x": entry["x"], "y": entry["y"]})
+
+        return {
+            "hierarchy_id": self.id,
+            "node": node_id,
+            "path": [self._summary(ancestor) for ancestor in self._ancestors(parent_id)],
+            "total_children": len(children),
+            "layout": drawing["layout"],
+            "width": drawing["width"],
+            "height": drawing["height"],
+            "nodes": nodes,
+            "edges": [{"source": s, "target": t, "weight": w} for (s, t), w in sorted(internal.items())],
+            "external_edges": [{"source": s, "target": t, "weight": w} for (s, t), w in sorted(external.items())],
+            "external_nodes": {
+                endpoint: self._summary(endpoint) for (s, t) in external for endpoint in (s, t)
+                if endpoint not in shown_set and endpoint != more_id
+            },
+        }
+
+    def _summary(self, node_id):
+        node = self.nodes[node_id]
+        return {"id": node_id, "label": node["label"], "kind": node["kind"], "size": node["size"],
+                "expandable": bool(node["children"])}
+
+    def _node(self, node_id, label, kind, parent, file_path):
+        return {"id": node_id, "label": label, "kind": kind, "parent": parent, "children": [], "size": 0,
+                "file": file_path}
+
+    def _add_module(self, file_path):
+        """
+        Adds the module node of a file and any missing package nodes above it.
+        """
+        directory, _, file_name = file_path.rpartition("/")
+        parent = ROOT
+        if directory:
+            parts = directory.split("/")
+            for depth in range(len(parts)):
+                package_id = "pkg:" + "/".join(parts[:depth + 1])
+                if package_id not in self.nodes:
+                    self.nodes[package_id] = self._node(package_id, parts[depth], "package", parent, None)
+                    self.nodes[parent]["children"].append(package_id)
+                parent = package_id
+
+        module_id = f"mod:{file_path}"
+        self.nodes[module_id] = self._node(module_id, file_name, "module", parent, file_path)
+        self.nodes[parent]["children"].append(module_id)
+        return module_id
+
+    def _resolve(self, callee, names, by_name):
+        """
+        Definitions a call may refer to: the same file first, then a unique-enough match across files
+        ("Class.method", or "module.function" by its last component).
+        """
+        if callee in names:
+            return [names[callee]]
+        candidates = by_name.get(callee)
+        if not candidates and "." in callee:
+            candidates = by_name.get(callee.rsplit(".", 1)[-1])
+        if not candidates or len(candidates) > self.MAX_CALLEE_CANDIDATES:
+            return []
+        return candidates
+
+    def _path(self, node_id, paths):
+        """
+        Node ids from the root down to node_id, memoized in paths.
+        """
+        path = paths.get(node_id)
+        if path is None:
+            parent = self.nodes[node_id]["parent"]
+            path = paths[node_id] = (self._path(parent, paths) if parent is not None else ()) + (node_id,)
+        return path
+
+    def _ancestors(self, node_id):
+        path = []
+        while node_id is not None:
+            path.append(node_id)
+            node_id = self.nodes[node_id]["parent"]
+        return path[::-1]
+
+    def _add_edge(self, source_path, target_path):
+        """
+        Rolls one call edge up to every level it is visible on: between the children of the lowest common
+        ancestor, and from each node below it on either side to the other side's child of that ancestor.
+        """
+        common = 0
+        while common < min(len(source_path), len(target_path)) and source_path[common] == target_path[common]:
+            common += 1
+        if common == len(source_path) or common == len(target_path):
+            return  # A symbol calling into its own class / function, or the reverse: a self-loop at every level
+
+        source_top, target_top = source_path[common], target_path[common]
+        self._bump(source_path[common - 1], source_top, target_top)
+        for depth in range(common, len(source_path) - 1):
+            self._bump(source_path[depth], source_path[depth + 1], target_top)
+        for depth in range(common, len(target_path) - 1):
+            self._bump(target_path[depth], source_top, target_path[depth + 1])
+
+    def _bump(self, node_id, source, target):
+        edges = self.edges.setdefault(node_id, {})
+        edges[(source, target)] = edges.get((source, target), 0) + 1
+
+    def _parse_page(self, node_id):
+        parent_id, separator, start = node_id.rpartition("#")
+        if separator and start.isdigit() and parent_id in self.nodes:
+            return parent_id, int(start)
+        return node_id, 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_levels_lock"]
+        state["_levels"] = {ROOT: self._levels[ROOT]} if ROOT in self._levels else {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._levels_lock = threading.Lock()
+
+
+def _names(entries):
+    """Qualified names of (name, code) entries; a SymbolView lists them without decoding any code."""
+    return entries.names() if isinstance(entries, SymbolView) else [name for name, _ in entries]
+
+
+def hierarchy_fingerprint(repo):
+    """
+    Content hash of the analyzed files (blob SHAs, or the extracted symbols where no SHA is known).
+    """
+    digest = hashlib.sha256(f"{HIERARCHY_VERSION}:{config.GRAPH_LEVEL_MAX_NODES}".encode("utf-8"))
+    for file_path in sorted(repo.function_cache):
+        sha = repo.file_shas.get(file_path)
+        if sha is None:
+            sha = hashlib.sha256(repr((repo.function_cache[file_path], repo.class_cache.get(file_path),
+                                       repo.relation_cache.get(file_path))).encode("utf-8")).hexdigest()
+        digest.update(f"\x1e{file_path}\x1f{sha}".encode("utf-8", errors="surrogatepass"))
+    return digest.hexdigest()
+
+
+def snapshot_key(upload_key):
+    """
+    Key under which the hierarchy of an upload (see resolve_upload_request) is remembered, or None if the same key
+    can name different code later: GitHub refs other than full commit SHAs (HEAD, branches, tags) and local
+    paths, whose working tree or archive may change. Those are always fetched again.
+    """
+    kind, _, rest = upload_key.partition(":")
+    if kind == "file" or (kind == "github" and _COMMIT_SHA.fullmatch(rest.rpartition("@")[2])):
+        return f"hierarchy-snapshot:{HIERARCHY_VERSION}:{config.GRAPH_LEVEL_MAX_NODES}:{upload_key}"
+    return None
+
+
+def store_hierarchy(hierarchy, snapshot=None):
+    """
+    Stores a hierarchy in both cache tiers and, given a snapshot_key, remembers it for that snapshot.
+    """
+    _get_hierarchy_cache().set(hierarchy.id, hierarchy)
+    get_file_cache().set_object(f"hierarchy:{hierarchy.id}", hierarchy)
+    if snapshot is not None:
+        get_file_cache().set(snapshot, hierarchy.id.encode("ascii"))
+
+
+def load_snapshot(snapshot):
+    """
+    Returns the hierarchy stored for a snapshot_key without fetching the repository, or None.
+    """
+    hierarchy_id = get_file_cache().get(snapshot)
+    if hierarchy_id is None:
+        return None
+    return load_hierarchy(hierarchy_id.decode("ascii"))
+
+
+def load_hierarchy(hierarchy_id):
+    """
+    Returns a stored hierarchy, or None if it is unknown (or was evicted from both cache tiers).
+    """
+    cache = _get_hierarchy_cache()
+    hierarchy = cache.get(hierarchy_id)
+    if hierarchy is None:
+        hierarchy = get_file_cache().get_object(f"hierarchy:{hierarchy_id}")
+        if hierarchy is not None:
+            cache.set(hierarchy_id, hierarchy)
+    return hierarchy
+
+
+_hierarchy_cache = None
+
+
+def _get_hierarchy_cache():
+    global _hierarchy_cache
+    if _hierarchy_cache is None:
+        _hierarchy_cache = LRUCache(config.HIERARCHY_CACHE_ENTRIES)
+    return _hierarchy_cache
@@ -0,0 +1,342 @@
+import json
+import logging
+import math
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+import networkx as nx
+import numpy as np
+
+import config
+from components.artifact_store import graph_fingerprint
+from components.cache import LRUCache, get_file_cache
+
+LAYOUT_VERSION = "1"  # Bump when a layout algorithm changes (invalidates cached layouts)
+NODE_COLORS = {"function": "skyblue", "class": "lightgreen", "file": "lightgray"}
+
+
+def layered_layout(G, max_layer_width=None, sweeps=4):
+    """
+    Layered (Sugiyama-style) layout of a DAG.
+    - layers: longest path from the sources (one topological generation per layer)
+    - order within a layer: barycenter of the predecessors, refined by alternating down/up sweeps
+    - layers wider than max_layer_width nodes wrap onto several rows
+    Returns (nodes, positions) with positions an (n, 2) array in node-spacing units, y growing downwards.
+    """
+    nodes = list(G.nodes)
+    n = len(nodes)
+    if n == 0:
+        return nodes, np.zeros((0, 2))
+    index = {node: i for i, node in enumerate(nodes)}
+
+    layer = np.zeros(n, dtype=np.int64)
+    for depth, generation in enumerate(nx.topological_generations(G)):
+        layer[[index[node] for node in generation]] = depth
+
+    edges = np.array([(index[u], index[v]) for u, v in G.edges], dtype=np.int64).reshape(-1, 2)
+    sources, targets = edges[:, 0], edges[:, 1]
+    n_layers = int(layer.max()) + 1
+    members = [np.flatnonzero(layer == depth) for depth in range(n_layers)]
+
+    # ✅ Barycenter ordering, vectorized per layer with bincount
+    order = np.zeros(n, dtype=np.float64)
+    for layer_members in members:
+        order[layer_members] = np.arange(len(layer_members))
+    for sweep in range(sweeps):
+        downward = sweep % 2 == 0
+        fixed, moving = (sources, targets) if downward else (targets, sources)
+        depths = range(1, n_layers) if downward else range(n_layers - 2, -1, -1)
+        for depth in depths:
+            layer_members = members[depth]
+            sums = np.bincount(moving, weights=order[fixed], minlength=n)
+            counts = np.bincount(moving, minlength=n)
+            barycenter = np.where(counts[layer_members] > 0,
+                                  sums[layer_members] / np.maximum(counts[layer_members], 1), order[layer_members])
+            ranked = layer_members[np.argsort(barycenter, kind="stable")]
+            order[ranked] = np.arange(len(ranked))
+
+    max_layer_width = max_layer_width or max(20, 2 * math.isqrt(n))
+    positions = np.zeros((n, 2))
+    row = 0
+    for layer_members in members:
+        ranked = layer_members[np.argsort(order[layer_members], kind="stable")]
+        for start in range(0, len(ranked), max_layer_width):
+            chunk = ranked[start:start + max_layer_width]
+            positions[chunk, 0] = np.arange(len(chunk)) - (len(chunk) - 1) / 2.0
+            positions[chunk, 1] = row * 1.5
+            row += 1
+    return nodes, positions
+
+
+def force_layout(G, iterations=50, seed=42):
+    """
+    Force-directed layout (Fruchterman-Reingold forces) with a Barnes-Hut approximation on a grid quadtree:
+    repulsion from nodes in the same or adjacent finest cells is exact, farther nodes act through the centre
+    of mass of the largest cell that is still well separated. All forces are computed with numpy on arrays;
+    each iteration costs O(n log n).
+    Returns (nodes, positions) with positions an (n, 2) array in node-spacing units.
+    """
+    nodes = list(G.nodes)
+    n = len(nodes)
+    if n == 0:
+        return nodes, np.zeros((0, 2))
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges if u != v], dtype=np.int64).reshape(-1, 2)
+    weights = np.array([d.get("similarity", 1.0) for u, v, d in G.edges(data=True) if u != v], dtype=np.float64)
+    weights = np.clip(weights, 0.1, None)
+
+    rng = np.random.default_rng(seed)
+    side = math.sqrt(n)  # Ideal distance 1 → the layout spans about sqrt(n) units
+    positions = rng.uniform(0, side, size=(n, 2))
+    temperature = side / 10.0
+    levels = max(1, math.ceil(math.log2(math.sqrt(n / 4.0)))) if n > 4 else 1  # About 4 nodes per finest cell
+
+    for _ in range(iterations):
+        displacement = _repulsion(positions, levels)
+
+        if len(edges):
+            delta = positions[edges[:, 1]] - positions[edges[:, 0]]
+            distance = np.linalg.norm(delta, axis=1, keepdims=True) + 1e-9
+            pull = delta * distance * weights[:, None]  # Attraction d² / k along each edge
+            np.add.at(displacement, edges[:, 0], pull)
+            np.add.at(displacement, edges[:, 1], -pull)
+
+        length = np.linalg.norm(displacement, axis=1, keepdims=True) + 1e-9
+        positions += displacement / length * np.minimum(length, temperature)
+        temperature *= 0.93
+
+    return nodes, positions - positions.mean(axis=0)
+
+
+def _repulsion(positions, levels, block=1 << 20):
+    """
+    Repulsive displacement k² / d for every node (k = 1), see force_layout.
+    x and y are kept in separate arrays: numpy is much faster on (n, m) than on (n, m, 2) arrays.
+    """
+    n = len(positions)
+    x, y = positions[:, 0], positions[:, 1]
+    low = positions.min(axis=0)
+    span = max(float((positions.max(axis=0) - low).max()), 1e-9)
+    finest = 1 << levels
+    cells = np.minimum(((positions - low) / span * finest).astype(np.int64), finest - 1)
+    force_x = np.zeros(n)
+    force_y = np.zeros(n)
+
+    # ✅ Far field: at each level, the cells that are children of the parent's neighbours but not adjacent
+    # themselves (at most 27 per node and level), represented by their centre of mass
+    offsets = np.arange(-2, 4)
+    for level in range(2, levels + 1):
+        size = 1 << level
+        cell_x = cells[:, 0] >> (levels - level)
+        cell_y = cells[:, 1] >> (levels - level)
+        cell_id = cell_x * size + cell_y
+        counts = np.bincount(cell_id, minlength=size * size).astype(np.float64)
+        center_x = np.bincount(cell_id, weights=x, minlength=size * size) / np.maximum(counts, 1)
+        center_y = np.bincount(cell_id, weights=y, minlength=size * size) / np.maximum(counts, 1)
+
+        CX, CY = np.broadcast_arrays(((cell_x >> 1) * 2)[:, None, None] + offsets[None, :, None],
+                                     ((cell_y >> 1) * 2)[:, None, None] + offsets[None, None, :])
+        CX, CY = CX.reshape(n, 36), CY.reshape(n, 36)
+        valid = (CX >= 0) & (CX < size) & (CY >= 0) & (CY < size)
+        valid &= (np.abs(CX - cell_x[:, None]) > 1) | (np.abs(CY - cell_y[:, None]) > 1)
+        ids = np.where(valid, CX * size + CY, 0)
+
+        dx = x[:, None] - center_x[ids]
+        dy = y[:, None] - center_y[ids]
+        strength = np.where(valid, counts[ids], 0.0) / (dx * dx + dy * dy + 1e-9)
+        force_x += (dx * strength).sum(axis=1)
+        force_y += (dy * strength).sum(axis=1)
+
+    # ✅ Near field: exact pairs with the members of the 3×3 neighbourhood of finest cells,
+    # gathered through a padded (cells, max_occupancy) member table
+    cell_id = cells[:, 0] * finest + cells[:, 1]
+    order = np.argsort(cell_id, kind="stable")
+    counts = np.bincount(cell_id, minlength=finest * finest)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    occupancy = int(counts.max())
+    members = np.full((finest * finest + 1, occupancy), n, dtype=np.int64)  # Index n is a sentinel
+    members[cell_id[order], np.arange(n) - starts[cell_id[order]]] = order
+    # The last row stands for cells outside the grid
+    padded_x = np.append(x, np.nan)
+    padded_y = np.append(y, np.nan)
+
+    shift_x = np.repeat([-1, 0, 1], 3)
+    shift_y = np.tile([-1, 0, 1], 3)
+    step = max(1, block // (9 * occupancy))
+    for start in range(0, n, step):
+        stop = min(start + step, n)
+        nx_cells = cells[start:stop, 0, None] + shift_x
+        ny_cells = cells[start:stop, 1, None] + shift_y
+        inside = (nx_cells >= 0) & (nx_cells < finest) & (ny_cells >= 0) & (ny_cells < finest)
+        neighbours = members[np.where(inside, nx_cells * finest + ny_cells, finest * finest)].reshape(stop - start, -1)
+
+        dx = x[start:stop, None] - padded_x[neighbours]
+        dy = y[start:stop, None] - padded_y[neighbours]
+        distance2 = dx * dx + dy * dy
+        usable = distance2 > 0  # False for self pairs, sentinels (NaN) and exact overlaps
+        strength = np.where(usable, 1.0 / np.where(usable, distance2, 1.0), 0.0)
+        force_x[start:stop] += np.where(usable, dx * strength, 0.0).sum(axis=1)
+        force_y[start:stop] += np.where(usable, dy * strength, 0.0).sum(axis=1)
+
+    return np.stack([force_x, force_y], axis=1)
+
+
+class GraphRenderer:
+    UNIT = 60  # Pixels per layout unit in SVG / JSON output
+
+    def __init__(self):
+        """
+        Lays out component graphs (DAGs) in layers and other graphs (e.g. k-NN) with the force layout,
+        caching layouts by graph fingerprint, and renders them as PNG, SVG or a JSON payload.
+        """
+        self.layout_cache = _get_layout_cache()
+
+    def layout(self, G):
+        """
+        Returns (layout_name, nodes, positions), computed once per distinct graph.
+        """
+        name = "layered" if G.is_directed() and nx.is_directed_acyclic_graph(G) else "force"
+        key = f"layout:{graph_fingerprint(G, layout=name, version=LAYOUT_VERSION)}"
+
+        cached = self.layout_cache.get(key)
+        if cached is None:
+            cached = get_file_cache().get_object(key)
+            if cached is None:
+                nodes, positions = layered_layout(G) if name == "layered" else force_layout(G)
+                cached = (name, nodes, positions)
+                get_file_cache().set_object(key, cached)
+                logging.info(f"Computed {name} layout for {len(nodes)} nodes")
+            self.layout_cache.set(key, cached)
+        return cached
+
+    def to_json(self, G):
+        """
+        Node/edge/position payload for client-side drawing.
+        """
+        name, nodes, positions = self.layout(G)
+        pixels = self._to_pixels(positions)
+        return {
+            "layout": name,
+            "width": float(pixels[:, 0].max()) + self.UNIT if len(nodes) else 0,
+            "height": float(pixels[:, 1].max()) + self.UNIT if len(nodes) else 0,
+            "nodes": [
+                {"id": str(node), "type": G.nodes[node].get("type", "file"), "x": round(float(x), 1), "y": round(float(y), 1)}
+                for node, (x, y) in zip(nodes, pixels)
+            ],
+            "edges": [
+                {"source": str(u), "target": str(v), "weight": data.get("weight", 1)} for u, v, data in G.edges(data=True)
+            ],
+        }
+
+    def to_json_bytes(self, G):
+        return json.dumps(self.to_json(G), separators=(",", ":")).encode("utf-8")
+
+    def to_svg(self, G):
+        """
+        Standalone SVG; labels and arrowheads are drawn only while the graph is small enough to read them.
+        """
+        name, nodes, positions = self.layout(G)
+        pixels = self._to_pixels(positions)
+        index = {node: i for i, node in enumerate(nodes)}
+        n = len(nodes)
+        width = float(pixels[:, 0].max()) + self.UNIT if n else self.UNIT
+        height = float(pixels[:, 1].max()) + self.UNIT if n else self.UNIT
+        radius = 14 if n <= config.RENDER_LABEL_LIMIT else 4
+        arrows = G.is_directed() and G.number_of_edges() <= config.RENDER_ARROW_LIMIT
+
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width:.0f} {height:.0f}" '
+            f'width="{width:.0f}" height="{height:.0f}" font-family="sans-serif" font-size="10">',
+            '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="6" markerHeight="6" '
+            'orient="auto-start-reverse"><path d="M 0 0 L 10 5 L 0 10 z" fill="gray"/></marker></defs>',
+        ]
+        segments = []
+        for u, v in G.edges:
+            (x1, y1), (x2, y2) = pixels[index[u]], pixels[index[v]]
+            if arrows:  # Stop at the node border so the arrowhead stays visible
+                dx, dy = x2 - x1, y2 - y1
+                length = math.hypot(dx, dy) or 1.0
+                x2, y2 = x2 - dx / length * radius, y2 - dy / length * radius
+            segments.append(f"M{x1:.1f} {y1:.1f}L{x2:.1f} {y2:.1f}")
+        if arrows:
+            parts.extend(f'<path d="{segment}" stroke="gray" fill="none" marker-end="url(#arrow)"/>' for segment in segments)
+        elif segments:
+            parts.append(f'<path d="{"".join(segments)}" stroke="gray" stroke-opacity="0.5" fill="none"/>')
+
+        for node_type, color in NODE_COLORS.items():
+            members = [i for i, node in enumerate(nodes) if G.nodes[node].get("type", "file") == node_type]
+            if members:
+                parts.append(f'<g fill="{color}" stroke="black">')
+                parts.extend(f'<circle cx="{pixels[i, 0]:.1f}" cy="{pixels[i, 1]:.1f}" r="{radius}"/>' for i in members)
+                parts.append("</g>")
+
+        if n <= config.RENDER_LABEL_LIMIT:
+            parts.append('<g text-anchor="middle">')
+            parts.extend(
+                f'<text x="{x:.1f}" y="{y + radius + 11:.1f}">{escape(str(node))}</text>' for node, (x, y) in zip(nodes, pixels)
+            )
+            parts.append("</g>")
+        parts.append("</svg>")
+        return "".join(parts).encode("utf-8")
+
+    def to_png(self, G, title="Generated Graph: Repository Structure"):
+        """
+        PNG via matplotlib's object API (no global pyplot state, so concurrent renders are safe).
+        Figure and marker sizes scale with the number of nodes.
+        """
+        # matplotlib is imported on the first render, so it does not slow down app startup
+        from matplotlib.collections import LineCollection
+        from matplotlib.figure import Figure
+
+        name, nodes, positions = self.layout(G)
+        n = len(nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        size = min(16.0, 6.0 + math.sqrt(n) / 3.0)
+        large = n > config.RENDER_LABEL_LIMIT
+        marker_size = max(4.0, min(3000.0, 30000.0 / max(n, 1)))
+
+        fig = Figure(figsize=(size, size))
+        ax = fig.subplots()
+        ax.set_axis_off()
+        ax.invert_yaxis()
+
+        if G.number_of_edges():
+            edges = np.array([(index[u], index[v]) for u, v in G.edges], dtype=np.int64)
+            starts, ends = positions[edges[:, 0]], positions[edges[:, 1]]
+            if G.is_directed() and G.number_of_edges() <= config.RENDER_ARROW_LIMIT:
+                ax.quiver(starts[:, 0], starts[:, 1], ends[:, 0] - starts[:, 0], ends[:, 1] - starts[:, 1],
+                          angles="xy", scale_units="xy", scale=1, color="gray", width=0.002, zorder=1)
+            else:
+                # Antialiasing thousands of long edges dominates the render time of large graphs
+                ax.add_collection(LineCollection(np.stack([starts, ends], axis=1), colors="gray", linewidths=0.5,
+                                                 alpha=0.5, antialiased=not large, zorder=1))
+
+        colors = [NODE_COLORS.get(G.nodes[node].get("type", "file"), "lightgray") for node in nodes]
+        if n:
+            ax.scatter(positions[:, 0], positions[:, 1], s=marker_size, c=colors, edgecolors="black",
+                       linewidths=0 if large else 1, zorder=2)
+        if not large:
+            font_size = 12 if n <= 30 else 7
+            for node, (x, y) in zip(nodes, positions):
+                ax.text(x, y, str(node), fontsize=font_size, fontweight="bold", ha="center", va="center", zorder=3)
+
+        ax.set_title(title, fontsize=16)
+        img_stream = BytesIO()
+        fig.savefig(img_stream, format="png")
+        img_stream.seek(0)
+        return img_stream
+
+    def _to_pixels(self, positions):
+        if not len(positions):
+            return positions
+        return (positions - positions.min(axis=0)) * self.UNIT + self.UNIT / 2.0
+
+
+_layout_cache = None
+
+
+def _get_layout_cache():
+    global _layout_cache
+    if _layout_cache is None:
+        _layout_cache = LRUCache(config.LAYOUT_CACHE_ENTRIES)
+    return _layout_cache
@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import os
+import pickle
+
+import config
+from components.graph_algorithms import topological_order
+from components.graph_handler import GraphHandler
+
+
+def state_path(repo_key):
+    """
+    Location of the persisted analysis state for a repository key (e.g. "owner/name").
+    """
+    digest = hashlib.sha1(repo_key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(config.CACHE_DIR, "states", f"{digest}.pickle")
+
+
+class AnalysisState:
+    def __init__(self):
+        """
+        Everything one analysis run produced, kept so the next commit can be analyzed incrementally.
+        """
+        self.ref = None
+        self.file_shas = {}  # {file_path: blob_sha}
+        self.symbols = None  # SymbolTable with the analyzed Python files
+        self.functions = []  # SymbolView of (file_name, func_name, func_code)
+        self.classes = []  # SymbolView of (file_name, class_name, class_code)
+        self.embeddings = {}  # {file_name: embedding}
+        self.file_summaries = {}  # {file_name: summary}
+        self.component_graph = None
+        self.class_references = None  # GraphHandler.class_references of the component graph
+        self.execution_order = []
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # Atomic, so readers never see a partial state
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns the saved state, or None if there is none (or it cannot be read).
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable analysis state {path}: {e}")
+            return None
+
+
+class IncrementalAnalyzer:
+    def __init__(self, embedding_generator, rag_handler):
+        """
+        Re-runs analysis, embeddings and per-file summaries only for files whose blob SHA changed.
+        """
+        self.embedding_generator = embedding_generator
+        self.rag_handler = rag_handler
+
+    def analyze(self, repo, state=None):
+        """
+        Analyzes repo, reusing a previous AnalysisState when given (a full run otherwise).
+        Returns (new_state, summary) where summary matches RAGHandler.generate_sequential_summary
+        plus the list of changed file paths.
+        """
+        if state is not None and getattr(state, "symbols", None) is not None:
+            # ✅ Unchanged blobs are neither downloaded nor parsed again
+            repo.known_analyses.update({
+                sha: (state.symbols, path) for path, sha in state.file_shas.items() if path in state.symbols
+            })
+
+        functions, classes, _ = repo.fetch_files_from_directory()
+
+        new_state = AnalysisState()
+        new_state.ref = repo.ref
+        new_state.file_shas = dict(repo.file_shas)
+        new_state.symbols = repo.symbols
+        new_state.functions = functions
+        new_state.classes = classes
+
+        old_shas = state.file_shas if state is not None else {}
+        changed_paths = {path for path, sha in new_state.file_shas.items() if old_shas.get(path) != sha}
+        changed_paths |= set(old_shas) - set(new_state.file_shas)
+        # Downstream artifacts are keyed by bare file name, so every file sharing a changed name is refreshed
+        changed_files = {path.rsplit("/", 1)[-1] for path in changed_paths}
+        logging.info(f"Incremental analysis: {len(changed_paths)} of {len(new_state.file_shas)} files changed")
+
+        # ✅ Embeddings for changed files only
+        new_state.embeddings = {
+            file_name: embedding for file_name, embedding in (state.embeddings if state else {}).items()
+            if file_name not in changed_files
+        }
+        changed_functions = [entry for entry in functions if entry[0] in changed_files]
+        if changed_functions:
+            new_state.embeddings.update(self.embedding_generator.generate_embeddings_batch(changed_functions))
+
+        # ✅ Patch the component graph: only changed files are tokenized again
+        graph_handler = GraphHandler(functions, classes)
+        if state is not None and state.component_graph is not None and functions and classes:
+            component_graph = graph_handler.patch_component_graph(
+                state.component_graph, changed_files, state.classes, getattr(state, "class_references", None)
+            )
+        else:
+            component_graph = graph_handler.create_graph()
+        new_state.component_graph = component_graph
+        new_state.class_references = graph_handler.class_references
+        new_state.execution_order = topological_order(component_graph)
+
+        # ✅ Per-file summaries for changed files only
+        file_function_map = self.rag_handler.group_functions_by_file(functions)
+        previous_summaries = state.file_summaries if state is not None else {}
+        stale = {
+            file_name: funcs for file_name, funcs in file_function_map.items()
+            if file_name in changed_files or file_name not in previous_summaries
+        }
+        fresh_summaries = {
+            file_name: summary for file_name, summary, error in self.rag_handler.summarize_files(stale) if error is None
+        }
+        for file_name in file_function_map:
+            if file_name in fresh_summaries:
+                new_state.file_summaries[file_name] = fresh_summaries[file_name]
+            elif file_name not in stale:
+                new_state.file_summaries[file_name] = previous_summaries[file_name]
+            # Failed summaries are left out of the state so the next refresh retries them
+
+        # Unchanged packages render identical reduce prompts, which the LLM cache answers
+        package_summaries, repo_summary, _ = self.rag_handler.planner.summarize_hierarchy(
+            new_state.file_summaries, self.rag_handler.package_map(repo)
+        )
+
+        diagram_path = self.rag_handler.create_block_diagram(new_state.execution_order, new_state.file_summaries)
+        summary = {
+            "file_summaries": new_state.file_summaries,
+            "package_summaries": package_summaries,
+            "repo_summary": repo_summary,
+            "pipeline_diagram": diagram_path,
+            "execution_order": new_state.execution_order,
+            "changed_files": sorted(changed_paths),
+        }
+        return new_state, summary
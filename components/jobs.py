@@ -0,0 +1,297 @@
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+
+class Job:
+    def __init__(self, key, kind, queue=None):
+        """
+        One unit of background work. Progress is a free-form dict updated by the running task.
+        The job record lives in the JobQueue store, so every worker process can report on it.
+        """
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.kind = kind
+        self.status = "queued"  # queued → running → done | failed
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.subscribers = 1  # Requests coalesced onto this job
+        self.owner_pid = os.getpid()  # Process running the job
+        self._queue = queue
+        self._local = True  # Run by this process (False for jobs loaded from the store)
+        self._done = threading.Event()
+        self._saved_at = 0.0
+
+    def update(self, **progress):
+        self.progress.update(progress)
+        # Progress reaches other workers through the store: stage changes at once, the rest at most every interval
+        now = time.monotonic()
+        if self._queue is not None and ("stage" in progress or now - self._saved_at >= config.JOB_POLL_INTERVAL):
+            self._saved_at = now
+            self._queue._save_progress(self)
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the job finishes. Returns True if it did within timeout.
+        A job run by another worker process is polled in the store.
+        """
+        if self._local or self._queue is None:
+            return self._done.wait(timeout)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.finished:
+            remaining = config.JOB_POLL_INTERVAL if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(config.JOB_POLL_INTERVAL, remaining))
+            self._queue._reload(self)
+        return True
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "error": self.error,
+            "subscribers": self.subscribers,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    COLUMNS = ("id", "key", "kind", "status", "progress", "result", "error", "subscribers", "created_at",
+               "started_at", "finished_at", "owner_pid")
+
+    def __init__(self, max_workers=config.JOB_WORKERS, max_history=config.JOB_HISTORY, path=config.JOB_STORE_PATH):
+        """
+        Runs jobs on a bounded thread pool, keeping job records in a SQLite store shared by every worker
+        process on the host, so any worker can report the status and result of any job.
+        Submissions with the key of a queued or running job join that job instead of starting another one
+        (single-flight), even if another worker runs it, so concurrent requests for the same repository and
+        commit run the pipeline once. The key is claimed in the same transaction that checks it.
+        Jobs whose process exited are marked failed and do not block their key.
+        Up to max_history finished jobs are kept for their results.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="job")
+        self._jobs = {}  # {job_id: Job} run by this process, until they finish
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, key TEXT NOT NULL, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "progress TEXT NOT NULL, result BLOB, error TEXT, subscribers INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL, owner_pid INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS in_flight (key TEXT PRIMARY KEY, job_id TEXT NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+
+    def _connection(self):
+        # One connection per process: a connection opened before a fork (gunicorn preload) must not be reused
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._pid = os.getpid()
+        return self._conn
+
+    def submit(self, key, kind, fn, *args):
+        """
+        Schedules fn(job, *args), whose return value becomes the job result.
+        Returns (job, coalesced) where coalesced is True if an in-flight job with the same key was reused.
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")  # Serializes claims on the key across processes
+            try:
+                row = conn.execute(
+                    f"SELECT {', '.join('j.' + column for column in self.COLUMNS)} "
+                    "FROM in_flight f JOIN jobs j ON j.id = f.job_id WHERE f.key = ?", (key,)
+                ).fetchone()
+                job = self._from_row(row) if row is not None else None
+                if job is not None and not job.finished:
+                    conn.execute("UPDATE jobs SET subscribers = subscribers + 1 WHERE id = ?", (job.id,))
+                    conn.execute("COMMIT")
+                    job = self._jobs.get(job.id, job)
+                    job.subscribers += 1
+                    logging.info(f"Coalesced request onto job {job.id} ({key})")
+                    return job, True
+
+                job = Job(key, kind, self)
+                self._insert(conn, job)
+                conn.execute("INSERT OR REPLACE INTO in_flight (key, job_id) VALUES (?, ?)", (key, job.id))
+                self._trim(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job, fn, args)
+        return job, False
+
+    def get(self, job_id):
+        """
+        Returns the job with this id, whichever worker process runs it, or None if it is unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job
+            row = self._connection().execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            return self._from_row(row) if row is not None else None
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        return {status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")}
+
+    def _run(self, job, fn, args):
+        job.status = "running"
+        job.started_at = time.time()
+        self._save(job)
+        try:
+            job.result = fn(job, *args)
+            job.status = "done"
+        except Exception as e:
+            logging.error(f"Job {job.id} ({job.key}) failed: {str(e)}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            try:
+                self._save(job, release=True)
+            except Exception as e:  # e.g. an unpicklable result: the job still has to finish
+                logging.error(f"Could not store job {job.id}: {str(e)}")
+                job.result, job.error, job.status = None, f"Could not store the result: {e}", "failed"
+                self._save(job, release=True)
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            job._done.set()
+
+    def _insert(self, conn, job):
+        conn.execute(
+            f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+            (job.id, job.key, job.kind, job.status, json.dumps(job.progress, default=str), None, job.error,
+             job.subscribers, job.created_at, job.started_at, job.finished_at, job.owner_pid)
+        )
+
+    def _save(self, job, release=False):
+        """
+        Writes the state of a job run by this process; release=True also frees its key for new submissions.
+        """
+        result = pickle.dumps(job.result, protocol=pickle.HIGHEST_PROTOCOL) if job.status == "done" else None
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, progress = ?, result = ?, error = ?, started_at = ?, "
+                    "finished_at = ? WHERE id = ?",
+                    (job.status, json.dumps(job.progress, default=str), result, job.error, job.started_at,
+                     job.finished_at, job.id)
+                )
+                if release:
+                    conn.execute("DELETE FROM in_flight WHERE key = ? AND job_id = ?", (job.key, job.id))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _save_progress(self, job):
+        with self._lock:
+            self._connection().execute("UPDATE jobs SET progress = ? WHERE id = ?",
+                                       (json.dumps(job.progress, default=str), job.id))
+
+    def _reload(self, job):
+        """
+        Refreshes a job loaded from the store (run by another process) in place.
+        """
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job.id,)
+            ).fetchone()
+        if row is None:  # Removed from the store (e.g. it was deleted by hand)
+            job.status, job.error = "failed", "The job record was removed"
+            return
+        job.__dict__.update(self._from_row(row).__dict__)
+
+    def _from_row(self, row):
+        """
+        Job handle for a stored record. A queued or running job whose process has exited is marked failed.
+        Called with the lock held.
+        """
+        record = dict(zip(self.COLUMNS, row))
+        job = Job(record["key"], record["kind"], self)
+        job._local = False
+        for name in ("id", "status", "error", "subscribers", "created_at", "started_at", "finished_at", "owner_pid"):
+            setattr(job, name, record[name])
+        job.progress = json.loads(record["progress"])
+        if record["result"] is not None:
+            job.result = pickle.loads(record["result"])
+
+        if not job.finished and not _process_alive(job.owner_pid):
+            logging.warning(f"Job {job.id} ({job.key}) was left {job.status} by exited process {job.owner_pid}")
+            job.status, job.error, job.finished_at = "failed", "The worker running the job exited", time.time()
+            self._connection().execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (job.status, job.error, job.finished_at, job.id, record["status"])
+            )
+            self._connection().execute("DELETE FROM in_flight WHERE job_id = ?", (job.id,))
+        if job.finished:
+            job._done.set()
+        return job
+
+    def _trim(self, conn):
+        """
+        Forgets the oldest finished jobs beyond max_history. Called inside a transaction.
+        """
+        conn.execute(
+            "DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE status IN ('done', 'failed') "
+            "ORDER BY finished_at DESC LIMIT -1 OFFSET ?)", (self.max_history,)
+        )
+
+
+def _process_alive(pid):
+    """
+    True if a process with this id exists on the host (the job store is local to the host).
+    """
+    if pid == os.getpid() or os.name == "nt":  # os.kill(pid, 0) would terminate the process on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by another user
+    return True
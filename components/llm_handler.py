@@ -1,15 +1,88 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import ollama
 import config
+from components.cache import get_llm_caches
+
+
+class LLMError(Exception):
+    """Raised when the LLM could not produce a response (never cached)."""
+
+
 class LLMHandler:
-    def __init__(self, model_name="llama3.2"):
-        self.model_name = config.LLM_MODEL_NAME
+    def __init__(self, model_name=config.LLM_MODEL_NAME, host=config.OLLAMA_HOST, max_concurrency=config.LLM_CONCURRENCY,
+                 use_cache=config.LLM_CACHE_ENABLED):
+        """
+        - host: Ollama server URL (None uses the ollama client default / OLLAMA_HOST)
+        - max_concurrency: maximum number of LLM requests in flight for query_many
+        - use_cache: answer repeated prompts from the in-memory LRU / on-disk response cache
+        """
+        self.model_name = model_name
+        self.client = ollama.Client(host=host)  # ✅ One pooled HTTP client, safe to share between threads
+        self.max_concurrency = max(1, max_concurrency)
+        self.memory_cache, self.disk_cache = get_llm_caches() if use_cache else (None, None)
 
-    def query_llm(self, prompt):
+    def cache_key(self, prompt, template_version):
+        """
+        Cache key of a prompt: model, prompt template version and a hash of the rendered prompt.
+        """
+        digest = hashlib.sha256(prompt.encode("utf-8", errors="surrogatepass")).hexdigest()
+        return f"llm:{self.model_name}:{template_version}:{digest}"
+
+    def query_llm(self, prompt, template_version="raw"):
         """
         Queries LLaMA model with a given prompt.
+        template_version names the prompt template; bump it when a template changes to invalidate old answers.
+        Raises LLMError if the model cannot be queried.
         """
+        key = self.cache_key(prompt, template_version)
+        if self.memory_cache is not None:
+            response = self.memory_cache.get(key)
+            if response is not None:
+                return response
+            cached = self.disk_cache.get(key)
+            if cached is not None:
+                response = cached.decode("utf-8")
+                self.memory_cache.set(key, response)
+                return response
+
         try:
-            response = ollama.chat(model=self.model_name, messages=[{"role": "user", "content": prompt}])
-            return response["message"]["content"]
+            response = self.client.chat(model=self.model_name, messages=[{"role": "user", "content": prompt}])
+            content = response["message"]["content"]
         except Exception as e:
-            return f"Error querying LLaMA: {str(e)}"
+            raise LLMError(f"Error querying LLaMA: {str(e)}") from e
+
+        # ✅ Only successful answers are cached
+        if self.memory_cache is not None:
+            self.memory_cache.set(key, content)
+            self.disk_cache.set(key, content.encode("utf-8"))
+        return content
+
+    def query_many(self, prompts, template_version="raw"):
+        """
+        Runs {key: prompt} queries concurrently (at most max_concurrency at a time).
+        Yields (key, response, error) triples as soon as each one completes, not in input order;
+        error is the LLMError message (and response None) when a query failed. Closing the generator early
+        cancels the queued queries (those already running finish in the background).
+        """
+        if not prompts:
+            return
+        executor = ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(prompts)))
+        try:
+            futures = {executor.submit(self.query_llm, prompt, template_version): key for key, prompt in prompts.items()}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except LLMError as e:
+                    logging.error(f"LLM query for {futures[future]} failed: {e}")
+                    yield futures[future], None, str(e)
+        finally:
+            # ✅ A consumer that stops early (e.g. a disconnected SSE client) neither waits for nor runs queued prompts
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def cache_stats(self):
+        if self.memory_cache is None:
+            return {}
+        return {"memory": self.memory_cache.stats(), "disk": self.disk_cache.stats()}
@@ -0,0 +1,285 @@
+import fnmatch
+import hashlib
+import logging
+import mmap
+import os
+import subprocess
+import tarfile
+import zipfile
+
+import config
+from components.repository import BaseRepository
+
+
+def git_blob_sha(data):
+    """
+    Computes the git blob SHA of raw file bytes, so local files share cache entries with GitHub blobs.
+    """
+    digest = hashlib.sha1(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class LocalRepository(BaseRepository):
+    def __init__(self, source, ref="HEAD", ignore_patterns=None, cache=None):
+        """
+        Repository backend reading a local checkout, a bare git repository or a tar/zip archive.
+        Exposes the same interface as CodeRepository so it can feed process_code and RAGHandler.
+        """
+        super().__init__(cache)
+        self.source = os.path.abspath(source)
+        self.ref = ref
+        self.ignore_patterns = list(config.LOCAL_IGNORE_PATTERNS if ignore_patterns is None else ignore_patterns)
+        self.kind = self._detect_kind()
+
+        if self.kind == 'directory':
+            self.ignore_patterns.extend(self._read_gitignore())
+
+    def _detect_kind(self):
+        if os.path.isdir(self.source):
+            if os.path.isdir(os.path.join(self.source, '.git')):
+                return 'directory'
+            if all(os.path.exists(os.path.join(self.source, name)) for name in ('HEAD', 'objects', 'refs')):
+                return 'bare'
+            return 'directory'
+        if os.path.isfile(self.source):
+            if zipfile.is_zipfile(self.source):
+                return 'zip'
+            if tarfile.is_tarfile(self.source):
+                return 'tar'
+        raise ValueError(f"Unsupported repository source: {self.source}")
+
+    def _read_gitignore(self):
+        path = os.path.join(self.source, '.gitignore')
+        if not os.path.isfile(path):
+            return []
+        with open(path, 'r', errors='replace') as f:
+            lines = [line.strip() for line in f]
+        # Negated patterns are not supported; anchored and directory patterns are matched by name
+        return [line.strip('/') for line in lines if line and not line.startswith(('#', '!'))]
+
+    def is_ignored(self, path):
+        """
+        Checks a repository-relative path against the ignore patterns (by full path and by each component).
+        """
+        parts = path.split('/')
+        for pattern in self.ignore_patterns:
+            if fnmatch.fnmatch(path, pattern) or any(fnmatch.fnmatch(part, pattern) for part in parts):
+                return True
+        return False
+
+    def fetch_files_from_directory(self, dir_path=''):
+        """
+        Reads every non-ignored file under dir_path and extracts functions and classes using AST.
+        Python files whose analysis is cached for their blob SHA are not decoded or parsed again.
+        Returns:
+            functions: SymbolView of (file_name, func_name, func_code)
+            classes: SymbolView of (file_name, class_name, class_code)
+            metadata_files: list of file names (non-Python)
+        """
+        function_rows = []
+        class_rows = []
+        metadata_files_list = []
+
+        prefix = dir_path.strip('/')
+        entries = []
+        pending = {}
+        for file_path, sha, read in self._iter_files():
+            if prefix and not file_path.startswith(prefix + '/'):
+                continue
+            if self._needs_content(file_path, sha):
+                data = read()
+                if data is None:
+                    continue
+                pending[file_path] = (sha, self._decode(file_path, data))
+            entries.append((file_path, sha))
+
+        # ✅ Parse everything that was not cached in one batch (process pool for large checkouts)
+        self._analyze_pending(pending)
+
+        for file_path, sha in entries:
+            self._collect_file(file_path, file_path.rsplit('/', 1)[-1], sha, None,
+                               function_rows, class_rows, metadata_files_list)
+
+        return self.symbols.view(function_rows), self.symbols.view(class_rows), metadata_files_list
+
+    def iter_files(self, dir_path=''):
+        """
+        Streams the files under dir_path in walk order (see BaseRepository.iter_files); only Python files
+        without a cached analysis are decoded.
+        """
+        prefix = dir_path.strip('/')
+        for file_path, sha, read in self._iter_files():
+            if prefix and not file_path.startswith(prefix + '/'):
+                continue
+            with self.lock:
+                needed = self._needs_content(file_path, sha)
+            content = None
+            if needed:
+                data = read()
+                if data is None:
+                    continue
+                content = self._decode(file_path, data)
+            yield file_path, file_path.rsplit('/', 1)[-1], sha, content
+
+    def get_file_content(self, file_path):
+        """
+        Retrieves file content from the cache, reading that one file from the source on first access.
+        """
+        content = self._cached_content(file_path)
+        if content is not None:
+            return content
+        if self.is_ignored(file_path):
+            return None
+        data = self._read_file(file_path)
+        return self._decode(file_path, data) if data is not None else None
+
+    def _read_file(self, file_path):
+        """
+        Bytes of a single file, looked up directly instead of walking (and hashing) the whole source.
+        Returns None if there is no such file.
+        """
+        if self.kind == 'directory':
+            root = os.path.realpath(self.source)
+            full_path = os.path.realpath(os.path.join(root, file_path))
+            if not full_path.startswith(root + os.sep) or not os.path.isfile(full_path):
+                return None
+            try:
+                with open(full_path, 'rb') as f:
+                    return f.read()
+            except OSError as e:
+                logging.warning(f"Skipping unreadable file {full_path}: {e}")
+                return None
+
+        if self.kind == 'bare':
+            obj = self.file_shas.get(file_path) or f'{self.ref}:{file_path}'
+            result = subprocess.run(['git', '--git-dir', self.source, 'cat-file', 'blob', obj], capture_output=True)
+            return result.stdout if result.returncode == 0 else None
+
+        names = (file_path, './' + file_path)  # Archives may store paths with a leading ./
+        if self.kind == 'zip':
+            with zipfile.ZipFile(self.source) as archive:
+                for name in names:
+                    try:
+                        return archive.read(name)
+                    except KeyError:
+                        continue
+            return None
+
+        with tarfile.open(self.source) as archive:
+            for name in names:
+                try:
+                    member = archive.getmember(name)
+                except KeyError:
+                    continue
+                if member.isfile():
+                    return archive.extractfile(member).read()
+        return None
+
+    def _decode(self, file_path, data):
+        self.file_cache[file_path] = data.decode('utf-8', errors='replace')
+        return self.file_cache[file_path]
+
+    def _iter_files(self):
+        """
+        Yields (path, blob_sha, read) for every non-ignored file; read() returns the file bytes, or None if
+        they cannot be read (callers skip the file).
+        """
+        if self.kind == 'directory':
+            return self._iter_directory()
+        if self.kind == 'bare':
+            return self._iter_git()
+        if self.kind == 'zip':
+            return self._iter_zip()
+        return self._iter_tar()
+
+    def _iter_directory(self):
+        for root, dirs, files in os.walk(self.source):
+            rel_root = os.path.relpath(root, self.source).replace(os.sep, '/')
+            rel_root = '' if rel_root == '.' else rel_root + '/'
+
+            dirs[:] = sorted(d for d in dirs if not self.is_ignored(rel_root + d))
+            for name in sorted(files):
+                file_path = rel_root + name
+                if self.is_ignored(file_path):
+                    continue
+
+                full_path = os.path.join(root, name)
+                data = self._map_file(full_path)
+                if data is None:
+                    continue
+                try:
+                    sha = git_blob_sha(data)
+                    yield file_path, sha, lambda data=data: bytes(data)
+                finally:
+                    if isinstance(data, mmap.mmap):
+                        data.close()
+
+    def _map_file(self, full_path):
+        """
+        Memory-maps a file for reading (empty files cannot be mapped and are returned as b'').
+        """
+        try:
+            with open(full_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b''
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError as e:
+            logging.warning(f"Skipping unreadable file {full_path}: {e}")
+            return None
+
+    def _iter_git(self):
+        listing = subprocess.run(
+            ['git', '--git-dir', self.source, 'ls-tree', '-r', '-z', self.ref],
+            capture_output=True, check=True
+        ).stdout.decode('utf-8', errors='replace')
+
+        entries = []
+        for record in listing.split('\0'):
+            if not record:
+                continue
+            meta, file_path = record.split('\t', 1)
+            mode, obj_type, sha = meta.split()
+            if obj_type == 'blob' and not self.is_ignored(file_path):
+                entries.append((file_path, sha))
+
+        # ✅ Stream blob contents through one long-lived `git cat-file --batch` process
+        with subprocess.Popen(['git', '--git-dir', self.source, 'cat-file', '--batch'],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE) as proc:
+            def read_blob(file_path, sha):
+                proc.stdin.write(sha.encode() + b'\n')
+                proc.stdin.flush()
+                header = proc.stdout.readline().split()
+                if len(header) != 3:  # "<sha> missing", e.g. in a partial or shallow clone
+                    logging.warning(f"Skipping {file_path}: blob {sha} is missing from {self.source}")
+                    return None
+                size = int(header[2])
+                data = proc.stdout.read(size)
+                proc.stdout.read(1)  # Trailing newline
+                return data
+
+            for file_path, sha in entries:
+                yield file_path, sha, lambda file_path=file_path, sha=sha: read_blob(file_path, sha)
+            proc.stdin.close()
+
+    def _iter_zip(self):
+        with zipfile.ZipFile(self.source) as archive:
+            for info in archive.infolist():
+                file_path = self._normalize(info.filename)
+                if info.is_dir() or self.is_ignored(file_path):
+                    continue
+                data = archive.read(info)
+                yield file_path, git_blob_sha(data), lambda data=data: data
+
+    def _iter_tar(self):
+        with tarfile.open(self.source) as archive:
+            for member in archive:
+                file_path = self._normalize(member.name)
+                if not member.isfile() or self.is_ignored(file_path):
+                    continue
+                data = archive.extractfile(member).read()
+                yield file_path, git_blob_sha(data), lambda data=data: data
+
+    @staticmethod
+    def _normalize(name):
+        return name[2:] if name.startswith('./') else name
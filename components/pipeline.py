@@ -0,0 +1,227 @@
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+import config
+
+_END = object()  # Marks the end of a stream
+
+
+class _Failed:
+    """Carries an exception raised by a stage down to the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class PipelineCancelled(Exception):
+    pass
+
+
+class Stage:
+    def __init__(self, name, fn, batch_size=1):
+        """
+        One step of a streaming pipeline, run on its own thread. fn(items) receives a list of up to batch_size
+        input items (fewer when no more input is waiting, so batching never delays a lone item) and returns an
+        iterable of output items. busy / items record the time spent in fn and the number of inputs.
+        """
+        self.name = name
+        self.fn = fn
+        self.batch_size = max(1, batch_size)
+        self.busy = 0.0
+        self.items = 0
+
+
+def _put(channel, item, cancelled):
+    while not cancelled.is_set():
+        try:
+            channel.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+    raise PipelineCancelled()
+
+
+def _get(channel, cancelled):
+    while not cancelled.is_set():
+        try:
+            return channel.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    raise PipelineCancelled()
+
+
+def _get_batch(channel, batch_size, cancelled):
+    """Blocks for one item, then takes up to batch_size - 1 more that are already queued."""
+    items = [_get(channel, cancelled)]
+    while len(items) < batch_size and items[-1] is not _END and not isinstance(items[-1], _Failed):
+        try:
+            items.append(channel.get_nowait())
+        except queue.Empty:
+            break
+    return items
+
+
+def _run_source(source, stage, outbox, cancelled):
+    iterator = iter(source)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                stage.busy += time.perf_counter() - start
+            stage.items += 1
+            _put(outbox, item, cancelled)
+        _put(outbox, _END, cancelled)
+    except PipelineCancelled:
+        pass
+    except Exception as e:
+        logging.error(f"Pipeline stage {stage.name} failed: {e}")
+        try:
+            _put(outbox, _Failed(e), cancelled)
+        except PipelineCancelled:
+            pass
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+def _run_stage(stage, inbox, outbox, cancelled):
+    try:
+        while True:
+            items = _get_batch(inbox, stage.batch_size, cancelled)
+            last = items[-1]
+            if last is _END or isinstance(last, _Failed):
+                items.pop()
+            if items:
+                start = time.perf_counter()
+                outputs = list(stage.fn(items))
+                stage.busy += time.perf_counter() - start
+                stage.items += len(items)
+                for output in outputs:
+                    _put(outbox, output, cancelled)
+            if last is _END or isinstance(last, _Failed):
+                _put(outbox, last, cancelled)
+                return
+    except PipelineCancelled:
+        pass
+    except Exception as e:
+        logging.error(f"Pipeline stage {stage.name} failed: {e}")
+        try:
+            _put(outbox, _Failed(e), cancelled)
+        except PipelineCancelled:
+            pass
+
+
+def run_stages(source, stages, capacity=config.PIPELINE_QUEUE_SIZE, source_name="source"):
+    """
+    Streams the items of source through stages, each on its own thread, connected by queues holding at most
+    capacity items, so a slow stage blocks the ones before it instead of letting results pile up in memory.
+    Yields the outputs of the last stage in order. An exception in any stage is re-raised here; closing the
+    generator early stops every stage.
+    """
+    source_stage = Stage(source_name, None)
+    cancelled = threading.Event()
+    channels = [queue.Queue(maxsize=max(1, capacity)) for _ in range(len(stages) + 1)]
+    threads = [threading.Thread(target=_run_source, args=(source, source_stage, channels[0], cancelled),
+                                name=f"pipeline-{source_name}", daemon=True)]
+    for stage, inbox, outbox in zip(stages, channels, channels[1:]):
+        threads.append(threading.Thread(target=_run_stage, args=(stage, inbox, outbox, cancelled),
+                                        name=f"pipeline-{stage.name}", daemon=True))
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            item = channels[-1].get()
+            if item is _END:
+                break
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+    finally:
+        cancelled.set()
+        for thread in threads:
+            thread.join()
+        timings = ", ".join(f"{stage.name} {stage.busy:.2f} s / {stage.items} items"
+                            for stage in [source_stage, *stages])
+        logging.info(f"Pipeline finished in {time.perf_counter() - start:.2f} s (busy time per stage: {timings})")
+
+
+class IngestionPipeline:
+    def __init__(self, repo, embedding_generator, parse_batch=config.PIPELINE_PARSE_BATCH,
+                 embed_batch=config.PIPELINE_EMBED_BATCH, capacity=config.PIPELINE_QUEUE_SIZE):
+        """
+        Fetch → parse → embed as one stream: files leave repo.iter_files as they are read or downloaded, are parsed
+        in batches of up to parse_batch files (on the analyzer's process pool for large batches) and their functions
+        are embedded in batches of up to embed_batch files, all three overlapping. Produces the same results as
+        fetch_files_from_directory followed by generate_embeddings_batch.
+        """
+        self.repo = repo
+        self.embedding_generator = embedding_generator
+        self.parse_batch = parse_batch
+        self.embed_batch = embed_batch
+        self.capacity = capacity
+
+    def run(self, dir_path='', progress=None):
+        """
+        Returns (functions, classes, metadata_files, embeddings) where embeddings maps file names to the
+        embedding of their last function. progress(**counts), if given, is called as files complete.
+        """
+        function_rows, class_rows, metadata_files, embeddings = [], [], [], {}
+        files = 0
+        stages = [Stage("parse", self._parse, self.parse_batch), Stage("embed", self._embed, self.embed_batch)]
+        outputs = run_stages(self.repo.iter_files(dir_path), stages, self.capacity, source_name="fetch")
+        for file_name, file_function_rows, file_class_rows, is_metadata, vector in outputs:
+            files += 1
+            function_rows.extend(file_function_rows)
+            class_rows.extend(file_class_rows)
+            if is_metadata:
+                metadata_files.append(file_name)
+            if vector is not None:
+                embeddings[file_name] = vector
+            if progress is not None:
+                progress(files=files, functions=len(function_rows), classes=len(class_rows))
+
+        symbols = self.repo.symbols
+        return symbols.view(function_rows), symbols.view(class_rows), metadata_files, embeddings
+
+    def _parse(self, batch):
+        """Parses a batch of (file_path, file_name, sha, content) and returns each file's rows and function code."""
+        pending = {file_path: (sha, content) for file_path, _, sha, content in batch if content is not None}
+        results = self.repo.analyzer.analyze_sources(
+            [(file_path, content) for file_path, (_, content) in pending.items()]
+        )
+        collected = []
+        with self.repo.lock:
+            self.repo._store_analyses(pending, results)
+            for file_path, file_name, sha, _ in batch:
+                file_function_rows, file_class_rows, metadata = [], [], []
+                self.repo._collect_file(file_path, file_name, sha, None, file_function_rows, file_class_rows, metadata)
+                collected.append((file_name, file_function_rows, file_class_rows, bool(metadata)))
+
+        # ✅ Decoded outside the lock: stored rows are immutable, and reading them never copies the table
+        symbols = self.repo.symbols
+        return [(*file, [symbols.text(row) for row in file[1]]) for file in collected]
+
+    def _embed(self, batch):
+        """
+        Embeds the functions of a batch of parsed files in one call (only snippets missing from the store).
+        Each file keeps the embedding of its last function, as generate_embeddings_batch does.
+        """
+        texts = [text for *_, file_texts in batch for text in file_texts]
+        rows, matrix = self.embedding_generator.embed_snippets(texts) if texts else ([], None)
+        embedded, offset = [], 0
+        for file_name, file_function_rows, file_class_rows, is_metadata, file_texts in batch:
+            offset += len(file_texts)
+            vector = np.asarray(matrix[rows[offset - 1]]) if file_texts else None
+            embedded.append((file_name, file_function_rows, file_class_rows, is_metadata, vector))
+        return embedded
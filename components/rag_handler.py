@@ -1,14 +1,16 @@
+import hashlib
 import logging
-import os
-
-import ollama
-import networkx as nx
-import graphviz
 
 import config
+from components.artifact_store import get_artifact_store
 from components.graph_handler import GraphHandler
 from components.summarizer import CodeSummarizer
 from components.llm_handler import LLMHandler
+from components.retriever import CodeRetriever
+from components.summarization_planner import SummarizationPlanner
+
+
+QUESTION_PROMPT_VERSION = "question-v1"  # Bump when the prompt template changes (invalidates cached answers)
 
 
 class RAGHandler:
@@ -18,11 +20,47 @@ class RAGHandler:
         """
         self.embedding_generator = embedding_generator
         self.llm_handler = LLMHandler()  # ✅ Use a dedicated LLM handler
-        self.summarizer = CodeSummarizer(self.llm_handler)  # ✅ Integrate summarization
+        self.planner = SummarizationPlanner(self.llm_handler)  # ✅ Token-budgeted map-reduce summaries
+        self.summarizer = CodeSummarizer(self.llm_handler, self.planner)  # ✅ Integrate summarization
+        self.retriever = CodeRetriever(embedding_generator)  # ✅ Top-k context selection for questions
 
-    def generate_sequential_summary(self, repo):
+    def generate_sequential_summary(self, repo, progress=None):
         """
         Generates a **file-based** repository summary and a structured block diagram.
+        progress, if given, is called with every event of stream_sequential_summary.
+        """
+        result = {}
+        file_summaries = {}
+        errors = {}
+        for event in self.stream_sequential_summary(repo):
+            if progress is not None:
+                progress(event)
+            if event["event"] == "file_summary" and event["error"]:
+                errors[event["file"]] = event["error"]
+            elif event["event"] == "file_summary":
+                file_summaries[event["file"]] = event["summary"]
+            elif event["event"] == "error":
+                return {"error": event["error"]}
+            elif event["event"] == "done":
+                result = event
+                errors.update(event["errors"])
+        summary_data = {
+            "file_summaries": file_summaries,
+            "package_summaries": result.get("package_summaries", {}),
+            "repo_summary": result.get("repo_summary"),
+            "pipeline_diagram": result.get("pipeline_diagram"),
+            "execution_order": result.get("execution_order", [])
+        }
+        if errors:
+            summary_data["errors"] = errors
+        return summary_data
+
+    def stream_sequential_summary(self, repo):
+        """
+        Same pipeline as generate_sequential_summary, as a generator of events for streaming responses:
+        {"event": "execution_order", ...}, one {"event": "file_summary", ...} per file as soon as its
+        summary is ready (with "error" set instead of "summary" if the LLM failed for it),
+        then {"event": "done", ...} with the package and repository summaries (or {"event": "error", ...}).
         """
         try:
             logging.info("Fetching functions, classes, and metadata from repository...")
@@ -31,77 +69,112 @@ class RAGHandler:
             # ✅ Generate Component Graph
             logging.info("Creating component graph...")
             graph_handler = GraphHandler(functions, classes)
-            component_graph = graph_handler.create_graph()
-
-            # ✅ Extract only Python file nodes
-            # file_nodes = [node for node in component_graph.nodes if node.endswith(".py")]
-            nodes = component_graph.nodes()
+            component_graph = graph_handler.create_compact_graph()
 
-            # ✅ Perform topological sort to get execution order
+            # ✅ Perform topological sort to get execution order (deterministic, the graph is acyclic already)
             logging.info("Performing topological sort to determine execution order...")
-            execution_order = list(nx.topological_sort(component_graph.subgraph(nodes)))
+            execution_order = component_graph.topological_order()
 
             if not execution_order:
                 logging.error("Execution order is empty. Unable to generate block diagram.")
-                return {"error": "Execution order is empty."}
+                yield {"event": "error", "error": "Execution order is empty."}
+                return
 
             logging.info(f"Execution Order: {execution_order}")
+            file_function_map = self.group_functions_by_file(functions)
+            yield {"event": "execution_order", "execution_order": execution_order, "total_files": len(file_function_map)}
 
-            # ✅ Group functions by file
-            file_function_map = {}
-            class_code_map = {}
-            for file_name, func_name, func_code in functions:
-                if file_name not in file_function_map:
-                    file_function_map[file_name] = []
-                # if class_name not in class_code_map:
-                #     class_code_map[class_name] = []
-                file_function_map[file_name].append((func_name, func_code))
-                # class_code_map[class_name].append((file_name, class_code))
-
-            # ✅ Generate summaries **per file**
+            # ✅ Generate summaries **per file**, concurrently, streamed as they complete
             file_summaries = {}
-            for file_name, funcs in file_function_map.items():
-                func_texts = "\n\n".join(
-                    [f"File: {file_name}\n File: {func_name} \n ```python\n{func_code}\n```" for func_name, func_code in funcs]
-                )
-
-                summary_prompt = f"""
-                You are an AI expert in Python code analysis. 
-                Summarize the following Python file with its key functions concisely:
-
-                **File Name**: {file_name}
-                **Functions**:
-                {func_texts}
-
-                Provide a structured summary explaining the overall purpose of this file, its key components, 
-                and any important parameters with values.
-                """
-
-                logging.info(f"Summarizing file: {file_name}")
-                response = ollama.chat(model=config.LLM_MODEL_NAME,
-                                       messages=[{"role": "user", "content": summary_prompt}])
-                file_summary = response["message"]["content"]
-
-                file_summaries[file_name] = file_summary
+            completed = 0
+            for file_name, summary, error in self.summarize_files(file_function_map):
+                completed += 1
+                if error is None:
+                    file_summaries[file_name] = summary
+                yield {"event": "file_summary", "file": file_name, "summary": summary, "error": error,
+                       "completed": completed, "total_files": len(file_function_map)}
+
+            # ✅ Reduce file summaries into package and repository summaries
+            package_summaries, repo_summary, errors = self.planner.summarize_hierarchy(
+                file_summaries, self.package_map(repo)
+            )
+            logging.info(f"Summarization plan: {self.planner.stats}, LLM cache: {self.llm_handler.cache_stats()}")
 
             # ✅ Generate Block Diagram Using Summaries
             logging.info("Generating block diagram...")
             diagram_path = self.create_block_diagram(execution_order, file_summaries)
             print("--------------Execution order-----------", execution_order)
-            return {
-                "file_summaries": file_summaries,
-                "pipeline_diagram": diagram_path,
-                "execution_order": execution_order
-            }
+            yield {"event": "done", "pipeline_diagram": diagram_path, "execution_order": execution_order,
+                   "package_summaries": package_summaries, "repo_summary": repo_summary, "errors": errors}
 
         except Exception as e:
             logging.error(f"Error generating sequential summary: {str(e)}")
-            return {"error": f"Error processing sequential summary: {str(e)}"}
+            yield {"event": "error", "error": f"Error processing sequential summary: {str(e)}"}
+
+    def group_functions_by_file(self, functions):
+        """
+        Groups (file_name, func_name, func_code) tuples into {file_name: [(func_name, func_code)]}.
+        """
+        file_function_map = {}
+        for file_name, func_name, func_code in functions:
+            if file_name not in file_function_map:
+                file_function_map[file_name] = []
+            file_function_map[file_name].append((func_name, func_code))
+        return file_function_map
+
+    def index_repository(self, functions, classes):
+        """
+        Builds the retrieval index over the repository's function and class snippets.
+        """
+        self.retriever.index(functions, classes)
+
+    def summarize_files(self, file_function_map):
+        """
+        Summarizes {file_name: funcs} through the map-reduce planner, with up to LLM_CONCURRENCY requests in flight.
+        Yields (file_name, summary, error) in completion order (see LLMHandler.query_many).
+        """
+        logging.info(f"Summarizing {len(file_function_map)} files with concurrency {self.llm_handler.max_concurrency}")
+        yield from self.planner.summarize_files(file_function_map)
+
+    def package_map(self, repo):
+        """
+        Maps each analyzed file name to its package directory ("" for the repository root).
+        """
+        return {path.rsplit("/", 1)[-1]: path.rsplit("/", 1)[0] if "/" in path else "" for path in repo.function_cache}
+
+    def answer_question(self, repo, question, top_k=config.RETRIEVAL_TOP_K):
+        """
+        Answers a natural-language question about a repository from its top-k most relevant snippets.
+        """
+        functions, classes, metadata = repo.fetch_files_from_directory()
+        self.index_repository(functions, classes)
+        snippets = self.retriever.search(question, top_k=top_k)
+
+        context = "\n\n".join(
+            f"File: {file_name} ({kind} {name})\n```python\n{code}\n```" for file_name, name, code, kind in snippets
+        )
+        prompt = f"""
+        You are an AI expert in Python code analysis.
+        Answer the question about this repository using only the code excerpts below.
+        If the excerpts are not sufficient, say so.
+
+        **Question**: {question}
+        **Relevant code**:
+        {context}
+        """
+
+        logging.info(f"Answering question with {len(snippets)} retrieved snippets")
+        return {
+            "answer": self.llm_handler.query_llm(prompt, QUESTION_PROMPT_VERSION),
+            "sources": [{"file": file_name, "name": name, "kind": kind} for file_name, name, _, kind in snippets],
+        }
 
     def create_block_diagram(self, execution_order, summaries):
         """
         Creates a structured block diagram with main component files and execution order.
         """
+        import graphviz  # Only needed here; imported on first use to keep app startup light
+
         diagram = graphviz.Digraph(format="png")
         diagram.attr(rankdir="LR", bgcolor="white", style="filled", fillcolor="lightgray")
 
@@ -117,9 +190,9 @@ class RAGHandler:
         for i in range(len(execution_order) - 1):
             diagram.edge(execution_order[i], execution_order[i + 1])
 
-        # Save the diagram
-        diagram_path = os.path.join("static", "block_diagram")
-        diagram.render(diagram_path)
-        logging.info(f"Block diagram saved at {diagram_path}.png")
+        # ✅ The DOT source fully determines the image, so an unchanged diagram is never rendered twice
+        key = hashlib.sha256(diagram.source.encode("utf-8")).hexdigest()
+        diagram_url = get_artifact_store().get_or_create(key, "png", lambda: diagram.pipe(format="png"))
+        logging.info(f"Block diagram available at {diagram_url}")
 
-        return f"/static/block_diagram.png"
+        return diagram_url
@@ -1,84 +1,319 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+
+import config
 from components.analyzer import CodeAnalyzer
+from components.cache import get_file_cache
+from components.symbol_table import SymbolTable
 
-class CodeRepository:
-    def __init__(self, repo_owner, repo_name, token):
-        self.repo_owner = repo_owner
-        self.repo_name = repo_name
-        self.token = token
-        self.base_url = f'https://api.github.com/repos/{repo_owner}/{repo_name}/contents/'
+class BaseRepository:
+    def __init__(self, cache=None):
+        """
+        Shared state for repository backends: the AST analyzer, the symbol table and the request and on-disk caches.
+        Subclasses implement fetch_files_from_directory, iter_files and get_file_content.
+        """
         self.analyzer = CodeAnalyzer()  # Initialize AST Analyzer
+        self.cache = cache if cache is not None else get_file_cache()  # Persistent cache keyed by blob SHA
+        self.symbols = SymbolTable()  # Python sources and their functions / classes, stored once
 
         # **Cache for fast lookups**
-        self.file_cache = {}  # {file_name: raw_content}
-        self.function_cache = {}  # {file_name: [(func_name, func_code)]}
-        self.class_cache = {}  # {file_name: [(class_name, class_code)]}
+        self.file_cache = {}  # {file_path: raw_content}, until a Python file moves into the symbol table
+        self.function_cache = {}  # {file_path: SymbolView of (func_name, func_code)}
+        self.class_cache = {}  # {file_path: SymbolView of (class_name, class_code)}
+        self.relation_cache = {}  # {file_path: [(caller_function, callee)]}
+        self.file_shas = {}  # {file_path: blob_sha}
+        self.known_analyses = {}  # {blob_sha: (symbol_table, file_path)} handed over from a previous analysis
         self.metadata_files = []  # List of metadata files
+        self.lock = threading.RLock()  # Guards the caches and symbol table while a pipeline streams files in
+
+    def iter_files(self, dir_path=''):
+        """
+        Yields (file_path, file_name, sha, content) for every file under dir_path as soon as it is available, in
+        listing order. content is the text of Python files that have to be parsed and None for all others
+        (metadata files, or files whose analysis was loaded from cache). Used by pipeline.IngestionPipeline.
+        """
+        raise NotImplementedError
+
+    def _analysis_key(self, sha):
+        return f'analysis:{CodeAnalyzer.VERSION}:{sha}'
+
+    def _needs_content(self, file_path, sha):
+        """
+        A file has to be read only if it is Python source and no analysis for its
+        blob SHA is cached; metadata files are read lazily through get_file_content.
+        """
+        if not file_path.endswith('.py') or file_path in self.function_cache:
+            return False
+        if sha in self.known_analyses:
+            table, known_path = self.known_analyses[sha]
+            self.symbols.copy_file(file_path, table, known_path, sha)
+            self._index_file(file_path)
+            return False
+        if sha:
+            analysis = self.cache.get_object(self._analysis_key(sha))
+            if analysis is not None:
+                self._add_analysis(file_path, sha, *analysis)
+                return False
+        return True
+
+    def _add_analysis(self, file_path, sha, source, symbols, relations):
+        self.symbols.add_file(file_path, source, symbols, sha)
+        self.relation_cache[file_path] = relations
+        self._index_file(file_path)
+
+    def _index_file(self, file_path):
+        self.function_cache[file_path] = self.symbols.file_view(file_path, "function")
+        self.class_cache[file_path] = self.symbols.file_view(file_path, "class")
+        self.file_cache.pop(file_path, None)  # The symbol table holds the source now
+
+    def _analyze_pending(self, pending):
+        """
+        Parses the files in pending ({file_path: (sha, content)}) in one batch through
+        CodeAnalyzer.analyze_sources and stores the results in the symbol table and the on-disk cache.
+        """
+        results = self.analyzer.analyze_sources(
+            [(file_path, content) for file_path, (sha, content) in pending.items() if content is not None]
+        )
+        self._store_analyses(pending, results)
+
+    def _store_analyses(self, pending, results):
+        """
+        Stores the analyze_sources results for the files in pending in the symbol table and the on-disk cache
+        (files without a result get no symbols).
+        """
+        for file_path, (sha, content) in pending.items():
+            source, symbols, relations = results.get(file_path, (b'', [], []))
+            self._add_analysis(file_path, sha, source, symbols, relations)
+            if sha and file_path in results:
+                self.cache.set_object(self._analysis_key(sha), (source, symbols, relations))
+
+    def _collect_file(self, file_path, file_name, sha, file_content, function_rows, class_rows,
+                      metadata_files_list):
+        """
+        Appends the symbol table rows of a file's functions and classes, running the AST analysis for it
+        if it was not analyzed in a batch or loaded from cache.
+        """
+        if sha:
+            self.file_shas[file_path] = sha
+
+        if file_name.endswith('.py'):
+            if file_path not in self.function_cache or file_path not in self.class_cache:
+                self._analyze_pending({file_path: (sha, file_content)})
+
+            function_rows.extend(self.symbols.rows(file_path, 'function'))
+            class_rows.extend(self.symbols.rows(file_path, 'class'))
+        else:
+            metadata_files_list.append(file_name)
+
+    def _cached_content(self, file_path):
+        """
+        Content already in memory: Python sources live in the symbol table, other files in file_cache.
+        """
+        if file_path in self.symbols:
+            return self.symbols.file_text(file_path)
+        return self.file_cache.get(file_path)
+
+
+class CodeRepository(BaseRepository):
+    def __init__(self, repo_owner, repo_name, token, ref="HEAD", ingestion_mode=config.GITHUB_INGESTION_MODE,
+                 max_workers=config.GITHUB_MAX_WORKERS, api_url=config.GITHUB_API_URL, raw_url=config.GITHUB_RAW_URL,
+                 cache=None):
+        super().__init__(cache)
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.token = token
+        self.ref = ref
+        self.ingestion_mode = ingestion_mode
+        self.max_workers = max(1, max_workers)
+        self.api_url = api_url.rstrip('/')
+        self.raw_url = raw_url.rstrip('/')
+        self.base_url = f'{self.api_url}/repos/{repo_owner}/{repo_name}/contents/'
+        self.file_urls = {}  # {file_path: download_url}, for lazily fetched files
+
+        # **Keep-alive session shared by all API and blob requests**
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Authorization': f'token {self.token}'})
 
     def fetch_files_from_directory(self, dir_path=''):
         """
         Fetch repository structure, extract functions, classes, and method calls using AST.
+        In "tree" ingestion mode the whole repository is listed with a single recursive call
+        (see fetch_files_from_tree); otherwise each directory is walked through the contents API.
         Returns:
-            functions: list of (file_name, func_name, func_code)
-            classes: list of (file_name, class_name, class_code)
+            functions: SymbolView of (file_name, func_name, func_code)
+            classes: SymbolView of (file_name, class_name, class_code)
             metadata_files: list of file names (non-Python)
         """
+        if self.ingestion_mode == 'tree' and not dir_path:
+            return self.fetch_files_from_tree()
+        return self._ingest(self._walk_directory(dir_path))
+
+    def iter_files(self, dir_path=''):
+        """
+        Streams the listed files (see BaseRepository.iter_files). Blobs are downloaded on the worker pool with at
+        most 2 * max_workers downloads ahead of the consumer, so a slow consumer throttles the downloads.
+        """
+        entries = self._list_entries(dir_path)
+        for entry in entries:
+            self.file_urls[entry['path']] = entry['url']
+
+        window = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for entry in entries:
+                with self.lock:
+                    needed = self._needs_content(entry['path'], entry['sha'])
+                future = None
+                if needed:
+                    future = executor.submit(self._fetch_and_cache_file, entry['path'], entry['url'], entry['sha'])
+                window.append((entry, future))
+                while window and (len(window) > 2 * self.max_workers or window[0][1] is None or window[0][1].done()):
+                    yield self._window_item(window.popleft())
+            while window:
+                yield self._window_item(window.popleft())
+
+    @staticmethod
+    def _window_item(item):
+        entry, future = item
+        return entry['path'], entry['name'], entry['sha'], future.result() if future is not None else None
+
+    def _list_entries(self, dir_path=''):
+        """
+        File entries under dir_path: one recursive tree listing in "tree" mode, the contents API walk otherwise.
+        """
+        if self.ingestion_mode == 'tree' and not dir_path:
+            entries = self._list_tree()
+            if entries is not None:
+                return entries
+        return self._walk_directory(dir_path)
+
+    def _walk_directory(self, dir_path):
+        """
+        Lists the file entries under a directory through the contents API, recursing serially into subdirectories.
+        """
         url = self.base_url + dir_path
-        response = requests.get(url, headers={'Authorization': f'token {self.token}'})
+        response = self.session.get(url)
 
-        function_files_list = []
-        class_files_list = []
-        metadata_files_list = []
+        entries = []
 
         if response.status_code == 200:
             files = response.json()
             for file in files:
-                file_name = file['name']
-
                 if file['type'] == 'file':
-                    file_content = self._fetch_and_cache_file(file_name, file['download_url'])
-
-                    if file_name.endswith('.py'):
-                        if file_name not in self.function_cache or file_name not in self.class_cache:
-                            functions, classes, relations = self.analyzer.extract_functions_and_classes(file_content)
-                            self.function_cache[file_name] = functions
-                            self.class_cache[file_name] = classes
-
-                        function_files_list.extend([(file_name, *func) for func in self.function_cache[file_name]])
-                        class_files_list.extend([(file_name, *cls) for cls in self.class_cache[file_name]])
-                    else:
-                        metadata_files_list.append(file_name)
+                    entries.append({'path': file['path'], 'name': file['name'], 'sha': file.get('sha'),
+                                    'url': file['download_url']})
 
                 elif file['type'] == 'dir':
-                    sub_function_files_list, sub_class_files_list, sub_metadata_files_list = self.fetch_files_from_directory(
-                        file['path']
-                    )
-                    function_files_list.extend(sub_function_files_list)
-                    class_files_list.extend(sub_class_files_list)
-                    metadata_files_list.extend(sub_metadata_files_list)
+                    entries.extend(self._walk_directory(file['path']))
 
         else:
             print(f'Error fetching repository contents: {response.status_code}, {response.text}')
 
-        return function_files_list, class_files_list, metadata_files_list
+        return entries
+
+    def fetch_files_from_tree(self):
+        """
+        Lists the whole repository with one recursive git tree call and downloads the blobs
+        concurrently over the pooled session (bounded by max_workers).
+        Falls back to the per-directory walk if GitHub truncates the tree listing.
+        Returns the same (functions, classes, metadata_files) lists as fetch_files_from_directory.
+        """
+        entries = self._list_tree()
+        if entries is None:
+            entries = self._walk_directory('')
+        return self._ingest(entries)
+
+    def _ingest(self, entries):
+        """
+        Downloads and analyzes the listed files. Files whose analysis is already cached for their
+        blob SHA are not downloaded at all; the rest are fetched through a bounded worker pool and
+        parsed in one batch by the analyzer's process pool.
+        """
+        function_rows = []
+        class_rows = []
+        metadata_files_list = []
+
+        for entry in entries:
+            self.file_urls[entry['path']] = entry['url']
+
+        # ✅ Download only the blobs we cannot serve from cache
+        pending = [entry for entry in entries if self._needs_content(entry['path'], entry['sha'])]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            contents = executor.map(
+                lambda entry: self._fetch_and_cache_file(entry['path'], entry['url'], entry['sha']),
+                pending
+            )
+            self._analyze_pending({entry['path']: (entry['sha'], content) for entry, content in zip(pending, contents)})
+
+        for entry in entries:
+            self._collect_file(entry['path'], entry['name'], entry['sha'], None,
+                               function_rows, class_rows, metadata_files_list)
+
+        return self.symbols.view(function_rows), self.symbols.view(class_rows), metadata_files_list
+
+    def _list_tree(self):
+        """
+        Returns the blob entries of the repository tree at self.ref, or None if the
+        listing failed or was truncated.
+        """
+        url = f'{self.api_url}/repos/{self.repo_owner}/{self.repo_name}/git/trees/{self.ref}'
+        response = self.session.get(url, params={'recursive': '1'})
 
-    def _fetch_and_cache_file(self, file_name, file_url):
+        if response.status_code != 200:
+            print(f'Error fetching repository tree: {response.status_code}, {response.text}')
+            return None
+
+        tree = response.json()
+        if tree.get('truncated'):
+            print('Repository tree listing was truncated, falling back to directory traversal')
+            return None
+
+        return [
+            {'path': item['path'], 'name': item['path'].rsplit('/', 1)[-1], 'sha': item['sha'],
+             'url': self._raw_file_url(item['path'])}
+            for item in tree.get('tree', [])
+            if item['type'] == 'blob'
+        ]
+
+    def _raw_file_url(self, path):
+        return f'{self.raw_url}/{self.repo_owner}/{self.repo_name}/{self.ref}/{path}'
+
+    def _fetch_and_cache_file(self, file_path, file_url, sha=None):
         """
-        Fetches the raw file content **once** and stores it in a cache.
+        Fetches the raw file content **once** and stores it in the request and on-disk caches.
         """
-        if file_name in self.file_cache:
-            return self.file_cache[file_name]  # **Fast lookup**
+        if file_path in self.file_cache:
+            return self.file_cache[file_path]  # **Fast lookup**
+
+        if sha:
+            cached = self.cache.get(f'blob:{sha}')
+            if cached is not None:
+                self.file_cache[file_path] = cached.decode('utf-8', errors='replace')
+                return self.file_cache[file_path]
 
-        response = requests.get(file_url)
+        response = self.session.get(file_url)
         if response.status_code == 200:
-            self.file_cache[file_name] = response.text  # Cache the file content
+            self.file_cache[file_path] = response.text  # Cache the file content
+            if sha:
+                self.cache.set(f'blob:{sha}', response.content)
             return response.text
         else:
-            print(f"Error fetching content for {file_name}, Status code: {response.status_code}")
+            print(f"Error fetching content for {file_path}, Status code: {response.status_code}")
             return None
 
-    def get_file_content(self, file_name):
+    def get_file_content(self, file_path):
         """
-        Retrieves file content instantly using the cached dictionary.
+        Retrieves file content from the cache, downloading it on first access if it was skipped during ingestion.
         """
-        return self.file_cache.get(file_name, None)  # **Fast lookup instead of iteration**
+        content = self._cached_content(file_path)  # **Fast lookup instead of iteration**
+        if content is not None:
+            return content
+        if file_path in self.file_urls:
+            return self._fetch_and_cache_file(file_path, self.file_urls[file_path], self.file_shas.get(file_path))
+        return None
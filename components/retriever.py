@@ -0,0 +1,55 @@
+import logging
+
+import numpy as np
+
+import config
+from components.similarity import normalize_rows
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate for prompt budgeting (about CHARS_PER_TOKEN characters per token for code).
+    """
+    return max(1, len(text) // config.CHARS_PER_TOKEN)
+
+
+class CodeRetriever:
+    def __init__(self, embedding_generator):
+        """
+        Embedding index over function- and class-level snippets, used to pick prompt context.
+        """
+        self.embedding_generator = embedding_generator
+        self.entries = []  # [(file_name, name, code, kind)]
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+
+    def index(self, functions, classes=()):
+        """
+        Embeds (file_name, name, code) snippets of functions and classes (reusing stored embeddings).
+        """
+        self.entries = [(*entry, "function") for entry in functions] + [(*entry, "class") for entry in classes]
+        rows, matrix = self.embedding_generator.embed_snippets([code for _, _, code, _ in self.entries])
+        self.vectors = normalize_rows(matrix[rows]) if len(rows) else np.zeros((0, 0), dtype=np.float32)
+        logging.info(f"Indexed {len(self.entries)} snippets for retrieval")
+        return self
+
+    def search(self, question, top_k=config.RETRIEVAL_TOP_K, token_budget=config.RETRIEVAL_TOKEN_BUDGET):
+        """
+        Returns the entries most similar to a natural-language question, best first, within the token budget.
+        """
+        if not self.entries:
+            return []
+        query = normalize_rows(self.embedding_generator.embed_texts([question]))[0]
+
+        # ✅ Greedily take the best-scoring snippets while they fit the token budget
+        selected = []
+        used = 0
+        for index in np.argsort(-(self.vectors @ query), kind="stable"):
+            entry = self.entries[index]
+            tokens = estimate_tokens(entry[2])
+            if used + tokens > token_budget:
+                continue
+            selected.append(entry)
+            used += tokens
+            if len(selected) >= top_k:
+                break
+        return selected
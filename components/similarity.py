@@ -0,0 +1,156 @@
+import logging
+
+import numpy as np
+
+import config
+
+
+def normalize_rows(matrix):
+    """
+    Returns a float32 copy of matrix with unit-length rows (zero rows stay zero).
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _merge_top_k(best_idx, best_sim, rows, candidate_idx, candidate_sim, k):
+    """
+    Merges candidate neighbours into the running top-k lists of the given rows (in place).
+    """
+    merged_idx = np.concatenate([best_idx[rows], candidate_idx], axis=1)
+    merged_sim = np.concatenate([best_sim[rows], candidate_sim], axis=1)
+    top = np.argpartition(-merged_sim, k - 1, axis=1)[:, :k]
+    best_idx[rows] = np.take_along_axis(merged_idx, top, axis=1)
+    best_sim[rows] = np.take_along_axis(merged_sim, top, axis=1)
+
+
+def _sort_neighbours(indices, similarities):
+    order = np.argsort(-similarities, axis=1, kind="stable")
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(similarities, order, axis=1)
+
+
+class ExactCosineKNN:
+    def __init__(self, block_bytes=config.KNN_BLOCK_BYTES):
+        """
+        Exact cosine top-k over a normalized matrix, computed as blocked matrix products so the
+        similarity scratch space never exceeds roughly block_bytes.
+        """
+        self.block_bytes = block_bytes
+
+    def query(self, matrix, k):
+        """
+        Returns (indices, similarities), each (n, k), sorted by decreasing similarity.
+        A row never lists itself; missing neighbours (k >= n) are marked with index -1.
+        """
+        vectors = normalize_rows(matrix)
+        n = vectors.shape[0]
+        k_eff = min(k, n - 1)
+        indices = np.full((n, k), -1, dtype=np.int64)
+        similarities = np.full((n, k), -np.inf, dtype=np.float32)
+        if k_eff <= 0:
+            return indices, similarities
+
+        block = max(1, self.block_bytes // (4 * n))
+        for start in range(0, n, block):
+            stop = min(start + block, n)
+            scores = vectors[start:stop] @ vectors.T
+            scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # Exclude self
+            top = np.argpartition(-scores, k_eff - 1, axis=1)[:, :k_eff]
+            indices[start:stop, :k_eff] = top
+            similarities[start:stop, :k_eff] = np.take_along_axis(scores, top, axis=1)
+
+        return _sort_neighbours(indices, similarities)
+
+
+class RandomProjectionLSH:
+    def __init__(self, n_bits=config.KNN_LSH_BITS, n_tables=config.KNN_LSH_TABLES, max_bucket=1024, seed=42):
+        """
+        Approximate cosine top-k with random-hyperplane LSH: each table hashes vectors to n_bits sign bits,
+        candidates are the members of a vector's buckets, and candidates are re-ranked exactly.
+        Buckets larger than max_bucket are split, bounding the work and memory per bucket.
+        """
+        self.n_bits = n_bits
+        self.n_tables = n_tables
+        self.max_bucket = max_bucket
+        self.seed = seed
+
+    def query(self, matrix, k):
+        vectors = normalize_rows(matrix)
+        n, dim = vectors.shape
+        indices = np.full((n, k), -1, dtype=np.int64)
+        similarities = np.full((n, k), -np.inf, dtype=np.float32)
+        if n < 2 or k <= 0:
+            return indices, similarities
+
+        rng = np.random.default_rng(self.seed)
+        weights = (1 << np.arange(self.n_bits, dtype=np.int64))
+
+        for _ in range(self.n_tables):
+            planes = rng.standard_normal((dim, self.n_bits)).astype(np.float32)
+            codes = ((vectors @ planes) > 0).astype(np.int64) @ weights
+
+            # ✅ Group vectors by bucket with one sort instead of per-vector lookups
+            order = np.argsort(codes, kind="stable")
+            boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+            for bucket in np.split(order, boundaries):
+                if len(bucket) < 2:
+                    continue
+                if len(bucket) > self.max_bucket:
+                    bucket = rng.permutation(bucket)
+                for start in range(0, len(bucket), self.max_bucket):
+                    members = bucket[start:start + self.max_bucket]
+                    if len(members) < 2:
+                        continue
+                    scores = vectors[members] @ vectors[members].T
+                    np.fill_diagonal(scores, -np.inf)
+                    candidate_idx = np.broadcast_to(members, scores.shape)
+                    # Drop candidates already present from an earlier table
+                    duplicate = (candidate_idx[:, :, None] == indices[members][:, None, :]).any(axis=2)
+                    scores[duplicate] = -np.inf
+                    _merge_top_k(indices, similarities, members, candidate_idx, scores, k)
+
+        indices[~np.isfinite(similarities)] = -1
+        return _sort_neighbours(indices, similarities)
+
+
+def get_similarity_engine(name, num_vectors=0):
+    """
+    Resolves an engine name: "exact", "lsh", or "auto" (exact up to KNN_EXACT_MAX vectors, LSH beyond).
+    """
+    if name == "auto":
+        name = "exact" if num_vectors <= config.KNN_EXACT_MAX else "lsh"
+    if name == "exact":
+        return ExactCosineKNN()
+    if name == "lsh":
+        return RandomProjectionLSH()
+    raise ValueError(f"Unknown similarity engine: {name}")
+
+
+def knn_edges(matrix, k, engine="auto", mutual=False, min_similarity=None):
+    """
+    Computes directed k-NN edges as arrays (sources, targets, similarities).
+    - mutual: keep i → j only if j → i is also among the top-k
+    - min_similarity: drop edges below this cosine similarity
+    """
+    n = len(matrix)
+    engine = get_similarity_engine(engine, n) if isinstance(engine, str) else engine
+    logging.info(f"k-NN over {n} vectors with {type(engine).__name__}")
+    indices, similarities = engine.query(matrix, k)
+
+    sources = np.repeat(np.arange(n, dtype=np.int64), indices.shape[1])
+    targets = indices.ravel()
+    scores = similarities.ravel()
+
+    keep = targets >= 0
+    if min_similarity is not None:
+        keep &= scores >= min_similarity
+    sources, targets, scores = sources[keep], targets[keep], scores[keep]
+
+    if mutual:
+        forward = sources * n + targets
+        keep = np.isin(targets * n + sources, forward)
+        sources, targets, scores = sources[keep], targets[keep], scores[keep]
+
+    return sources, targets, scores
@@ -0,0 +1,37 @@
+import gc
+import importlib
+import logging
+import time
+
+import config
+from components.embedding_service import get_embedding_generator
+
+
+def preload(modules=config.PRELOAD_MODULES):
+    """
+    Imports the heavy modules and loads the embedding model now instead of on the first request.
+    Under gunicorn with preload_app this runs once in the master before the workers fork, so every worker
+    shares the model weights copy-on-write. No inference runs here: torch's thread pools must not be
+    started before a fork.
+    """
+    start = time.perf_counter()
+    for module in modules:
+        importlib.import_module(module)
+    get_embedding_generator()
+
+    # ✅ Objects created so far are never collected, so the collector does not write to (and un-share) their pages
+    gc.collect()
+    gc.freeze()
+    logging.info(f"Preloaded {len(modules)} modules and the embedding model in {time.perf_counter() - start:.2f} s")
+
+
+def warm_up():
+    """
+    Optional warm-up hook, run in each worker (after any fork): loads whatever is still lazy and runs one
+    embedding, so the first request does not pay for model loading or kernel initialization.
+    """
+    start = time.perf_counter()
+    for module in config.PRELOAD_MODULES:
+        importlib.import_module(module)
+    get_embedding_generator().embed_texts(["def warm_up():\n    pass\n"])
+    logging.info(f"Warmed up in {time.perf_counter() - start:.2f} s")
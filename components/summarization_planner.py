@@ -0,0 +1,238 @@
+import logging
+
+import config
+from components.retriever import estimate_tokens
+
+
+# Bump a version when its prompt templates change (invalidates cached answers)
+MAP_PROMPT_VERSION = "map-v1"  # Whole-file and chunk prompts
+REDUCE_PROMPT_VERSION = "reduce-v1"
+
+
+class SummarizationPlanner:
+    def __init__(self, llm_handler, chunk_tokens=config.SUMMARY_CHUNK_TOKENS, fan_in=config.SUMMARY_REDUCE_FAN_IN,
+                 summary_words=config.SUMMARY_MAX_WORDS):
+        """
+        Hierarchical map-reduce summarization under a per-prompt token budget.
+        - chunk_tokens: maximum (estimated) tokens of code or summaries in one prompt
+        - fan_in: maximum number of summaries merged by one reduce prompt
+        - summary_words: length asked of every summary, which bounds the input of the next level
+
+        Files that fit the budget are summarized with one prompt. Larger files are split into chunks at
+        function (or, for huge functions, line) boundaries, the chunks are summarized in parallel and the
+        chunk summaries reduced into the file summary. File summaries are then reduced per package and
+        package summaries into the repository summary; a level with a single input reuses it unchanged.
+        Every prompt goes through LLMHandler, so unchanged inputs are answered from its cache.
+        """
+        self.llm_handler = llm_handler
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.fan_in = max(2, fan_in)
+        self.summary_words = summary_words
+        self.stats = {"prompts": 0, "prompt_tokens": 0}
+
+    def split_units(self, funcs, label="Function"):
+        """
+        Renders (name, code) pairs as units no larger than chunk_tokens, splitting oversized code at line breaks.
+        """
+        max_chars = self.chunk_tokens * config.CHARS_PER_TOKEN
+        units = []
+        for name, code in funcs:
+            text = f"{label}: {name}\n```python\n{code}\n```"
+            if estimate_tokens(text) <= self.chunk_tokens:
+                units.append(text)
+                continue
+
+            piece = []
+            size = 0
+            for line in code.splitlines(keepends=True):
+                while len(line) > max_chars:  # A single giant line is cut hard
+                    units.append(f"{label}: {name} (part)\n```python\n{line[:max_chars]}\n```")
+                    line = line[max_chars:]
+                if size + len(line) > max_chars and piece:
+                    units.append(f"{label}: {name} (part)\n```python\n{''.join(piece)}\n```")
+                    piece, size = [], 0
+                piece.append(line)
+                size += len(line)
+            if piece:
+                units.append(f"{label}: {name} (part)\n```python\n{''.join(piece)}\n```")
+        return units
+
+    def pack(self, texts):
+        """
+        Greedily packs consecutive texts into groups within the token budget (and fan_in items).
+        """
+        groups = []
+        current, used = [], 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if current and (used + tokens > self.chunk_tokens or len(current) >= self.fan_in):
+                groups.append(current)
+                current, used = [], 0
+            current.append(text)
+            used += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    def clip(self, text, max_tokens):
+        """
+        Cuts text to about max_tokens (estimated) tokens, marking the cut.
+        """
+        max_chars = max_tokens * config.CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        return text[:max(0, max_chars - 2)] + " …"
+
+    def summarize_files(self, file_function_map, label="Function"):
+        """
+        Summarizes {file_name: [(func_name, func_code)]} (label names the units in the prompts).
+        Yields (file_name, summary, error) in completion order (error is set and summary None on failure).
+        """
+        chunks = {file_name: self.pack(self.split_units(funcs, label)) for file_name, funcs in file_function_map.items() if funcs}
+
+        # ✅ Map: whole small files and every chunk of large files are queried together
+        prompts = {}
+        for file_name, file_chunks in chunks.items():
+            if len(file_chunks) == 1:
+                prompts[(file_name, None)] = self.file_prompt(file_name, file_chunks[0])
+            else:
+                for i, chunk in enumerate(file_chunks):
+                    prompts[(file_name, i)] = self.chunk_prompt(file_name, chunk, i, len(file_chunks))
+        logging.info(f"Summarizing {len(chunks)} files as {len(prompts)} prompts")
+
+        partials = {}
+        failed = {}
+        for (file_name, i), summary, error in self._query(prompts, MAP_PROMPT_VERSION):
+            if i is None:
+                yield file_name, summary, error
+            elif error is not None:
+                failed[file_name] = error
+            else:
+                partials.setdefault(file_name, {})[i] = summary
+
+        for file_name, error in failed.items():
+            partials.pop(file_name, None)
+            yield file_name, None, error
+
+        # ✅ Reduce: chunk summaries of large files into file summaries
+        groups = {
+            file_name: [(f"Part {i + 1}", parts[i]) for i in sorted(parts)] for file_name, parts in partials.items()
+        }
+        yield from self.reduce(groups, "file")
+
+    def reduce(self, groups, level):
+        """
+        Reduces {key: [(label, summary)]} to one summary per key, merging at most fan_in summaries per prompt
+        and repeating until one remains. Yields (key, summary, error) as keys complete.
+        Inputs are clipped to half the prompt budget, so every prompt merges at least two of them and each
+        round shrinks; after SUMMARY_REDUCE_MAX_ROUNDS rounds the remaining inputs are concatenated and clipped.
+        """
+        item_tokens = max(1, self.chunk_tokens // 2)
+        pending = {}
+        for key, items in groups.items():
+            if len(items) == 1:
+                yield key, items[0][1], None  # ✅ Reuse a lone summary instead of re-summarizing it
+            elif items:
+                pending[key] = [self.clip(f"{label}: {summary}", item_tokens) for label, summary in items]
+
+        for _ in range(config.SUMMARY_REDUCE_MAX_ROUNDS):
+            if not pending:
+                return
+            prompts = {}
+            for key, texts in pending.items():
+                for i, batch in enumerate(self.pack(texts)):
+                    prompts[(key, i)] = self.reduce_prompt(key, level, batch)
+
+            merged = {}
+            failed = {}
+            for (key, i), summary, error in self._query(prompts, REDUCE_PROMPT_VERSION):
+                if error is not None:
+                    failed[key] = error
+                else:
+                    merged.setdefault(key, {})[i] = summary
+
+            next_pending = {}
+            for key in pending:
+                if key in failed:
+                    yield key, None, failed[key]
+                elif len(merged[key]) == 1:
+                    yield key, merged[key][0], None
+                else:
+                    next_pending[key] = [
+                        self.clip(f"Section {i + 1}: {merged[key][i]}", item_tokens) for i in sorted(merged[key])
+                    ]
+            pending = next_pending
+
+        for key, texts in pending.items():
+            logging.warning(f"Reducing {level} {key or '.'} did not converge, concatenating {len(texts)} summaries")
+            yield key, self.clip("\n\n".join(texts), self.chunk_tokens), None
+
+    def summarize_hierarchy(self, file_summaries, package_of):
+        """
+        Reduces {file_name: summary} into package summaries ({package: summary}, packages from package_of)
+        and one repository summary. Returns (package_summaries, repo_summary, errors).
+        """
+        packages = {}
+        for file_name in sorted(file_summaries):
+            packages.setdefault(package_of.get(file_name, ""), []).append((f"File {file_name}", file_summaries[file_name]))
+
+        package_summaries, errors = {}, {}
+        for package, summary, error in self.reduce(packages, "package"):
+            if error is None:
+                package_summaries[package] = summary
+            else:
+                errors[package or "."] = error
+
+        repo_summary = None
+        repo_inputs = [(f"Package {package or '.'}", summary) for package, summary in sorted(package_summaries.items())]
+        for _, summary, error in self.reduce({"": repo_inputs}, "repository"):
+            if error is None:
+                repo_summary = summary
+            else:
+                errors["<repository>"] = error
+        return package_summaries, repo_summary, errors
+
+    def file_prompt(self, file_name, units):
+        code = "\n\n".join(units)
+        return f"""
+        You are an AI expert in Python code analysis.
+        Summarize the following Python file with its key functions concisely:
+
+        **File Name**: {file_name}
+        **Functions**:
+        {code}
+
+        Provide a structured summary explaining the overall purpose of this file, its key components,
+        and any important parameters with values, in at most {self.summary_words} words.
+        """
+
+    def chunk_prompt(self, file_name, units, index, total):
+        code = "\n\n".join(units)
+        return f"""
+        You are an AI expert in Python code analysis.
+        Summarize part {index + 1} of {total} of the Python file **{file_name}**:
+
+        {code}
+
+        Describe what these functions do and any important parameters with values, in at most {self.summary_words} words.
+        """
+
+    def reduce_prompt(self, name, level, summaries):
+        joined = "\n\n".join(summaries)
+        target = f"{level} {name}" if name else level
+        return f"""
+        You are an AI expert in Python code analysis.
+        Combine the following summaries into one structured summary of the {target}:
+
+        {joined}
+
+        Explain its overall purpose and key components, in at most {self.summary_words} words.
+        """
+
+    def _query(self, prompts, template_version):
+        """
+        Runs prompts concurrently through the LLM handler and records the planned token usage.
+        """
+        self.stats["prompts"] += len(prompts)
+        self.stats["prompt_tokens"] += sum(estimate_tokens(prompt) for prompt in prompts.values())
+        return self.llm_handler.query_many(prompts, template_version)
@@ -1,10 +1,25 @@
+from components.llm_handler import LLMError
+from components.retriever import estimate_tokens
+from components.summarization_planner import SummarizationPlanner
+
+CODE_SUMMARY_PROMPT_VERSION = "code-summary-v1"
+
+
 class CodeSummarizer:
-    def __init__(self, llm_handler):
+    def __init__(self, llm_handler, planner=None):
         self.llm_handler = llm_handler
+        self.planner = planner or SummarizationPlanner(llm_handler)
 
     def summarize_code(self, file_name, file_content):
         """
         Summarizes the given code file.
+        Files over the planner's token budget are summarized in chunks and reduced (raises LLMError on failure).
         """
+        if estimate_tokens(file_content) > self.planner.chunk_tokens:
+            for _, summary, error in self.planner.summarize_files({file_name: [(file_name, file_content)]}, label="File"):
+                if error is not None:
+                    raise LLMError(error)
+                return summary
+
         prompt = f"Summarize the purpose and key components of the following code file:\n\nFile: {file_name}\n{file_content}"
-        return self.llm_handler.query_llm(prompt)
+        return self.llm_handler.query_llm(prompt, CODE_SUMMARY_PROMPT_VERSION)
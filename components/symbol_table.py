@@ -0,0 +1,200 @@
+from array import array
+
+KINDS = ("function", "class")
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+
+class SymbolTable:
+    """
+    Functions and classes of a repository in column arrays (file id, qualified name id, kind, byte span) over the
+    UTF-8 source of every file, stored once as one immutable bytes segment per blob. Blobs are interned by SHA, so
+    identical files share their segment. Code is exposed as memoryview slices of a segment (no copies); SymbolView
+    lists decode it on demand. Adding a file never copies or moves the sources already stored.
+    """
+
+    __slots__ = ("paths", "path_ids", "names", "name_ids", "segments", "file_segments", "blob_segments", "file_rows",
+                 "file_ids", "name_col", "kinds", "segment_col", "starts", "ends", "_size")
+
+    def __init__(self):
+        self.paths = []  # file id -> path
+        self.path_ids = {}
+        self.names = []  # name id -> qualified name
+        self.name_ids = {}
+        self.segments = []  # segment id -> UTF-8 source of one blob
+        self.file_segments = []  # file id -> segment id
+        self.blob_segments = {}  # blob SHA -> segment id
+        self.file_rows = {}  # file id -> (first row, end row) of its symbols
+        self.file_ids = array("I")
+        self.name_col = array("I")
+        self.kinds = array("B")
+        self.segment_col = array("I")
+        self.starts = array("Q")  # Byte offsets into the row's segment
+        self.ends = array("Q")
+        self._size = 0
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __contains__(self, path):
+        return path in self.path_ids
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def add_file(self, path, source, symbols, sha=None):
+        """
+        Stores a file's source (bytes, or a memoryview) and its symbols (objects with kind, name, start and end
+        byte offsets into source, e.g. analyzer.Symbol). Returns the file id; re-adding a path replaces its symbols.
+        """
+        if sha is not None and sha in self.blob_segments:
+            segment = self.blob_segments[sha]
+        else:
+            segment = len(self.segments)
+            self.segments.append(bytes(source))
+            self._size += len(source)
+            if sha is not None:
+                self.blob_segments[sha] = segment
+
+        file_id = self.path_ids.get(path)
+        if file_id is None:
+            file_id = self.path_ids[path] = len(self.paths)
+            self.paths.append(path)
+            self.file_segments.append(segment)
+        else:
+            self.file_segments[file_id] = segment
+
+        first = len(self.kinds)
+        for symbol in symbols:
+            name_id = self.name_ids.get(symbol.name)
+            if name_id is None:
+                name_id = self.name_ids[symbol.name] = len(self.names)
+                self.names.append(symbol.name)
+            self.file_ids.append(file_id)
+            self.name_col.append(name_id)
+            self.kinds.append(_KIND_CODES[symbol.kind])
+            self.segment_col.append(segment)
+            self.starts.append(symbol.start)
+            self.ends.append(symbol.end)
+        self.file_rows[file_id] = (first, len(self.kinds))
+        return file_id
+
+    def copy_file(self, path, other, other_path, sha=None):
+        """
+        Adds a file analyzed into another table (e.g. one restored from a previous analysis) without re-parsing it.
+        """
+        file_id = other.path_ids[other_path]
+        symbols = [
+            _Span(KINDS[other.kinds[row]], other.names[other.name_col[row]], other.starts[row], other.ends[row])
+            for row in range(*other.file_rows[file_id])
+        ]
+        return self.add_file(path, other.file_source(other_path), symbols, sha)
+
+    def rows(self, path, kind=None):
+        """Row ids of a file's symbols in source order, optionally only of one kind."""
+        file_id = self.path_ids.get(path)
+        if file_id is None:
+            return range(0)
+        rows = range(*self.file_rows[file_id])
+        if kind is None:
+            return rows
+        code = _KIND_CODES[kind]
+        return [row for row in rows if self.kinds[row] == code]
+
+    def name(self, row):
+        return self.names[self.name_col[row]]
+
+    def kind(self, row):
+        return KINDS[self.kinds[row]]
+
+    def path(self, row):
+        return self.paths[self.file_ids[row]]
+
+    def code(self, row):
+        """Zero-copy memoryview of a symbol's UTF-8 source."""
+        return memoryview(self.segments[self.segment_col[row]])[self.starts[row]:self.ends[row]]
+
+    def text(self, row):
+        return str(self.code(row), "utf-8", errors="replace")
+
+    def file_source(self, path):
+        """Zero-copy memoryview of a file's UTF-8 source."""
+        return memoryview(self.segments[self.file_segments[self.path_ids[path]]])
+
+    def file_text(self, path):
+        """Decoded source of a file, or None if it is not in the table."""
+        if path not in self.path_ids:
+            return None
+        return str(self.file_source(path), "utf-8", errors="replace")
+
+    def view(self, rows, with_file=True):
+        return SymbolView(self, rows, with_file)
+
+    def file_view(self, path, kind):
+        """A file's symbols of one kind as a (name, code) view, the format of the per-file analysis caches."""
+        return SymbolView(self, self.rows(path, kind), with_file=False)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the sources and the columns (interned names and paths not counted)."""
+        columns = (self.file_ids, self.name_col, self.kinds, self.segment_col, self.starts, self.ends)
+        return self._size + sum(column.itemsize * len(column) for column in columns)
+
+
+class _Span:
+    __slots__ = ("kind", "name", "start", "end")
+
+    def __init__(self, kind, name, start, end):
+        self.kind, self.name, self.start, self.end = kind, name, start, end
+
+
+class SymbolView:
+    """
+    Read-only sequence over rows of a SymbolTable that yields (file_name, name, code) tuples, or (name, code) with
+    with_file=False, decoding each code string only when the item is produced. Stands in for the lists of tuples
+    the components exchange, without holding a copy of the code.
+    """
+
+    __slots__ = ("table", "rows", "with_file")
+
+    def __init__(self, table, rows, with_file=True):
+        self.table = table
+        self.rows = rows if isinstance(rows, array) else array("Q", rows)
+        self.with_file = with_file
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        for row in self.rows:
+            yield self._item(row)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SymbolView(self.table, self.rows[index], self.with_file)
+        return self._item(self.rows[index])
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __getstate__(self):
+        return self.table, self.rows, self.with_file
+
+    def __setstate__(self, state):
+        self.table, self.rows, self.with_file = state
+
+    def _item(self, row):
+        table = self.table
+        if self.with_file:
+            return table.path(row).rsplit("/", 1)[-1], table.name(row), table.text(row)
+        return table.name(row), table.text(row)
+
+    def names(self):
+        """Qualified names of the symbols, without decoding any code."""
+        return [self.table.name(row) for row in self.rows]
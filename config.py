@@ -5,3 +5,99 @@ import os
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "<YOUR_GIT_TOKEN>")  # You can set this as an environment variable
 LLM_MODEL_NAME = "llama3.2"
 EMBEDDING_MODEL_NAME = "microsoft/codebert-base"
+
+# GitHub ingestion
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_RAW_URL = os.getenv("GITHUB_RAW_URL", "https://raw.githubusercontent.com")
+GITHUB_INGESTION_MODE = os.getenv("GITHUB_INGESTION_MODE", "tree")  # "tree" (one recursive listing) or "contents"
+GITHUB_MAX_WORKERS = int(os.getenv("GITHUB_MAX_WORKERS", "16"))  # Concurrent blob downloads
+
+# On-disk caches (file contents and analysis results keyed by git blob SHA)
+CACHE_DIR = os.getenv("CODE_VISPLAIN_CACHE_DIR", ".cache")
+FILE_CACHE_MAX_BYTES = int(os.getenv("FILE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Local checkout / archive ingestion
+LOCAL_REPO_ROOTS = [p for p in os.getenv("LOCAL_REPO_ROOTS", "").split(os.pathsep) if p]  # Allowed source dirs for API requests
+LOCAL_IGNORE_PATTERNS = [".git", "__pycache__", "*.pyc", "node_modules", ".venv", "venv", ".idea", ".DS_Store"]
+
+# Parallel parsing
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))  # 0 = one worker per CPU
+PARALLEL_PARSE_MIN_FILES = 32  # Smaller batches are parsed in-process
+PARSE_CHUNK_MIN_BYTES = 256 * 1024
+
+# Embedding inference
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_QUANTIZE = os.getenv("EMBEDDING_QUANTIZE", "0") == "1"  # int8 dynamic quantization on CPU
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))  # 0 = torch default
+EMBEDDING_STORE_ENABLED = os.getenv("EMBEDDING_STORE_ENABLED", "1") == "1"  # Persist embeddings under CACHE_DIR
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32")  # or "float16" to halve the store size
+
+# k-NN similarity graph
+KNN_ENGINE = os.getenv("KNN_ENGINE", "auto")  # "exact", "lsh", or "auto"
+KNN_EXACT_MAX = 20000  # "auto" switches to LSH above this many vectors
+KNN_BLOCK_BYTES = 64 * 1024 * 1024  # Scratch memory per block of the exact engine
+KNN_LSH_BITS = 12
+KNN_LSH_TABLES = 8
+
+# Retrieval (prompt context selection)
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))  # Snippets per file summary or question
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "3000"))  # Context tokens per prompt
+CHARS_PER_TOKEN = 4  # Rough characters-per-token ratio for code
+
+# LLM requests
+OLLAMA_HOST = os.getenv("OLLAMA_HOST") or None  # None = ollama client default (http://localhost:11434)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))  # Concurrent summarization requests
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"  # Reuse responses for identical prompts
+LLM_CACHE_MEMORY_ENTRIES = 1024
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Hierarchical summarization
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))  # Code or summary tokens per prompt
+SUMMARY_REDUCE_FAN_IN = 8  # Summaries merged per reduce prompt
+SUMMARY_MAX_WORDS = 150  # Requested summary length, bounds the input of the next level
+SUMMARY_REDUCE_MAX_ROUNDS = 16  # Reduce rounds before the remaining summaries are concatenated instead
+
+# Background jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Pipelines running at once; further jobs wait in the queue
+JOB_HISTORY = 200  # Finished jobs kept for their results
+JOB_SYNC_TIMEOUT = float(os.getenv("JOB_SYNC_TIMEOUT", "30"))  # Seconds a synchronous route waits before answering 202
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(CACHE_DIR, "jobs.sqlite3"))  # Shared by all worker processes
+JOB_POLL_INTERVAL = 0.2  # Seconds between store reads while waiting on another worker's job (and progress writes)
+
+# Rendered artifacts (graphs, diagrams)
+ARTIFACT_STORE_MAX_BYTES = int(os.getenv("ARTIFACT_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+ARTIFACT_MAX_AGE = 365 * 24 * 3600  # Artifacts are content-addressed, so clients may cache them for a year
+
+# Graph rendering
+LAYOUT_CACHE_ENTRIES = 64  # In-memory layouts (also persisted in the file cache)
+RENDER_LABEL_LIMIT = 300  # Nodes above which labels are omitted
+RENDER_ARROW_LIMIT = 2000  # Edges above which arrowheads are omitted
+
+# Level-of-detail graph (package → module → class → function)
+GRAPH_LEVEL_MAX_NODES = int(os.getenv("GRAPH_LEVEL_MAX_NODES", "200"))  # Children shown per expanded node
+HIERARCHY_CACHE_ENTRIES = 16  # In-memory hierarchies (also persisted in the file cache)
+
+# Node centrality (representative files)
+CENTRALITY_METHOD = os.getenv("CENTRALITY_METHOD", "betweenness")  # "betweenness" (sampled pivots) or "pagerank"
+CENTRALITY_EPSILON = float(os.getenv("CENTRALITY_EPSILON", "0.1"))  # Additive error bound of sampled betweenness
+CENTRALITY_DELTA = 0.1  # Probability that a node's sampled betweenness exceeds the error bound
+CENTRALITY_CACHE_ENTRIES = 64  # In-memory score sets (also persisted in the file cache)
+
+# Streaming ingestion (fetch → parse → embed)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))  # Items buffered between two stages
+PIPELINE_PARSE_BATCH = 64  # Files per analyzer call (large batches go to the process pool)
+PIPELINE_EMBED_BATCH = 16  # Files whose functions are embedded per call
+
+# Shared embedding service (one model process per host, fed by every app worker)
+EMBEDDING_SERVICE = os.getenv("EMBEDDING_SERVICE", "local")  # "local" (model in each process) or "shared"
+EMBEDDING_SERVICE_ADDRESS = os.getenv("EMBEDDING_SERVICE_ADDRESS", os.path.join(CACHE_DIR, "embedding.sock"))
+EMBEDDING_SERVICE_AUTHKEY = os.getenv("EMBEDDING_SERVICE_AUTHKEY", "")  # Empty = random key kept under CACHE_DIR
+EMBEDDING_SERVICE_AUTOSTART = os.getenv("EMBEDDING_SERVICE_AUTOSTART", "1") == "1"  # Start it if none is listening
+EMBEDDING_SERVICE_START_TIMEOUT = 300  # Seconds to wait for a started service to load the model
+EMBEDDING_SERVICE_MAX_BATCH = int(os.getenv("EMBEDDING_SERVICE_MAX_BATCH", "128"))  # Snippets per merged micro-batch
+EMBEDDING_SERVICE_MAX_WAIT_MS = float(os.getenv("EMBEDDING_SERVICE_MAX_WAIT_MS", "5"))  # Wait for requests to merge
+
+# Startup (heavy modules and the embedding model load on first use unless preloaded)
+STARTUP_PRELOAD = os.getenv("STARTUP_PRELOAD", "0") == "1"  # Load them when app.py is imported (gunicorn: before fork)
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "0") == "1"  # Run one embedding per worker before it serves requests
+PRELOAD_MODULES = ["matplotlib.figure", "matplotlib.collections", "matplotlib.backends.backend_agg", "graphviz"]
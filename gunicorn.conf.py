@@ -0,0 +1,19 @@
+# gunicorn.conf.py: gunicorn -c gunicorn.conf.py app:app
+import os
+
+import config
+from components.startup import warm_up
+
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:5000")
+# Several workers are safe: job records and coalescing keys live in the shared JOB_STORE_PATH, so any worker can
+# answer /jobs/<id> and a repository opened on two workers still runs once
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+timeout = 300
+
+# STARTUP_PRELOAD=1: app.py is imported (and the model loaded) once in the master, workers share it copy-on-write
+preload_app = config.STARTUP_PRELOAD
+
+
+def post_worker_init(worker):
+    if config.STARTUP_WARMUP:
+        warm_up()
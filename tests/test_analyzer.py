@@ -0,0 +1,25 @@
+import pytest
+
+from components.analyzer import CodeAnalyzer
+
+CODE = "import os\n\ndef first():\n    return os.sep\n\nclass Second:\n    def method(self):\n        return first()\n"
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n", "\r"])
+def test_spans_follow_every_line_ending(newline):
+    code = CODE.replace("\n", newline)
+    source, symbols, relations = CodeAnalyzer().extract_symbols(code)
+
+    spans = {symbol.name: source[symbol.start:symbol.end].decode("utf-8") for symbol in symbols}
+    assert spans["first"] == f"def first():{newline}    return os.sep"
+    assert spans["Second.method"] == f"def method(self):{newline}        return first()"
+    assert spans["Second"].startswith("class Second:") and spans["Second"].endswith("return first()")
+    assert ("Second.method", "first") in relations
+
+
+def test_parallel_parse_matches_in_process(monkeypatch):
+    files = [(f"module_{i}.py", CODE.replace("first", f"first_{i}")) for i in range(8)]
+    expected = CodeAnalyzer().analyze_sources(files, max_workers=1)
+
+    monkeypatch.setattr("config.PARALLEL_PARSE_MIN_FILES", 1)
+    assert CodeAnalyzer().analyze_sources(files, max_workers=2) == expected
@@ -0,0 +1,25 @@
+from components.cache import DiskCache
+
+
+def test_overwrites_count_once(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), 1000)
+    for size in (400, 300, 450, 450):
+        cache.set("key", b"x" * size)
+    cache.set("other", b"y" * 100)
+
+    assert cache.stats()["bytes"] == 550 == cache._current_size()
+    assert cache.get("key") == b"x" * 450 and cache.get("other") == b"y" * 100  # Nothing was evicted
+
+    cache.delete("key")
+    assert cache.stats()["bytes"] == 100 == cache._current_size()
+
+
+def test_evicts_least_recently_used_above_max_bytes(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), 1000)
+    for index in range(4):
+        cache.set(f"key{index}", b"x" * 300)
+        cache.get(f"key{index}")
+
+    assert cache.get("key0") is None
+    assert cache.get("key3") == b"x" * 300
+    assert cache.stats()["bytes"] <= 900
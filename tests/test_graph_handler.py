@@ -0,0 +1,77 @@
+import pytest
+
+from components.graph_handler import GraphHandler
+
+CONFIG = ("config.py", "Config", "class Config:\n    pass")
+
+
+def functions(files):
+    """{file_name: [func_name]} → (file_name, func_name, code) entries."""
+    return [(file_name, name, f"def {name}():\n    pass") for file_name, names in files.items() for name in names]
+
+
+def graph_data(G):
+    return (sorted(G.nodes(data=True)), sorted(G.edges(data=True)), sorted(G.graph.get("dropped_edges", [])),
+            G.graph.get("mode"))
+
+
+def patch(old_functions, old_classes, new_functions, new_classes, changed_files):
+    old = GraphHandler(old_functions, old_classes)
+    G = old.create_graph()
+    new = GraphHandler(new_functions, new_classes)
+    patched = new.patch_component_graph(G, changed_files, old_classes, old.class_references)
+    return patched, GraphHandler(new_functions, new_classes).create_graph(), new
+
+
+def test_function_names_shared_between_files_keep_their_edges():
+    old = functions({"a.py": ["main", "helper"], "b.py": ["main", "helper"]})
+    new = functions({"a.py": ["main", "helper"], "b.py": ["main", "run"]})
+    patched, rebuilt, _ = patch(old, [CONFIG], new, [CONFIG], {"b.py"})
+
+    assert graph_data(patched) == graph_data(rebuilt)
+    assert ("main", "helper") in patched.edges
+
+
+def test_edges_dropped_to_break_a_cycle_come_back():
+    old = functions({"a.py": ["x", "y"], "b.py": ["y", "x"]})
+    new = functions({"a.py": ["x", "z"], "b.py": ["y", "x"]})
+    patched, rebuilt, _ = patch(old, [CONFIG], new, [CONFIG], {"a.py"})
+
+    assert graph_data(patched) == graph_data(rebuilt)
+    assert sorted(patched.edges) == [("x", "z"), ("y", "x")]
+
+
+CLASSES = [
+    ("models.py", "User", "class User:\n    pass"),
+    ("models.py", "Order", "class Order:\n    pass"),
+]
+
+
+@pytest.mark.parametrize("new_classes, changed", [
+    (CLASSES, {"api.py"}),  # A changed function
+    (CLASSES + [("cart.py", "Cart", "class Cart:\n    pass")], {"api.py", "cart.py"}),  # An added class
+    (CLASSES[:1] + [("cart.py", "Cart", "class Cart:\n    pass")], {"api.py", "models.py", "cart.py"}),  # A removed one
+])
+def test_class_graph_matches_a_rebuild(new_classes, changed):
+    old_functions = [
+        ("api.py", "handle", "def handle():\n    return User(), Order()"),
+        ("jobs.py", "handle", "def handle():\n    return Order(), Cart()"),
+        ("jobs.py", "sweep", "def sweep():\n    return [Order() for _ in User.all()]"),
+    ]
+    new_functions = [
+        ("api.py", "handle", "def handle():\n    return User(), User()"),
+        *old_functions[1:],
+    ]
+    patched, rebuilt, handler = patch(old_functions, CLASSES, new_functions, new_classes, changed)
+
+    assert graph_data(patched) == graph_data(rebuilt)
+    assert handler.class_references == GraphHandler(new_functions, new_classes)._class_reference_index()
+
+
+def test_patch_without_references_rebuilds():
+    old = functions({"a.py": ["x", "y"]})
+    G = GraphHandler(old, [CONFIG]).create_graph()
+    new = functions({"a.py": ["y", "x"]})
+    patched = GraphHandler(new, [CONFIG]).patch_component_graph(G, {"a.py"}, [CONFIG])
+
+    assert graph_data(patched) == graph_data(GraphHandler(new, [CONFIG]).create_graph())
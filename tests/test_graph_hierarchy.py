@@ -0,0 +1,39 @@
+import pytest
+
+from components import graph_hierarchy
+from components.cache import DiskCache, LRUCache
+from components.graph_hierarchy import GraphHierarchy, load_snapshot, snapshot_key, store_hierarchy
+
+SHA = "0123456789abcdef0123456789abcdef01234567"
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    """Fresh file and in-memory caches, so stored hierarchies only come from this test."""
+    file_cache = DiskCache(str(tmp_path / "files.sqlite3"), 1 << 24)
+    monkeypatch.setattr(graph_hierarchy, "get_file_cache", lambda: file_cache)
+    monkeypatch.setattr(graph_hierarchy, "_hierarchy_cache", LRUCache(4))
+    return file_cache
+
+
+def test_only_immutable_uploads_have_a_snapshot_key():
+    assert snapshot_key(f"github:owner/name@{SHA}") is not None
+    assert snapshot_key("file:4e1243bd22c66e76c2ba9eddc1f91394e57f9f83") is not None
+    assert snapshot_key("github:owner/name@HEAD") is None
+    assert snapshot_key("github:owner/name@main") is None
+    assert snapshot_key(f"local:/srv/checkouts/name@{SHA}") is None
+
+
+def test_stored_snapshot_serves_the_top_level(caches):
+    hierarchy = GraphHierarchy("h" * 64).build(
+        {"pkg/a.py": [("run", "def run(): helper()")], "pkg/b.py": [("helper", "def helper(): pass")]},
+        {},
+        {"pkg/a.py": [("run", "helper")]},
+    )
+    snapshot = snapshot_key(f"github:owner/name@{SHA}")
+    assert load_snapshot(snapshot) is None
+
+    store_hierarchy(hierarchy, snapshot)
+    graph_hierarchy._hierarchy_cache = LRUCache(4)  # As in another worker: only the file cache holds it
+
+    assert load_snapshot(snapshot).level() == hierarchy.level()
@@ -0,0 +1,84 @@
+import math
+import time
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from components.graph_renderer import force_layout, layered_layout
+
+pytestmark = pytest.mark.slow
+
+SIZES = [1000, 10000]
+
+
+def component_dag(n, degree=3, seed=0):
+    """Classes (the first tenth of the nodes) pointing at functions, like a component graph."""
+    rng = np.random.default_rng(seed)
+    G = nx.DiGraph()
+    num_classes = max(1, n // 10)
+    G.add_nodes_from(f"Class{i}" for i in range(num_classes))
+    G.add_nodes_from(f"func_{i}" for i in range(n - num_classes))
+    for i in range(n - num_classes):
+        for c in rng.integers(0, num_classes, degree):
+            G.add_edge(f"Class{c}", f"func_{i}")
+    return G
+
+
+def knn_graph(n, degree=3, seed=0):
+    """Every node pointing at `degree` random others, like the k-NN similarity graph."""
+    rng = np.random.default_rng(seed)
+    G = nx.DiGraph()
+    G.add_nodes_from(range(n))
+    for i in range(n):
+        for j in rng.integers(0, n, degree):
+            if i != j:
+                G.add_edge(i, int(j), similarity=0.5)
+    return G
+
+
+def nearest_distances(positions, block=500):
+    """Distance from every node to its nearest other node."""
+    nearest = []
+    for start in range(0, len(positions), block):
+        chunk = positions[start:start + block]
+        distance2 = ((chunk[:, None, :] - positions[None, :, :]) ** 2).sum(axis=2)
+        distance2[np.arange(len(chunk)), np.arange(start, start + len(chunk))] = np.inf
+        nearest.append(distance2.min(axis=1))
+    return np.sqrt(np.concatenate(nearest))
+
+
+def timed(layout, G):
+    start = time.perf_counter()
+    nodes, positions = layout(G)
+    return nodes, positions, time.perf_counter() - start
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_layered_layout(n):
+    G = component_dag(n)
+    nodes, positions, elapsed = timed(layered_layout, G)
+
+    assert elapsed < n / 1000 * 2  # About 7 ms per 1k nodes here
+    assert sorted(nodes) == sorted(G.nodes) and positions.shape == (n, 2)
+    assert np.isfinite(positions).all()
+    # Nodes sit on a unit grid: one row per (part of a) layer, at least one unit apart within a row
+    assert nearest_distances(positions).min() >= 1.0 - 1e-9
+    span = positions.max(axis=0) - positions.min(axis=0)
+    assert (span < 4 * math.sqrt(n)).all()
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_force_layout(n):
+    G = knn_graph(n)
+    nodes, positions, elapsed = timed(force_layout, G)
+
+    assert elapsed < n / 1000 * 10  # About 0.5 s per 1k nodes here
+    assert list(nodes) == list(G.nodes) and positions.shape == (n, 2)
+    assert np.isfinite(positions).all()
+    # Spread over about sqrt(n) units (ideal edge length 1), no node on top of another, few crowded ones
+    span = positions.max(axis=0) - positions.min(axis=0)
+    assert (span > 0.25 * math.sqrt(n)).all() and (span < 4 * math.sqrt(n)).all()
+    nearest = nearest_distances(positions)
+    assert nearest.min() > 0
+    assert (nearest < 0.05).mean() < 0.05
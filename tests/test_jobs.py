@@ -0,0 +1,74 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from components.jobs import JobQueue
+
+
+@pytest.fixture
+def queues(tmp_path):
+    """Two queues on one store, as in two gunicorn workers."""
+    path = str(tmp_path / "jobs.sqlite3")
+    return JobQueue(max_workers=2, path=path), JobQueue(max_workers=2, path=path)
+
+
+def blocking(release):
+    def run(job, value):
+        job.update(stage="working")
+        assert release.wait(5)
+        if value is None:
+            raise ValueError("no value")
+        return {"value": value}
+    return run
+
+
+def test_jobs_are_shared_between_queues(queues):
+    first, second = queues
+    release = threading.Event()
+    job, coalesced = first.submit("graph:repo@abc", "component_graph", blocking(release), 42)
+    assert not coalesced
+
+    joined, coalesced = second.submit("graph:repo@abc", "component_graph", blocking(release), 42)
+    assert coalesced and joined.id == job.id and joined.subscribers == 2
+    assert not joined.wait(0.3)
+    assert second.get(job.id).to_dict()["progress"] == {"stage": "working"}
+
+    release.set()
+    assert joined.wait(5)
+    assert joined.status == "done" and joined.result == {"value": 42}
+    assert second.get(job.id).result == {"value": 42}
+    assert second.get("unknown") is None
+
+    # A finished job no longer holds its key
+    _, coalesced = second.submit("graph:repo@abc", "component_graph", blocking(release), 42)
+    assert not coalesced
+
+
+def test_failures_are_reported_to_other_queues(queues):
+    first, second = queues
+    release = threading.Event()
+    release.set()
+    job, _ = first.submit("summary:repo@abc", "repo_summary", blocking(release), None)
+    assert job.wait(5)
+
+    failed = second.get(job.id)
+    assert failed.status == "failed" and failed.error == "no value"
+
+
+def test_jobs_of_exited_workers_release_their_key(queues):
+    first, second = queues
+    release = threading.Event()
+    job, _ = first.submit("graph:repo@abc", "component_graph", blocking(release), 1)
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    with first._lock:
+        first._connection().execute("UPDATE jobs SET owner_pid = ? WHERE id = ?", (exited.pid, job.id))
+
+    replacement, coalesced = second.submit("graph:repo@abc", "component_graph", blocking(release), 2)
+    assert not coalesced and replacement.id != job.id
+    assert second.get(job.id).status == "failed"
+
+    release.set()
+    assert replacement.wait(5) and replacement.result == {"value": 2}
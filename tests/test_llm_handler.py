@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("ollama")
+
+from components.llm_handler import LLMHandler  # noqa: E402
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """
+    /api/chat answers with the prompt itself after sleeping the number of seconds the prompt starts with
+    ("0.2 key"), and records how many requests were in flight at once.
+    """
+
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    served = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(float(prompt.split()[0]))
+        with cls.lock:
+            cls.in_flight -= 1
+            cls.served += 1
+
+        payload = json.dumps({"model": body["model"], "message": {"role": "assistant", "content": prompt},
+                              "done": True}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def ollama_host():
+    FakeOllama.in_flight = FakeOllama.max_in_flight = FakeOllama.served = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_query_many_limits_requests_in_flight(ollama_host):
+    handler = LLMHandler(host=ollama_host, max_concurrency=2, use_cache=False)
+    prompts = {i: f"0.1 prompt {i}" for i in range(6)}
+
+    results = list(handler.query_many(prompts))
+
+    assert sorted(key for key, _, _ in results) == list(range(6))
+    assert all(response == prompts[key] and error is None for key, response, error in results)
+    assert FakeOllama.max_in_flight == 2
+
+
+def test_query_many_yields_in_completion_order(ollama_host):
+    handler = LLMHandler(host=ollama_host, max_concurrency=3, use_cache=False)
+    prompts = {"slow": "0.6 slow", "fast": "0.05 fast", "medium": "0.3 medium"}
+
+    assert [key for key, _, _ in handler.query_many(prompts)] == ["fast", "medium", "slow"]
+
+
+def test_closing_query_many_early_cancels_queued_prompts(ollama_host):
+    handler = LLMHandler(host=ollama_host, max_concurrency=2, use_cache=False)
+    results = handler.query_many({i: f"0.3 prompt {i}" for i in range(10)})
+
+    next(results)
+    start = time.perf_counter()
+    results.close()
+    assert time.perf_counter() - start < 0.2  # Does not wait for the remaining prompts
+
+    time.sleep(1.0)
+    assert FakeOllama.served <= 4  # Only the queries already running when it closed were completed
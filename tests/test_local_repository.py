@@ -0,0 +1,92 @@
+import os
+import subprocess
+import tarfile
+import zipfile
+
+import pytest
+
+from components.local_repository import LocalRepository
+
+FILES = {
+    "README.md": "# Project\n",
+    "pkg/__init__.py": "",
+    "pkg/core.py": "def run():\n    return helper()\n\n\ndef helper():\n    return 1\n",
+    "pkg/util.py": "class Tool:\n    def use(self):\n        pass\n",
+}
+
+
+class NullCache:
+    def get_object(self, key):
+        return None
+
+    def set_object(self, key, obj):
+        pass
+
+
+def git(*args):
+    subprocess.run(["git", *args], check=True, capture_output=True)
+
+
+def bare_repository(checkout, tmp_path):
+    """Commits the checkout and clones it bare (local clones keep loose objects)."""
+    git("init", "-q", str(checkout))
+    git("-C", str(checkout), "add", "-A")
+    git("-C", str(checkout), "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+    git("clone", "-q", "--bare", str(checkout), str(tmp_path / "repo.git"))
+    return str(tmp_path / "repo.git")
+
+
+@pytest.fixture
+def checkout(tmp_path):
+    root = tmp_path / "checkout"
+    for path, content in FILES.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(content)
+    return root
+
+
+@pytest.fixture(params=["directory", "zip", "tar", "bare"])
+def source(request, checkout, tmp_path):
+    if request.param == "directory":
+        return str(checkout)
+    if request.param == "zip":
+        path = tmp_path / "repo.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            for name in FILES:
+                archive.write(checkout / name, name)
+        return str(path)
+    if request.param == "tar":
+        path = tmp_path / "repo.tar.gz"
+        with tarfile.open(path, "w:gz") as archive:
+            archive.add(checkout, arcname=".")
+        return str(path)
+    return bare_repository(checkout, tmp_path)
+
+
+def test_get_file_content_reads_one_file(source, monkeypatch):
+    repo = LocalRepository(source, cache=NullCache())
+    monkeypatch.setattr(repo, "_iter_files", lambda: pytest.fail("walked the whole source"))
+
+    assert repo.get_file_content("README.md") == FILES["README.md"]
+    assert repo.get_file_content("pkg/util.py") == FILES["pkg/util.py"]
+    assert repo.get_file_content("pkg/missing.py") is None
+
+
+def test_get_file_content_stays_inside_the_checkout(checkout):
+    (checkout.parent / "secret.txt").write_text("secret")
+    repo = LocalRepository(str(checkout), cache=NullCache())
+
+    assert repo.get_file_content("../secret.txt") is None
+
+
+def test_missing_blobs_are_skipped(checkout, tmp_path):
+    source = bare_repository(checkout, tmp_path)
+    blob = subprocess.run(["git", "--git-dir", source, "rev-parse", "HEAD:pkg/util.py"],
+                          check=True, capture_output=True, text=True).stdout.strip()
+    os.unlink(os.path.join(source, "objects", blob[:2], blob[2:]))  # Loose object, as in a partial clone
+
+    repo = LocalRepository(source, cache=NullCache())
+    functions, classes, _ = repo.fetch_files_from_directory()
+
+    assert [name for _, name, _ in classes] == []
+    assert sorted(name for _, name, _ in functions) == ["helper", "run"]
@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+import pytest
+
+from components.embedding_store import SnippetEmbedder
+from components.local_repository import LocalRepository
+from components.pipeline import IngestionPipeline, Stage, run_stages
+
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def get_object(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def set_object(self, key, value):
+        pass
+
+
+class FakeEmbedder(SnippetEmbedder):
+    """Deterministic embeddings derived from the snippet text."""
+
+    def embed_texts(self, texts, batch_size=None):
+        return np.array([[len(text), sum(text.encode("utf-8")) % 9973] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def source_tree(tmp_path):
+    for package in range(3):
+        for module in range(10):
+            path = tmp_path / f"pkg{package}" / f"mod{module}.py"
+            path.parent.mkdir(exist_ok=True)
+            path.write_text(f"class C{module}:\n    def method(self):\n        return {module}\n\n\n"
+                            f"def helper_{module}():\n    return C{module}().method()\n")
+    (tmp_path / "README.md").write_text("# Tree\n")
+    return tmp_path
+
+
+def test_streamed_ingestion_matches_phased(source_tree):
+    phased_repo = LocalRepository(str(source_tree), cache=NullCache())
+    functions, classes, metadata_files = phased_repo.fetch_files_from_directory()
+    embeddings = FakeEmbedder().generate_embeddings_batch(functions)
+
+    streamed = IngestionPipeline(LocalRepository(str(source_tree), cache=NullCache()), FakeEmbedder(),
+                                 parse_batch=4, embed_batch=3, capacity=2).run()
+
+    assert list(streamed[0]) == list(functions)
+    assert list(streamed[1]) == list(classes)
+    assert streamed[2] == metadata_files
+    assert streamed[3].keys() == embeddings.keys()
+    assert all(np.array_equal(streamed[3][name], embeddings[name]) for name in embeddings)
+
+
+def test_stage_errors_reach_the_consumer():
+    def fail(items):
+        raise RuntimeError("stage failed")
+
+    with pytest.raises(RuntimeError, match="stage failed"):
+        list(run_stages(range(1000), [Stage("identity", lambda items: items), Stage("fail", fail)], capacity=2))
+
+
+def test_closing_early_stops_every_stage():
+    outputs = run_stages(iter(range(10 ** 6)), [Stage("double", lambda items: [2 * x for x in items], 8)], capacity=4)
+    assert [next(outputs), next(outputs)] == [0, 2]
+    outputs.close()
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("pipeline-")]
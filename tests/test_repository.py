@@ -0,0 +1,153 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from components.repository import CodeRepository
+
+OWNER, NAME, REF = "octo", "demo", "main"
+FILES = {
+    "setup.py": "from pkg.core import main\n\n\ndef build():\n    return main()\n",
+    "README.md": "# Demo\n",
+    "pkg/__init__.py": "",
+    "pkg/core.py": "class Engine:\n    def run(self):\n        return helper()\n\n\ndef helper():\n    return 1\n\n\n"
+                   "def main():\n    return Engine().run()\n",
+    "pkg/util/text.py": "def shout(text):\n    return text.upper()\n",
+    "pkg/util/data.json": "{}\n",
+    "pkg/broken.py": "def broken(:\n",
+}
+
+
+def git_order(paths):
+    """Order of a recursive git tree listing: entries sorted per directory, directories compared with a '/'."""
+    return sorted(paths, key=lambda path: [part + ("/" if i < path.count("/") else "")
+                                           for i, part in enumerate(path.split("/"))])
+
+
+class FakeGitHub(BaseHTTPRequestHandler):
+    """Serves the contents API, the recursive trees API and raw blobs for FILES."""
+
+    truncated = False
+    requests = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        type(self).requests.append(url.path)
+        contents_prefix = f"/api/repos/{OWNER}/{NAME}/contents/"
+        tree_path = f"/api/repos/{OWNER}/{NAME}/git/trees/{REF}"
+        raw_prefix = f"/raw/{OWNER}/{NAME}/{REF}/"
+
+        if url.path == tree_path and parse_qs(url.query).get("recursive") == ["1"]:
+            tree = [{"path": path, "type": "blob", "sha": f"sha-{path}"} for path in git_order(FILES)]
+            self._send_json({"tree": tree, "truncated": type(self).truncated})
+        elif url.path.startswith(contents_prefix):
+            self._send_json(self._listing(url.path[len(contents_prefix):].strip("/")))
+        elif url.path.startswith(raw_prefix) and url.path[len(raw_prefix):] in FILES:
+            self._send(FILES[url.path[len(raw_prefix):]].encode("utf-8"), "text/plain")
+        else:
+            self._send(b"not found", "text/plain", status=404)
+
+    def _listing(self, directory):
+        prefix = f"{directory}/" if directory else ""
+        entries = {}
+        for path in FILES:
+            if path.startswith(prefix):
+                child = path[len(prefix):].split("/", 1)[0]
+                entries[child] = "dir" if "/" in path[len(prefix):] else "file"
+        listing = []
+        # Directories sort as "name/", so order them through a path below them
+        for child in git_order(f"{name}/x" if kind == "dir" else name for name, kind in entries.items()):
+            child = child.split("/", 1)[0]
+            path = prefix + child
+            if entries[child] == "dir":
+                listing.append({"type": "dir", "name": child, "path": path})
+            else:
+                listing.append({"type": "file", "name": child, "path": path, "sha": f"sha-{path}",
+                                "download_url": f"{self.server.base_url}/raw/{OWNER}/{NAME}/{REF}/{path}"})
+        return listing
+
+    def _send_json(self, payload):
+        self._send(json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def get_object(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def set_object(self, key, value):
+        pass
+
+
+@pytest.fixture
+def github():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHub)
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    FakeGitHub.truncated = False
+    FakeGitHub.requests = []
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def ingest(github, mode):
+    repo = CodeRepository(OWNER, NAME, "token", ref=REF, ingestion_mode=mode, max_workers=4,
+                          api_url=f"{github.base_url}/api", raw_url=f"{github.base_url}/raw", cache=NullCache())
+    functions, classes, metadata_files = repo.fetch_files_from_directory()
+    return repo, (list(functions), list(classes), metadata_files)
+
+
+def test_tree_and_contents_modes_return_the_same_tuples(github):
+    _, contents = ingest(github, "contents")
+    FakeGitHub.requests = []
+    repo, tree = ingest(github, "tree")
+
+    assert tree == contents
+    assert ("core.py", "Engine.run", "def run(self):\n        return helper()") in tree[0]
+    assert ("core.py", "Engine", FILES["pkg/core.py"].split("\n\n\n")[0]) in tree[1]
+    assert sorted(tree[2]) == ["README.md", "data.json"]
+    assert not any("/contents/" in path for path in FakeGitHub.requests)  # One tree call, no directory walk
+    assert not any(path.endswith((".md", ".json")) for path in FakeGitHub.requests)  # Metadata is fetched lazily
+    assert repo.get_file_content("README.md") == FILES["README.md"]
+
+
+def test_truncated_tree_falls_back_to_the_directory_walk(github):
+    _, contents = ingest(github, "contents")
+    FakeGitHub.truncated = True
+    FakeGitHub.requests = []
+    _, tree = ingest(github, "tree")
+
+    assert tree == contents
+    assert any("/git/trees/" in path for path in FakeGitHub.requests)
+    assert any("/contents/" in path for path in FakeGitHub.requests)
+
+
+def test_iter_files_streams_the_same_files(github):
+    repo = CodeRepository(OWNER, NAME, "token", ref=REF, max_workers=2, api_url=f"{github.base_url}/api",
+                          raw_url=f"{github.base_url}/raw", cache=NullCache())
+
+    files = list(repo.iter_files())
+
+    assert [path for path, *_ in files] == git_order(FILES)
+    assert {path: content for path, _, _, content in files if content is not None} == {
+        path: text for path, text in FILES.items() if path.endswith(".py")
+    }
@@ -0,0 +1,38 @@
+from components.summarization_planner import SummarizationPlanner
+
+
+class StubLLM:
+    """Answers every prompt with a fixed-length summary and counts the calls."""
+
+    def __init__(self, answer_chars=1000):
+        self.answer_chars = answer_chars
+        self.calls = 0
+
+    def query_many(self, prompts, template_version="raw"):
+        for key in prompts:
+            self.calls += 1
+            assert self.calls < 200, "runaway reduce"
+            yield key, "x" * self.answer_chars, None
+
+
+def test_reduce_converges_when_every_summary_exceeds_half_the_budget():
+    llm = StubLLM()
+    planner = SummarizationPlanner(llm, chunk_tokens=400, fan_in=8)
+    files = {f"file_{i}.py": "y" * 1000 for i in range(40)}
+
+    package_summaries, repo_summary, errors = planner.summarize_hierarchy(files, {name: "pkg" for name in files})
+
+    assert not errors
+    assert set(package_summaries) == {"pkg"}
+    assert repo_summary == package_summaries["pkg"]
+    assert llm.calls < 2 * len(files)  # Each round at least halves its inputs
+
+
+def test_reduce_falls_back_to_concatenation_when_the_budget_is_too_small():
+    llm = StubLLM(answer_chars=100)
+    planner = SummarizationPlanner(llm, chunk_tokens=1, fan_in=2)  # No two inputs ever fit one prompt
+
+    results = list(planner.reduce({"pkg": [(f"File {i}", "summary") for i in range(3)]}, "package"))
+
+    assert [(key, error) for key, _, error in results] == [("pkg", None)]
+    assert len(results[0][1]) <= planner.chunk_tokens * 4
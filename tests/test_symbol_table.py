@@ -0,0 +1,61 @@
+import pickle
+
+from components.analyzer import CodeAnalyzer
+from components.symbol_table import SymbolTable
+
+SOURCE = '''\
+class Greeter:
+    def hello(self):
+        return "héllo"
+
+
+def main():
+    Greeter().hello()
+'''
+
+
+def add(table, path, code, sha=None):
+    source, symbols, _ = CodeAnalyzer().extract_symbols(code)
+    return table.add_file(path, source, symbols, sha)
+
+
+def test_views_yield_the_code_of_each_symbol():
+    table = SymbolTable()
+    add(table, "pkg/a.py", SOURCE, sha="a")
+
+    functions = table.view(table.rows("pkg/a.py", "function"))
+    classes = table.view(table.rows("pkg/a.py", "class"))
+
+    assert functions.names() == ["Greeter.hello", "main"]
+    assert functions[1] == ("a.py", "main", "def main():\n    Greeter().hello()")
+    assert classes[0][2].startswith("class Greeter:") and "héllo" in classes[0][2]
+    assert table.file_text("pkg/a.py") == SOURCE
+
+
+def test_blobs_are_interned_and_earlier_views_survive_later_additions():
+    table = SymbolTable()
+    add(table, "a.py", SOURCE, sha="same")
+    first = table.view(table.rows("a.py"))
+    items = list(first)
+    code = table.code(0)
+
+    add(table, "b.py", SOURCE, sha="same")
+    for i in range(50):
+        add(table, f"other_{i}.py", f"def f{i}():\n    return {i}\n")
+
+    assert list(first) == items
+    assert bytes(code) == items[0][2].encode("utf-8")
+    assert table.nbytes < 2 * len(SOURCE.encode("utf-8")) + 50 * 40 + 200 * 8 * len(table)
+
+
+def test_copy_file_and_pickle_round_trip():
+    table = SymbolTable()
+    add(table, "a.py", SOURCE)
+    add(table, "b.py", "def g():\n    pass\n")
+
+    copy = SymbolTable()
+    copy.copy_file("renamed.py", table, "b.py")
+    restored = pickle.loads(pickle.dumps(table.view(table.rows("a.py"))))
+
+    assert list(copy.view(copy.rows("renamed.py"))) == [("renamed.py", "g", "def g():\n    pass")]
+    assert list(restored) == list(table.view(table.rows("a.py")))